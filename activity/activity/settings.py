@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -58,6 +59,22 @@ AUTHENTICATION_BACKENDS = [
 ]
 
 
+# Response renderers (schedular/renderers.py). FastJSONRenderer uses orjson when installed.
+# 'development' also serves the browsable API; set API_RENDERER_PROFILE=production to serve JSON only.
+API_RENDERER_PROFILES = {
+    'development': [
+        'schedular.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'production': [
+        'schedular.renderers.FastJSONRenderer',
+    ],
+}
+API_RENDERER_PROFILE = os.getenv('API_RENDERER_PROFILE', 'development').lower()
+if API_RENDERER_PROFILE not in API_RENDERER_PROFILES:
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured(f"API_RENDERER_PROFILE must be one of {', '.join(API_RENDERER_PROFILES)}")
+
 REST_FRAMEWORK = {
     # AUTHENTICATION ENABLED FOR PRODUCTION
     "DEFAULT_AUTHENTICATION_CLASSES": (
@@ -66,10 +83,7 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",  # Require authentication
     ),
-    'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
-    ],
+    'DEFAULT_RENDERER_CLASSES': API_RENDERER_PROFILES[API_RENDERER_PROFILE],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
         'rest_framework.parsers.FormParser',
@@ -295,6 +309,59 @@ DAS_FRONTEND_URL = os.getenv('DAS_FRONTEND_URL', 'http://localhost:63105/')
 # DAS_FRONTEND_URL = os.getenv('DAS_FRONTEND_URL', 'https://das.meridahr.com/')
 
 # SSL Verification setting for HRM requests
+# Applies to the auto-login code validation only; every other HRM call always verifies.
 # Set to True for production, False for local dev if encountering SSL errors
 VERIFY_SSL_HRM = os.getenv('VERIFY_SSL_HRM', 'False').lower() == 'true'
 
+# Shared HRM client (schedular/hrm_client.py)
+# Seconds an employee-status response is reused before asking HRM again
+HRM_CACHE_TTL = int(os.getenv('HRM_CACHE_TTL', '60'))
+# Retries for transient HRM failures (connection errors, 502/503/504)
+HRM_MAX_RETRIES = int(os.getenv('HRM_MAX_RETRIES', '2'))
+
+# Background HRM sync (schedular/hrm_sync.py)
+# 'thread': run jobs on an in-process worker thread
+# 'command': leave jobs queued for `python manage.py run_hrm_sync_jobs`
+HRM_SYNC_WORKER = os.getenv('HRM_SYNC_WORKER', 'thread')
+# Minutes without progress (running) or without a worker (pending) before a job is failed
+HRM_SYNC_STALE_MINUTES = int(os.getenv('HRM_SYNC_STALE_MINUTES', '10'))
+
+
+# Shared cache for every worker process, e.g. CACHE_URL=redis://127.0.0.1:6379/1.
+# Without it Django's per-process LocMemCache is used, and the caches that must
+# stay consistent across workers (user_cache.py) switch themselves off.
+CACHE_URL = os.getenv('CACHE_URL')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+
+# Authenticated-user cache (schedular/user_cache.py), in seconds; 0 disables it.
+# Every User save invalidates the entry immediately via the default cache, so the
+# cache only runs with a shared backend (CACHE_URL); it is off by default without one.
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', '30' if CACHE_URL else '0'))
+
+# Live dashboard deltas (ws/dashboard/): seconds over which changes are coalesced per subscriber
+DASHBOARD_PUSH_INTERVAL = float(os.getenv('DASHBOARD_PUSH_INTERVAL', '2'))
+
+# Running-timer registry (schedular/timers.py): snapshot lifetime in the shared cache and
+# how often ws/dashboard/ 'timers' subscribers receive the running sessions, in seconds
+TIMER_REGISTRY_TTL = int(os.getenv('TIMER_REGISTRY_TTL', '300'))
+TIMER_TICK_INTERVAL = float(os.getenv('TIMER_TICK_INTERVAL', '5'))
+
+# Delta sync for the Flutter client (POST /api/sync/, schedular/sync.py)
+# Rows / tombstones per collection per response, and the most mutations accepted per request
+SYNC_BATCH_SIZE = int(os.getenv('SYNC_BATCH_SIZE', '500'))
+# Rows younger than this (seconds) wait for the next sync, so late-committing writes are not skipped
+SYNC_SETTLE_SECONDS = float(os.getenv('SYNC_SETTLE_SECONDS', '2'))
+# Tombstone retention (prune_sync_tombstones); clients further behind reload the collection
+SYNC_TOMBSTONE_DAYS = int(os.getenv('SYNC_TOMBSTONE_DAYS', '30'))
+
+# Conditional GET on polled endpoints (schedular/conditional.py): ETag + 304 Not Modified
+CONDITIONAL_GET_ENABLED = os.getenv('CONDITIONAL_GET_ENABLED', 'True').lower() == 'true'
+
+# Timesheet export (schedular/timesheets.py): rows fetched from the database per round trip
+TIMESHEET_EXPORT_CHUNK_SIZE = int(os.getenv('TIMESHEET_EXPORT_CHUNK_SIZE', '2000'))
@@ -0,0 +1,482 @@
+"""
+Approval queues
+
+ApprovalRequest points at its project or task through (reference_type,
+reference_id), so listing a queue used to cost a get() per approval plus lazy
+loads of project_lead, handled_by, task.project and the assignees.
+resolve_references() loads every referenced object of a page with one
+in_bulk() per reference type, and the row builders below only read what it
+preloaded.
+
+decide() approves or rejects many requests at once: set-based updates per
+(reference_type, approval_type), bulk-created ApprovalResponses and one
+notification per requester. request_project_creation() files the creation
+requests of a new project and its initial tasks the same way.
+"""
+from django.db import transaction
+from django.db.models import Count, Prefetch, Q
+from django.utils import timezone
+
+from . import live
+from .models import (ApprovalRequest, ApprovalResponse, Catalog, Notification, Projects, SubTask, Task,
+                     TaskAssignee, User)
+from .signals import send_notifications
+
+# Queue name -> (reference_type, approval_type)
+QUEUES = {
+    'new_projects': ('PROJECT', 'CREATION'),
+    'project_closures': ('PROJECT', 'COMPLETION'),
+    'new_tasks': ('TASK', 'CREATION'),
+    'task_completions': ('TASK', 'COMPLETION'),
+}
+
+REFERENCE_QUERYSETS = {
+    'PROJECT': lambda: Projects.objects.select_related('project_lead', 'handled_by'),
+    'TASK': lambda: Task.objects.select_related('project').prefetch_related(
+        Prefetch('assignees', queryset=TaskAssignee.objects.select_related('user'))
+    ),
+}
+
+
+def pending_queue(queue, user):
+    """Pending approvals of one queue; non-admins only see their own requests"""
+    reference_type, approval_type = QUEUES[queue]
+    approvals = ApprovalRequest.objects.filter(
+        reference_type=reference_type,
+        approval_type=approval_type,
+        status='PENDING'
+    ).select_related('requested_by').order_by('-created_at')
+    if user.role != 'ADMIN':
+        approvals = approvals.filter(requested_by=user)
+    return approvals
+
+
+def resolve_references(approvals):
+    """{(reference_type, reference_id): object} with one query per reference type"""
+    ids_by_type = {}
+    for approval in approvals:
+        ids_by_type.setdefault(approval.reference_type, set()).add(approval.reference_id)
+
+    resolved = {}
+    for reference_type, ids in ids_by_type.items():
+        queryset = REFERENCE_QUERYSETS.get(reference_type)
+        if queryset is None:
+            continue
+        for pk, obj in queryset().in_bulk(ids).items():
+            resolved[(reference_type, pk)] = obj
+    return resolved
+
+
+def pending_summary(user):
+    """Pending counts per queue plus the total, from one grouped query"""
+    approvals = ApprovalRequest.objects.filter(status='PENDING')
+    if user.role != 'ADMIN':
+        approvals = approvals.filter(requested_by=user)
+    counts = {
+        (row['reference_type'], row['approval_type']): row['count']
+        for row in approvals.values('reference_type', 'approval_type').annotate(count=Count('id')).order_by()
+    }
+    summary = {queue: counts.get(key, 0) for queue, key in QUEUES.items()}
+    summary['total_pending'] = sum(counts.values())
+    return summary
+
+
+# ── Queue rows ───────────────────────────────────────────────────────────
+
+def _email(user):
+    return user.email if user else None
+
+
+def _assignees(task):
+    return [
+        {'email': assignee.user.email, 'role': assignee.role}
+        for assignee in task.assignees.all()
+    ]
+
+
+def new_project_row(approval, project):
+    return {
+        'approval_id': approval.id,
+        'project_id': project.id,
+        'project_name': project.name,
+        'description': project.description,
+        'status': project.status,
+        'start_date': project.start_date,
+        'due_date': project.due_date,
+        'duration': project.duration,
+        'working_hours': project.working_hours,
+        'project_lead': _email(project.project_lead),
+        'handled_by': _email(project.handled_by),
+        'requested_by': approval.requested_by.email,
+        'requested_at': approval.created_at,
+        'request_data': approval.request_data
+    }
+
+
+def project_closure_row(approval, project):
+    return {
+        'approval_id': approval.id,
+        'project_id': project.id,
+        'project_name': project.name,
+        'description': project.description,
+        'current_status': project.status,
+        'start_date': project.start_date,
+        'due_date': project.due_date,
+        'completion_request_date': project.completed_date,
+        'project_lead': _email(project.project_lead),
+        'handled_by': _email(project.handled_by),
+        'requested_by': approval.requested_by.email,
+        'requested_at': approval.created_at,
+        'request_data': approval.request_data
+    }
+
+
+def new_task_row(approval, task):
+    return {
+        'approval_id': approval.id,
+        'task_id': task.id,
+        'task_title': task.title,
+        'project': task.project.name,
+        'project_id': task.project_id,
+        'priority': task.priority,
+        'status': task.status,
+        'start_date': task.start_date,
+        'due_date': task.due_date,
+        'requested_by': approval.requested_by.email,
+        'requested_at': approval.created_at,
+        'assignees': _assignees(task),
+        'request_data': approval.request_data
+    }
+
+
+def task_completion_row(approval, task):
+    return {
+        'approval_id': approval.id,
+        'task_id': task.id,
+        'task_title': task.title,
+        'project': task.project.name,
+        'project_id': task.project_id,
+        'priority': task.priority,
+        'current_status': task.status,
+        'start_date': task.start_date,
+        'due_date': task.due_date,
+        'completion_request_date': task.completed_at,
+        'requested_by': approval.requested_by.email,
+        'requested_at': approval.created_at,
+        'assignees': _assignees(task),
+        'request_data': approval.request_data
+    }
+
+
+QUEUE_ROWS = {
+    'new_projects': new_project_row,
+    'project_closures': project_closure_row,
+    'new_tasks': new_task_row,
+    'task_completions': task_completion_row,
+}
+
+
+def queue_rows(queue, approvals):
+    """Rows for a page of approvals; approvals whose reference no longer exists are skipped"""
+    approvals = list(approvals)
+    references = resolve_references(approvals)
+    build = QUEUE_ROWS[queue]
+    return [
+        build(approval, references[(approval.reference_type, approval.reference_id)])
+        for approval in approvals
+        if (approval.reference_type, approval.reference_id) in references
+    ]
+
+
+# ── Bulk decisions ───────────────────────────────────────────────────────
+
+DECISIONS = {'approve': 'APPROVED', 'reject': 'REJECTED'}
+
+# (reference_type, approval_type, decision) -> (title, message); same wording as approve/reject
+DECISION_MESSAGES = {
+    ('PROJECT', 'CREATION', 'APPROVED'): (
+        'Project Approved ✓',
+        'Your project "{name}" has been approved and is now live. You can start working on it!'
+    ),
+    ('PROJECT', 'COMPLETION', 'APPROVED'): (
+        'Project Closed ✓',
+        'Admin has confirmed closure of project "{name}". The project is now marked as Completed.'
+    ),
+    ('TASK', 'CREATION', 'APPROVED'): (
+        'Task Approved ✓',
+        'Your task "{name}" has been approved. It is now active and ready to be worked on.'
+    ),
+    ('TASK', 'COMPLETION', 'APPROVED'): (
+        'Task Completed ✓',
+        'Admin has confirmed completion of task "{name}". Great work!'
+    ),
+    ('PROJECT', 'CREATION', 'REJECTED'): (
+        'Project Request Not Approved',
+        'Your request to create the project "{name}" was not approved. '
+        'The project has been removed. You may create a new project if needed.'
+    ),
+    ('PROJECT', 'COMPLETION', 'REJECTED'): (
+        'Project Kept Open',
+        'Admin reviewed your closure request for project "{name}" and decided to keep it open. '
+        'Please continue working and resubmit when ready.'
+    ),
+    ('TASK', 'CREATION', 'REJECTED'): (
+        'Task Request Not Approved',
+        'Your request to create task "{name}" was not approved. '
+        'The task has been removed. You may create a new task if needed.'
+    ),
+    ('TASK', 'COMPLETION', 'REJECTED'): (
+        'Task Completion Not Confirmed',
+        'Admin did not confirm completion of task "{name}". '
+        'The task has been set back to In Progress. Please review and resubmit when done.'
+    ),
+}
+
+
+def _reference_names(approvals):
+    """{(reference_type, reference_id): name} with one query per reference type"""
+    ids = {'PROJECT': set(), 'TASK': set()}
+    for approval in approvals:
+        ids.get(approval.reference_type, set()).add(approval.reference_id)
+    names = {('PROJECT', pk): name for pk, name in Projects.objects.filter(id__in=ids['PROJECT']).values_list('id', 'name')}
+    names.update({('TASK', pk): title for pk, title in Task.objects.filter(id__in=ids['TASK']).values_list('id', 'title')})
+    return names
+
+
+def _decision_message(approval, decision, name):
+    title, message = DECISION_MESSAGES.get(
+        (approval.reference_type, approval.approval_type, decision), (None, None)
+    )
+    if title is None:
+        verb = 'approved' if decision == 'APPROVED' else 'rejected'
+        return (
+            f'Approval Request {verb.title()}',
+            f'Your {approval.approval_type.lower()} request for '
+            f'{approval.reference_type.lower()} "{name or approval.reference_id}" has been {verb}.'
+        )
+    return title, message.format(name=name or approval.reference_id)
+
+
+def _coalesced_notifications(decided, decision, names):
+    """One Notification per requester; a single decision keeps the per-request wording"""
+    by_requester = {}
+    for approval in decided:
+        by_requester.setdefault(approval.requested_by_id, []).append(approval)
+
+    notification_type = 'APPROVAL_APPROVED' if decision == 'APPROVED' else 'APPROVAL_REJECTED'
+    notifications = []
+    for user_id, approvals in by_requester.items():
+        messages = [
+            _decision_message(a, decision, names.get((a.reference_type, a.reference_id)))
+            for a in approvals
+        ]
+        if len(approvals) == 1:
+            title, message = messages[0]
+            reference_type, reference_id = approvals[0].reference_type.lower(), approvals[0].reference_id
+        else:
+            verb = 'Approved ✓' if decision == 'APPROVED' else 'Not Approved'
+            title = f'{len(approvals)} Requests {verb}'
+            message = '\n'.join(message for _, message in messages)
+            reference_type, reference_id = 'approval', None
+        notifications.append(Notification(
+            user_id=user_id,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            reference_type=reference_type,
+            reference_id=reference_id
+        ))
+    return Notification.objects.bulk_create(notifications)
+
+
+def decide(approvals, decision, reviewer, reason=None):
+    """
+    Approve or reject a set of approval requests in one transaction, with the
+    side effects of ApprovalRequestViewSet.approve / reject applied per
+    (reference_type, approval_type) group as set-based updates. Records an
+    ApprovalResponse per request and notifies each requester once.
+
+    The requests are re-read with select_for_update() and only those still
+    PENDING are decided, so two reviewers deciding the same request at once
+    cannot both apply its side effects or both record a response.
+
+    Returns (decided_ids, skipped) where skipped is a list of {'id', 'error'}.
+    """
+    approvals = list(approvals)
+    with transaction.atomic():
+        # Lock what is still pending; a concurrent decide() waits here, then finds it decided
+        pending = list(
+            ApprovalRequest.objects.select_for_update()
+            .filter(id__in=[a.id for a in approvals], status='PENDING').order_by('id')
+        )
+        locked = {a.id for a in pending}
+        skipped = [
+            {'id': a.id, 'error': 'This request is not pending approval'}
+            for a in approvals if a.id not in locked
+        ]
+
+        if decision == 'APPROVED':
+            closing = {a.reference_id for a in pending if (a.reference_type, a.approval_type) == ('PROJECT', 'COMPLETION')}
+            open_tasks = dict(
+                Task.objects.filter(project_id__in=closing).exclude(status='DONE')
+                .values('project_id').annotate(count=Count('id')).values_list('project_id', 'count')
+            )
+            blocked = {
+                a.id for a in pending
+                if (a.reference_type, a.approval_type) == ('PROJECT', 'COMPLETION') and open_tasks.get(a.reference_id)
+            }
+            skipped += [
+                {
+                    'id': a.id,
+                    'error': f"Cannot approve project closure. There are {open_tasks[a.reference_id]} pending tasks remaining."
+                }
+                for a in pending if a.id in blocked
+            ]
+            pending = [a for a in pending if a.id not in blocked]
+
+        if not pending:
+            return [], skipped
+
+        groups = {}
+        for approval in pending:
+            groups.setdefault((approval.reference_type, approval.approval_type), set()).add(approval.reference_id)
+        project_creations = groups.get(('PROJECT', 'CREATION'), set())
+        project_closures = groups.get(('PROJECT', 'COMPLETION'), set())
+        task_creations = groups.get(('TASK', 'CREATION'), set())
+        task_completions = groups.get(('TASK', 'COMPLETION'), set())
+
+        names = _reference_names(pending)
+        today = timezone.now().date()
+        reason = reason or 'No reason provided'
+        changed_tasks, refreshed_projects = set(), set()
+
+        ApprovalRequest.objects.filter(id__in=[a.id for a in pending], status='PENDING').update(status=decision)
+        ApprovalResponse.objects.bulk_create([
+            ApprovalResponse(
+                approval_request=a,
+                action=decision,
+                reviewed_by=reviewer,
+                rejection_reason=reason if decision == 'REJECTED' else None
+            )
+            for a in pending
+        ])
+
+        if decision == 'APPROVED':
+            Projects.objects.filter(id__in=project_creations).update(is_approved=True)
+            Projects.objects.filter(id__in=project_closures).update(
+                status='COMPLETED', approval_status='APPROVED', completed_date=today
+            )
+            activated = Task.objects.filter(id__in=task_creations, status='PENDING_APPROVAL')
+            changed_tasks.update(activated.values_list('id', flat=True))
+            activated.update(status='PENDING')
+            Task.objects.filter(id__in=task_completions).update(
+                status='DONE', approval_status='APPROVED', completed_at=today
+            )
+            changed_tasks.update(task_completions)
+            for task in Task.objects.filter(id__in=task_completions, task_type='RECURRING'):
+                task.regenerate_recurring_task()
+        else:
+            # Rejected creations are removed; delete() still runs the per-row Task signals
+            Projects.objects.filter(id__in=project_creations).delete()
+            Task.objects.filter(id__in=task_creations).delete()
+
+            Projects.objects.filter(id__in=project_closures).update(
+                approval_status='REJECTED', status='ACTIVE', rejection_reason=reason
+            )
+            reopened = Task.objects.filter(project_id__in=project_closures)
+            changed_tasks.update(reopened.values_list('id', flat=True))
+            reopened.update(status='IN_PROGRESS', approval_status=None, completed_at=None)
+            refreshed_projects.update(project_closures)
+
+            Task.objects.filter(id__in=task_completions).update(
+                status='PENDING', approval_status='REJECTED', rejection_reason=reason, completed_at=None
+            )
+            changed_tasks.update(task_completions)
+            SubTask.objects.filter(
+                Q(task_id__in=task_completions) | Q(task__project_id__in=project_closures),
+                status='DONE'
+            ).update(status='PENDING', completed_at=None)
+
+        # update() skips the Task signals: refresh catalog progress and publish the task deltas here
+        Catalog.refresh_progress_for(task_ids=changed_tasks, project_ids=refreshed_projects)
+        for task in Task.objects.filter(id__in=changed_tasks):
+            live.publish('tasks', task.id, live.task_delta(task, 'updated'))
+        for approval in pending:
+            approval.status = decision
+            live.publish('approvals', approval.id, live.approval_delta(approval, 'decided'))
+
+        send_notifications(_coalesced_notifications(pending, decision, names))
+
+    return [a.id for a in pending], skipped
+
+
+
+# ── Creation requests ────────────────────────────────────────────────────
+
+def request_project_creation(project, tasks, user):
+    """
+    File CREATION requests for a new project and its initial tasks with one
+    bulk_create, and send each approver a single summary notification instead
+    of one per request (approval_request_notification does not run for bulk rows).
+    """
+    approvals = ApprovalRequest.objects.bulk_create([
+        ApprovalRequest(
+            reference_type='PROJECT',
+            reference_id=project.id,
+            approval_type='CREATION',
+            requested_by=user,
+            request_data={
+                'project_name': project.name,
+                'description': project.description,
+                'requested_by': user.email,
+            }
+        )
+    ] + [
+        # Use a simpler request data for initial project tasks
+        ApprovalRequest(
+            reference_type='TASK',
+            reference_id=task.id,
+            approval_type='CREATION',
+            requested_by=user,
+            request_data={
+                'title': task.title,
+                'project': project.name,
+                'is_initial_task': True
+            }
+        )
+        for task in tasks
+    ])
+    # Backends without RETURNING support (MySQL) don't set pks on bulk_create
+    if any(approval.pk is None for approval in approvals):
+        lookup = {
+            (a.reference_type, a.reference_id): a.pk
+            for a in ApprovalRequest.objects.filter(
+                Q(reference_type='PROJECT', reference_id=project.id)
+                | Q(reference_type='TASK', reference_id__in=[task.id for task in tasks]),
+                approval_type='CREATION',
+                requested_by=user,
+            ).only('id', 'reference_type', 'reference_id')
+        }
+        for approval in approvals:
+            approval.pk = lookup[(approval.reference_type, approval.reference_id)]
+    for approval in approvals:
+        live.publish('approvals', approval.id, live.approval_delta(approval, 'requested'))
+
+    message = f'{user.email} created new project "{project.name}" pending approval.'
+    if tasks:
+        message = (
+            f'{user.email} created new project "{project.name}" with {len(tasks)} '
+            f'initial task{"s" if len(tasks) != 1 else ""} pending approval.'
+        )
+    send_notifications(Notification.objects.bulk_create([
+        Notification(
+            user_id=approver_id,
+            notification_type='APPROVAL_REQUESTED',
+            title='New Project Creation',
+            message=message,
+            reference_type='approval',
+            reference_id=approvals[0].id
+        )
+        for approver_id in User.objects.filter(role__in=live.APPROVER_ROLES).values_list('id', flat=True)
+    ]))
+    return approvals
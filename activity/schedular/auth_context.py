@@ -0,0 +1,99 @@
+"""
+Request-scoped authorization context
+
+A single API request can ask for the caller's role, department, team or full
+subordinate tree several times (permission classes, queryset mixins, chart and
+dashboard views). AuthContext resolves each of these at most once per request
+and is attached to the request as `request.auth_context` by
+ImpersonationJWTAuthentication (or lazily by get_auth_context()).
+"""
+from functools import cached_property
+
+from .models import User
+
+
+class AuthContext:
+    """Effective user, impersonating admin and lazily-loaded hierarchy ids"""
+
+    def __init__(self, user, admin_user=None):
+        self.user = user
+        self.admin_user = admin_user
+
+    @property
+    def is_impersonated(self):
+        return self.admin_user is not None
+
+    @property
+    def is_authenticated(self):
+        return bool(getattr(self.user, 'is_authenticated', False))
+
+    @property
+    def acting_user(self):
+        """The real caller: the admin when impersonating, otherwise the user"""
+        return self.admin_user or self.user
+
+    @property
+    def role(self):
+        return getattr(self.user, 'role', None)
+
+    @property
+    def department_id(self):
+        return getattr(self.user, 'department_id', None)
+
+    @cached_property
+    def _direct_reports(self):
+        if not self.is_authenticated:
+            return []
+        return list(User.objects.filter(team_lead_id=self.user.pk, is_active=True).values_list('id', 'role'))
+
+    @cached_property
+    def team_member_ids(self):
+        """Active direct reports (same set as User.get_team_members())"""
+        return frozenset(user_id for user_id, _ in self._direct_reports)
+
+    @cached_property
+    def subordinate_ids(self):
+        """
+        Everyone under the user (same set as User.get_all_subordinates()),
+        walked one hierarchy level per query instead of one query per report.
+        """
+        if not self.is_authenticated:
+            return frozenset()
+        if self.role == 'ADMIN':
+            return frozenset(User.objects.values_list('id', flat=True))
+
+        result = set()
+        seen = {self.user.pk}
+        reports = self._direct_reports
+        while reports:
+            # get_all_subordinates() of an ADMIN report is every user
+            if any(role == 'ADMIN' for _, role in reports):
+                return frozenset(User.objects.values_list('id', flat=True))
+            ids = {user_id for user_id, _ in reports}
+            result |= ids
+            frontier = ids - seen
+            seen |= frontier
+            reports = list(
+                User.objects.filter(team_lead_id__in=frontier, is_active=True).values_list('id', 'role')
+            ) if frontier else []
+        return frozenset(result)
+
+    @property
+    def scope_user_ids(self):
+        """The user plus the people whose data their role covers (None for ADMIN: everyone)"""
+        if self.role == 'ADMIN':
+            return None
+        if self.role == 'MANAGER':
+            return [self.user.pk, *self.subordinate_ids]
+        if self.role == 'TEAMLEAD':
+            return [self.user.pk, *self.team_member_ids]
+        return [self.user.pk]
+
+
+def get_auth_context(request):
+    """Return the request's AuthContext, creating it on first use"""
+    context = getattr(request, 'auth_context', None)
+    if context is None or context.user is not request.user:
+        context = AuthContext(request.user, getattr(request, 'admin_user', None))
+        request.auth_context = context
+    return context
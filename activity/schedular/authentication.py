@@ -1,9 +1,15 @@
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
 from django.contrib.auth import get_user_model
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import AllowAny
 
+from .auth_context import AuthContext
+from .user_cache import get_cached_users
+
 User = get_user_model()
 
 # DEVELOPMENT: Custom AnonymousUser with required attributes
@@ -25,26 +31,52 @@ class ImpersonationJWTAuthentication(JWTAuthentication):
     """
     Extends simplejwt JWTAuthentication to allow 'ADMIN' users to impersonate
     other users via the X-Impersonate-User header.
+
+    The token user and the impersonation target come from the user cache (see
+    schedular.user_cache), and the resulting AuthContext is attached to the
+    request as `request.auth_context`.
     """
     def authenticate(self, request):
+        impersonate_id = request.headers.get('X-Impersonate-User')
+        self.impersonate_id = impersonate_id if impersonate_id and impersonate_id.isdigit() else None
+        self.target_user = None
+
         result = super().authenticate(request)
         if result is None:
             return None
         
         user, token = result
+        admin_user = None
         
         # Check if user is an ADMIN or MANAGER attempting to impersonate
-        if user.role in ['ADMIN', 'MANAGER']:
-            impersonate_id = request.headers.get('X-Impersonate-User')
-            if impersonate_id:
-                try:
-                    target_user = User.objects.get(id=impersonate_id)
-                    # We return the target_user but keep the original token
-                    # We can also attach the original admin/manager user to the request for logging
-                    request.admin_user = user 
-                    request.is_impersonated = True
-                    return target_user, token
-                except User.DoesNotExist:
-                    pass
-                    
+        if user.role in ['ADMIN', 'MANAGER'] and self.target_user is not None:
+            # We return the target_user but keep the original token
+            # The original admin/manager user stays on the request for logging
+            admin_user, user = user, self.target_user
+            request.admin_user = admin_user
+            request.is_impersonated = True
+
+        request.auth_context = AuthContext(user, admin_user)
         return user, token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        # Served from the short-lived user cache; a cold lookup loads both users in one query
+        users = get_cached_users([user_id, self.impersonate_id])
+        user = users.get(str(user_id))
+        if user is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+
+        if self.impersonate_id:
+            self.target_user = users.get(self.impersonate_id)
+        return user
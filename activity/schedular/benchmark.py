@@ -0,0 +1,587 @@
+"""
+Query-count and latency benchmark harness
+
+- seed_tenant(): reproducible synthetic tenant (users in a manager -> team lead
+  -> employee hierarchy, projects, tasks, milestones, catalog, plans and
+  activity logs spanning N years), inserted with bulk_create
+- run_benchmarks(): hits the dashboard, analytics, chart, team-overview and
+  performance endpoints through the DRF test client as each role and records
+  query counts, p50/p95 latency and peak traced memory
+- compare_results(): diffs a run against a stored JSON baseline and flags
+  regressions
+- compare_scope_forms(): times role-scoped project/task count and first page
+  with the old OR-chain + DISTINCT, the scope builder (schedular/scopes.py) and the
+  ProjectVisibility table, and checks all three return the same rows
+- compare_renderers(): renders the largest responses with the stock JSONRenderer
+  and FastJSONRenderer (schedular/renderers.py) and records time, bytes and
+  whether both decode to the same JSON
+
+Used by the `run_benchmarks` management command.
+"""
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, time as dt_time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, models
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .models import (
+    User, Department, Projects, Task, TaskAssignee, SubTask,
+    Catalog, TodayPlan, ActivityLog
+)
+from .links import relink_plans
+from .mixins import ProjectQuerySetMixin, TaskQuerySetMixin
+from .scopes import any_of, assigned_tasks, project_involvement
+from .visibility import rebuild_all as rebuild_visibility
+
+
+DEFAULT_TENANT = {
+    'seed': 42,
+    'users': 60,
+    'depth': 3,          # 1 = flat employees, 2 = team lead -> employee, 3 = manager -> TL -> employee
+    'departments': 4,
+    'projects': 30,
+    'tasks_per_project': 12,
+    'subtasks_per_task': 3,
+    'years': 1,
+    'plans_per_day': 3,
+}
+
+HIERARCHY_ROLES = ['MANAGER', 'TEAMLEAD', 'EMPLOYEE']
+
+# (name, url) - placeholders are filled from the seeded tenant
+BENCHMARK_ENDPOINTS = [
+    ('dashboard.statistics', '/api/dashboard/statistics/'),
+    ('dashboard.critical_attention', '/api/dashboard/critical_attention/'),
+    ('dashboard.team_activity_status', '/api/dashboard/team-activity-status/'),
+    ('dashboard.users_for_stats', '/api/dashboard/users-for-stats/'),
+    ('dashboard.project_work_stats', '/api/dashboard/project-work-stats/'),
+    ('dashboard.project_work_stats.project', '/api/dashboard/project-work-stats/?project_id={project_id}'),
+    ('analytics.daily', '/api/analytics/daily/?days=30'),
+    ('analytics.project_bars', '/api/analytics/{project_id}/project-bars/'),
+    ('project_analytics.tasks', '/api/project-analytics/tasks/'),
+    ('project_analytics.hours', '/api/project-analytics/hours/?project_id={project_id}'),
+    ('project_analytics.employees_for_project', '/api/project-analytics/employees-for-project/?project_id={project_id}'),
+    ('project_analytics.projects_for_employee', '/api/project-analytics/projects-for-employee/?employee_id={member_id}'),
+    ('chart.project_completion', '/api/project-completion-chart/'),
+    ('chart.task_completion', '/api/task-completion-chart/'),
+    ('chart.hours_completion', '/api/hours-completion-chart/'),
+    ('team_overview.team_members', '/api/team-overview/team_members/'),
+    ('team_overview.member_dashboard', '/api/team-overview/member_dashboard/?member_id={member_id}'),
+    ('team_overview.department_stats', '/api/team-overview/department_stats/'),
+    ('team_overview.get_my_team', '/api/team-overview/get_my_team/'),
+    ('project_working_hours', '/api/project-working-hours/?startDate={month_start}&endDate={today}'),
+    ('team_activity_status.today', '/api/team-activity-status/today/'),
+    ('performance.daily', '/api/daily-performance/'),
+    ('performance.range', '/api/daily-performance/range/{month_start}/{today}/'),
+    ('performance.weekly', '/api/weekly-comparison/'),
+    ('performance.monthly', '/api/monthly-comparison/'),
+    ('performance.dashboard', '/api/performance-dashboard/'),
+]
+
+
+def seed_tenant(**options):
+    """
+    Create a synthetic tenant. All randomness comes from `seed`, so the same
+    options always produce the same data. Returns a context dict with the
+    ids needed by the endpoint placeholders.
+    """
+    spec = {**DEFAULT_TENANT, **{k: v for k, v in options.items() if v is not None}}
+    rng = random.Random(spec['seed'])
+    today = timezone.now().date()
+    password = make_password('benchmark')
+
+    departments = Department.objects.bulk_create([
+        Department(name=f'Bench Dept {i}') for i in range(spec['departments'])
+    ])
+
+    # Users: one admin plus a hierarchy of `depth` levels
+    admin = User.objects.create(email='bench.admin@bench.local', role='ADMIN', password=password,
+                                employee_name='Bench Admin')
+    levels = HIERARCHY_ROLES[-spec['depth']:]
+    # Top level is ~1/15th of the tenant, each level below ~3x wider, the last level takes the rest
+    counts = []
+    width = max(1, (spec['users'] - 1) // 15)
+    for _ in levels[:-1]:
+        counts.append(width)
+        width *= 3
+    counts.append(max(1, spec['users'] - 1 - sum(counts)))
+
+    parents = [None]
+    users_by_role = {'ADMIN': [admin]}
+    for role, count in zip(levels, counts):
+        User.objects.bulk_create([
+            User(
+                email=f'bench.{role.lower()}.{i}@bench.local',
+                role=role,
+                password=password,
+                employee_name=f'Bench {role.title()} {i}',
+                department=departments[i % len(departments)] if departments else None,
+                team_lead=parents[i % len(parents)],
+            )
+            for i in range(count)
+        ])
+        users_by_role[role] = list(User.objects.filter(role=role, email__endswith='@bench.local').order_by('id'))
+        parents = users_by_role[role]
+
+    workers = [u for role in levels for u in users_by_role[role]]
+
+    # Projects, tasks, assignees and milestones
+    Projects.objects.bulk_create([
+        Projects(
+            name=f'Bench Project {i}',
+            status=rng.choice(['ACTIVE', 'ACTIVE', 'COMPLETED', 'ON HOLD']),
+            project_lead=rng.choice(workers),
+            handled_by=rng.choice(workers),
+            created_by=admin,
+            start_date=today - timedelta(days=rng.randint(30, 365 * spec['years'])),
+            due_date=today + timedelta(days=rng.randint(-30, 180)),
+            description='Synthetic benchmark project',
+            working_hours=8,
+            duration=90,
+            planned_hours=0,
+            is_approved=True,
+        )
+        for i in range(spec['projects'])
+    ])
+    projects = list(Projects.objects.filter(name__startswith='Bench Project ').order_by('id'))
+
+    Task.objects.bulk_create([
+        Task(
+            title=f'Bench Task {p.id}-{j}',
+            project=p,
+            task_type=rng.choice(['STANDARD', 'STANDARD', 'ROUTINE']),
+            priority=rng.choice(['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']),
+            status=rng.choice(['PENDING', 'IN_PROGRESS', 'DONE']),
+            start_date=p.start_date,
+            due_date=p.start_date + timedelta(days=rng.randint(1, 120)),
+            planned_hours=rng.choice([4, 8, 16, 24]),
+        )
+        for p in projects for j in range(spec['tasks_per_project'])
+    ])
+    tasks = list(Task.objects.filter(project__in=projects).order_by('id'))
+    for task in tasks:
+        if task.status == 'DONE':
+            task.completed_at = task.due_date
+    Task.objects.bulk_update([t for t in tasks if t.completed_at], ['completed_at'], batch_size=500)
+
+    assignments = []
+    tasks_by_user = {}
+    for task in tasks:
+        for user in rng.sample(workers, k=min(len(workers), rng.randint(1, 3))):
+            assignments.append(TaskAssignee(task=task, user=user, role=rng.choice(['LEAD', 'DEV', 'BACKEND'])))
+            tasks_by_user.setdefault(user.id, []).append(task)
+    TaskAssignee.objects.bulk_create(assignments, batch_size=1000)
+
+    SubTask.objects.bulk_create([
+        SubTask(
+            task=task,
+            title=f'Milestone {k}',
+            status='DONE' if task.status == 'DONE' else rng.choice(['PENDING', 'DONE']),
+            due_date=task.due_date,
+        )
+        for task in tasks for k in range(spec['subtasks_per_task'])
+    ], batch_size=1000)
+
+    for project in projects:
+        project.assignees.set(rng.sample(workers, k=min(len(workers), 3)))
+
+    # bulk_create bypasses the maintained project totals
+    totals = dict(
+        Task.objects.filter(project__in=projects).values('project_id')
+        .annotate(total=models.Sum('planned_hours')).values_list('project_id', 'total')
+    )
+    for project in projects:
+        project.allocated_planned_hours = totals.get(project.id) or 0
+        project.planned_hours = project.allocated_planned_hours
+    Projects.objects.bulk_update(projects, ['allocated_planned_hours', 'planned_hours'], batch_size=500)
+
+    # Catalog: one entry per assigned task
+    Catalog.objects.bulk_create([
+        Catalog(user_id=user_id, name=task.title, catalog_type='TASK', task=task, project=task.project)
+        for user_id, user_tasks in tasks_by_user.items() for task in user_tasks
+    ], batch_size=1000)
+    catalog_by_user = {}
+    for catalog in Catalog.objects.filter(user__in=workers).only('id', 'user_id'):
+        catalog_by_user.setdefault(catalog.user_id, []).append(catalog.id)
+
+    # Plans and activity logs over `years` of working days
+    tz = timezone.get_current_timezone()
+    start = today - timedelta(days=365 * spec['years'])
+    plans = []
+    day = start
+    while day <= today:
+        if day.weekday() < 5:
+            for user in workers:
+                items = catalog_by_user.get(user.id)
+                if not items:
+                    continue
+                for order in range(spec['plans_per_day']):
+                    plans.append(TodayPlan(
+                        user=user,
+                        catalog_item_id=rng.choice(items),
+                        plan_date=day,
+                        planned_duration_minutes=rng.choice([30, 60, 90, 120]),
+                        quadrant=rng.choice(['Q1', 'Q2', 'Q3', 'Q4']),
+                        order_index=order,
+                        status='COMPLETED' if day < today else 'PLANNED',
+                    ))
+        day += timedelta(days=1)
+    TodayPlan.objects.bulk_create(plans, batch_size=2000)
+
+    logs = []
+    for plan in TodayPlan.objects.filter(user__in=workers, plan_date__lt=today).only(
+            'id', 'user_id', 'plan_date', 'order_index', 'planned_duration_minutes').iterator(chunk_size=2000):
+        started = timezone.make_aware(datetime.combine(plan.plan_date, dt_time(9 + plan.order_index * 2)), tz)
+        minutes = max(5, int(plan.planned_duration_minutes * rng.uniform(0.5, 1.3)))
+        logs.append(ActivityLog(
+            today_plan_id=plan.id,
+            user_id=plan.user_id,
+            actual_start_time=started,
+            actual_end_time=started + timedelta(minutes=minutes),
+            minutes_worked=minutes,
+            hours_worked=round(minutes / 60, 2),
+            status='COMPLETED',
+            is_task_completed=True,
+        ))
+        if len(logs) >= 2000:
+            ActivityLog.objects.bulk_create(logs)
+            logs = []
+    ActivityLog.objects.bulk_create(logs)
+
+    Catalog.bulk_calculate_progress(Catalog.objects.filter(user__in=workers))
+    # bulk_create bypasses the visibility signals and TodayPlan.save(), which links plans to tasks
+    rebuild_visibility()
+    relink_plans(TodayPlan.objects.filter(user__in=workers))
+
+    return {
+        'spec': spec,
+        'users': {role: members[0].id for role, members in users_by_role.items() if members},
+        'project_id': projects[0].id if projects else 0,
+        'member_id': users_by_role[levels[-1]][0].id,
+        'today': today.isoformat(),
+        'month_start': today.replace(day=1).isoformat(),
+    }
+
+
+def _percentile(samples, pct):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[pct - 1]
+
+
+def measure(client, url, iterations=5):
+    """Run one endpoint `iterations` times; returns the metrics dict"""
+    # Warm-up run (URL resolution, caches) also records the query count
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    queries = len(ctx.captured_queries)
+
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    client.get(url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'queries': queries,
+        'bytes': len(getattr(response, 'content', b'') or b''),
+        'p50_ms': round(_percentile(timings, 50), 2),
+        'p95_ms': round(_percentile(timings, 95), 2),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(context, roles=None, iterations=5, endpoints=None, only=None):
+    """Benchmark every endpoint as each role. Returns {'<role> <endpoint>': metrics}"""
+    from rest_framework.test import APIClient
+
+    results = {}
+    for role in roles or ['ADMIN', 'MANAGER', 'TEAMLEAD', 'EMPLOYEE']:
+        user_id = context['users'].get(role)
+        if not user_id:
+            continue
+        # Broken endpoints are recorded with their 500 status instead of aborting the run
+        client = APIClient(raise_request_exception=False)
+        client.force_authenticate(user=User.objects.get(id=user_id))
+        for name, url in endpoints or BENCHMARK_ENDPOINTS:
+            if only and not any(part in name for part in only):
+                continue
+            results[f'{role} {name}'] = measure(client, url.format(**context), iterations=iterations)
+    return results
+
+
+def compare_results(baseline, current, threshold=0.2, min_ms=2.0):
+    """
+    Compare a run against a baseline. A metric regresses when the query count
+    grows, or when p50/p95 latency or peak memory grow by more than
+    `threshold` (ratio) and, for latency, by at least `min_ms`.
+    Returns a list of (key, metric, before, after) tuples.
+    """
+    regressions = []
+    for key, after in current.items():
+        before = baseline.get(key)
+        if not before:
+            continue
+        if after['queries'] > before['queries']:
+            regressions.append((key, 'queries', before['queries'], after['queries']))
+        for metric in ('p50_ms', 'p95_ms'):
+            if after[metric] > before[metric] * (1 + threshold) and after[metric] - before[metric] >= min_ms:
+                regressions.append((key, metric, before[metric], after[metric]))
+        if after['peak_kb'] > before['peak_kb'] * (1 + threshold):
+            regressions.append((key, 'peak_kb', before['peak_kb'], after['peak_kb']))
+    return regressions
+
+
+# ── Role scope forms ─────────────────────────────────────────────────────
+
+def distinct_project_scope(user, for_planner=False):
+    """Previous ProjectQuerySetMixin rules: OR-chain over fan-out joins + DISTINCT"""
+    queryset = Projects.objects.all()
+    if for_planner:
+        return queryset.filter(
+            Q(project_lead=user) | Q(handled_by=user) | Q(tasks__assignees__user=user)
+        ).distinct()
+    if user.role == 'ADMIN':
+        return queryset
+    if user.role == 'MANAGER':
+        subordinates = user.get_all_subordinates()
+        return queryset.filter(
+            Q(project_lead=user) | Q(handled_by=user) | Q(created_by=user) |
+            Q(project_lead__in=subordinates) | Q(handled_by__in=subordinates) | Q(created_by__in=subordinates)
+        ).distinct()
+    if user.role == 'TEAMLEAD':
+        team_members = user.get_team_members()
+        return queryset.filter(
+            Q(project_lead=user) | Q(handled_by=user) | Q(created_by=user) |
+            Q(project_lead__in=team_members) | Q(handled_by__in=team_members) | Q(created_by__in=team_members) |
+            Q(tasks__assignees__user__in=team_members)
+        ).distinct()
+    if user.role == 'EMPLOYEE':
+        return queryset.filter(
+            Q(project_lead=user) | Q(handled_by=user) | Q(assignees=user) | Q(tasks__assignees__user=user)
+        ).distinct()
+    return queryset.none()
+
+
+def distinct_task_scope(user, for_planner=False):
+    """Previous TaskQuerySetMixin rules: OR-chain over fan-out joins + DISTINCT"""
+    queryset = Task.objects.all()
+    if for_planner:
+        return queryset.filter(assignees__user=user).distinct()
+    if user.role == 'ADMIN':
+        return queryset
+    if user.role == 'MANAGER':
+        subordinates = user.get_all_subordinates()
+        return queryset.filter(
+            Q(assignees__user=user) | Q(project__project_lead=user) | Q(project__handled_by=user) |
+            Q(assignees__user__in=subordinates) | Q(project__project_lead__in=subordinates)
+        ).distinct()
+    if user.role == 'TEAMLEAD':
+        team_members = user.get_team_members()
+        return queryset.filter(
+            Q(assignees__user=user) | Q(project__project_lead=user) | Q(assignees__user__in=team_members)
+        ).distinct()
+    if user.role == 'EMPLOYEE':
+        return queryset.filter(
+            Q(assignees__user=user) | Q(project__assignees=user) |
+            Q(project__project_lead=user) | Q(project__handled_by=user)
+        ).distinct()
+    return queryset.none()
+
+
+def builder_project_scope(user, for_planner=False):
+    """Same rules compiled by the scope builder: id__in semi-joins, no DISTINCT"""
+    queryset = Projects.objects.all()
+    if for_planner:
+        return queryset.filter(project_involvement(user, ('lead', 'handler', 'task')))
+    if user.role == 'ADMIN':
+        return queryset
+    if user.role == 'MANAGER':
+        return queryset.filter(any_of(
+            project_involvement(user, ('lead', 'handler', 'creator')),
+            project_involvement(user.get_all_subordinates(), ('lead', 'handler', 'creator')),
+        ))
+    if user.role == 'TEAMLEAD':
+        return queryset.filter(any_of(
+            project_involvement(user, ('lead', 'handler', 'creator')),
+            project_involvement(user.get_team_members(), ('lead', 'handler', 'creator', 'task')),
+        ))
+    if user.role == 'EMPLOYEE':
+        return queryset.filter(project_involvement(user, ('lead', 'handler', 'member', 'task')))
+    return queryset.none()
+
+
+def builder_task_scope(user, for_planner=False):
+    """Same rules compiled by the scope builder: id__in semi-joins, no DISTINCT"""
+    queryset = Task.objects.all()
+    if for_planner:
+        return queryset.filter(assigned_tasks(user))
+    if user.role == 'ADMIN':
+        return queryset
+    if user.role == 'MANAGER':
+        subordinates = user.get_all_subordinates()
+        return queryset.filter(any_of(
+            assigned_tasks([user] + list(subordinates)),
+            project_involvement(user, ('lead', 'handler'), prefix='project__'),
+            project_involvement(subordinates, ('lead',), prefix='project__'),
+        ))
+    if user.role == 'TEAMLEAD':
+        return queryset.filter(any_of(
+            assigned_tasks([user] + list(user.get_team_members())),
+            project_involvement(user, ('lead',), prefix='project__'),
+        ))
+    if user.role == 'EMPLOYEE':
+        return queryset.filter(any_of(
+            assigned_tasks(user),
+            project_involvement(user, ('member', 'lead', 'handler'), prefix='project__'),
+        ))
+    return queryset.none()
+
+
+class _ScopeRequest:
+    def __init__(self, user, for_planner):
+        self.user = user
+        self.query_params = {'for_planner': 'true'} if for_planner else {}
+
+
+class _ProjectScopeView(ProjectQuerySetMixin):
+    queryset = Projects.objects.all()
+
+    def __init__(self, request):
+        self.request = request
+
+
+class _TaskScopeView(TaskQuerySetMixin):
+    queryset = Task.objects.all()
+
+    def __init__(self, request):
+        self.request = request
+
+
+def acl_project_scope(user, for_planner=False):
+    """What ProjectQuerySetMixin returns now (ProjectVisibility semi-join)"""
+    return _ProjectScopeView(_ScopeRequest(user, for_planner)).get_queryset()
+
+
+def acl_task_scope(user, for_planner=False):
+    """What TaskQuerySetMixin returns now"""
+    return _TaskScopeView(_ScopeRequest(user, for_planner)).get_queryset()
+
+
+SCOPE_FORMS = {
+    'distinct': (distinct_project_scope, distinct_task_scope),
+    'builder': (builder_project_scope, builder_task_scope),
+    'acl': (acl_project_scope, acl_task_scope),
+}
+
+
+def _time(fn, iterations):
+    fn()  # warm-up
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(_percentile(timings, 50), 2)
+
+
+def compare_scope_forms(context, roles=None, iterations=5, page_size=8):
+    """
+    For each role, time count() and the first page of the project and task
+    scopes in every SCOPE_FORMS form. Returns {'<role> <scope>': {form: metrics}}
+    where metrics has count_ms, page_ms, rows and `same` (rows equal the
+    distinct form).
+    """
+    results = {}
+    for role in roles or ['ADMIN', 'MANAGER', 'TEAMLEAD', 'EMPLOYEE']:
+        user_id = context['users'].get(role)
+        if not user_id:
+            continue
+        user = User.objects.get(id=user_id)
+        for for_planner in (False, True):
+            for index, scope in enumerate(('projects', 'tasks')):
+                key = f'{role} {scope}{" planner" if for_planner else ""}'
+                reference = None
+                results[key] = {}
+                for form, builders in SCOPE_FORMS.items():
+                    build = builders[index]
+                    ids = set(build(user, for_planner).values_list('id', flat=True))
+                    if reference is None:
+                        reference = ids
+                    results[key][form] = {
+                        'count_ms': _time(lambda: build(user, for_planner).count(), iterations),
+                        'page_ms': _time(lambda: list(build(user, for_planner).order_by('-id')[:page_size]), iterations),
+                        'rows': len(ids),
+                        'same': ids == reference,
+                    }
+    return results
+
+
+# ── Renderers ────────────────────────────────────────────────────────────
+
+# The largest responses: nested analytics dicts of floats, dates and Decimals
+RENDERER_ENDPOINTS = [
+    ('dashboard.project_work_stats', '/api/dashboard/project-work-stats/'),
+    ('projects.all', '/api/projects/?all_projects=true'),
+    ('tasks', '/api/tasks/'),
+    ('today_plan.month_view', '/api/today-plan/month_view/'),
+    ('activity_log', '/api/activity-log/'),
+    ('team_overview.member_dashboard', '/api/team-overview/member_dashboard/?member_id={member_id}'),
+    ('performance.monthly', '/api/monthly-comparison/'),
+    ('performance.range', '/api/daily-performance/range/{month_start}/{today}/'),
+]
+
+
+def compare_renderers(context, roles=None, iterations=20, endpoints=None, only=None):
+    """
+    Fetch each endpoint once per role and render its data with JSONRenderer and
+    FastJSONRenderer. Returns {'<role> <endpoint>': {renderer: metrics}} where
+    metrics has p50_ms, bytes and `same` (decodes to the stock renderer's JSON).
+    """
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.test import APIClient
+
+    from .renderers import FastJSONRenderer
+
+    renderers = {'json': JSONRenderer(), 'fast': FastJSONRenderer()}
+    results = {}
+    for role in roles or ['ADMIN', 'MANAGER', 'TEAMLEAD', 'EMPLOYEE']:
+        user_id = context['users'].get(role)
+        if not user_id:
+            continue
+        client = APIClient(raise_request_exception=False)
+        client.force_authenticate(user=User.objects.get(id=user_id))
+        for name, url in endpoints or RENDERER_ENDPOINTS:
+            if only and not any(part in name for part in only):
+                continue
+            response = client.get(url.format(**context))
+            data = getattr(response, 'data', None)
+            if response.status_code != 200 or data is None:
+                continue
+            reference = None
+            results[f'{role} {name}'] = {}
+            for renderer_name, renderer in renderers.items():
+                body = renderer.render(data, 'application/json', {})
+                decoded = json.loads(body)
+                if reference is None:
+                    reference = decoded
+                results[f'{role} {name}'][renderer_name] = {
+                    'p50_ms': _time(lambda: renderer.render(data, 'application/json', {}), iterations),
+                    'bytes': len(body),
+                    'same': decoded == reference,
+                }
+    return results
+
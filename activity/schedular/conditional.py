@@ -0,0 +1,240 @@
+"""
+Conditional GET for read-heavy endpoints
+
+Clients poll notifications, today's plan, their catalog, the Gantt view, the
+current day session and the analytics charts, and usually get back what they
+already have. @conditional(endpoint, stamp) puts an ETag on those responses;
+`stamp(view, request, *args, **kwargs)` computes a cheap validator for the
+data behind the response - an aggregate or a few narrow columns, read with one
+or two indexed queries - and a request whose If-None-Match still matches is
+answered 304 Not Modified before the serializers or aggregations run.
+
+The ETag is a digest of the stamp, the user, the full path (query string
+included) and the negotiated renderer. Stamps are always recomputed from the
+database, so a write that bypasses signals (queryset.update(), bulk_update)
+cannot leave a stale ETag behind, as long as every column the response shows
+is covered by the stamp. Responses that depend on the clock (relative times,
+overdue flags) put the minute or the date in their stamp.
+
+Last-Modified is sent where the stamp knows it, for information only:
+deletions and same-second writes do not move it, so only If-None-Match
+revalidates.
+
+Per-endpoint hit rates and the estimated bytes / time saved are kept in
+process (like the HRM client metrics) and served by
+GET /api/conditional-get/metrics/.
+"""
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import ActivityLog, Catalog, DailyPlanner, DaySession, Notification, SubTask, Task, TaskAssignee, TodayPlan
+
+_lock = threading.Lock()
+_metrics = defaultdict(lambda: {
+    'requests': 0, 'revalidations': 0, 'not_modified': 0,
+    'stamp_ms': 0.0, 'view_ms': 0.0, 'full_responses': 0, 'full_bytes': 0,
+})
+
+
+def digest(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def make_etag(endpoint, request, key):
+    renderer = getattr(getattr(request, 'accepted_renderer', None), 'format', None)
+    return f'W/"{digest(endpoint, request.user.pk, request.get_full_path(), renderer, key)[:32]}"'
+
+
+def conditional(endpoint, stamp):
+    """
+    Decorator for GET view methods (below @action). `stamp(view, request, *args, **kwargs)`
+    returns (key, last_modified) - last_modified may be None - or None to skip validation.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not getattr(settings, 'CONDITIONAL_GET_ENABLED', True):
+                return method(view, request, *args, **kwargs)
+
+            started = time.monotonic()
+            validator = stamp(view, request, *args, **kwargs)
+            stamped = time.monotonic()
+            if validator is None:
+                return method(view, request, *args, **kwargs)
+
+            key, last_modified = validator
+            etag = make_etag(endpoint, request, key)
+            revalidating = bool(request.META.get('HTTP_IF_NONE_MATCH'))
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                _record(endpoint, revalidating, stamp_ms=(stamped - started) * 1000, not_modified=True)
+            else:
+                response = method(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                _record(endpoint, revalidating, stamp_ms=(stamped - started) * 1000,
+                        view_ms=(time.monotonic() - stamped) * 1000)
+                if hasattr(response, 'add_post_render_callback'):
+                    response.add_post_render_callback(lambda rendered: _record_size(endpoint, len(rendered.content)))
+
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified.timestamp())
+            # Cacheable by the client only, and always revalidated
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+# ── Metrics ──────────────────────────────────────────────────────────────
+
+def _record(endpoint, revalidating, stamp_ms, view_ms=None, not_modified=False):
+    with _lock:
+        stats = _metrics[endpoint]
+        stats['requests'] += 1
+        stats['revalidations'] += int(revalidating)
+        stats['not_modified'] += int(not_modified)
+        stats['stamp_ms'] += stamp_ms
+        if view_ms is not None:
+            stats['view_ms'] += view_ms
+
+
+def _record_size(endpoint, size):
+    with _lock:
+        stats = _metrics[endpoint]
+        stats['full_responses'] += 1
+        stats['full_bytes'] += size
+
+
+def metrics():
+    """Per-endpoint hit rates, average costs and the estimated savings of 304s"""
+    result = {}
+    with _lock:
+        for endpoint, stats in _metrics.items():
+            full = stats['requests'] - stats['not_modified']
+            avg_view_ms = stats['view_ms'] / full if full else None
+            avg_bytes = stats['full_bytes'] / stats['full_responses'] if stats['full_responses'] else None
+            result[endpoint] = {
+                'requests': stats['requests'],
+                'revalidations': stats['revalidations'],
+                'not_modified': stats['not_modified'],
+                'hit_rate': round(stats['not_modified'] / stats['requests'], 3) if stats['requests'] else None,
+                'revalidation_hit_rate': (
+                    round(stats['not_modified'] / stats['revalidations'], 3) if stats['revalidations'] else None
+                ),
+                'avg_stamp_ms': round(stats['stamp_ms'] / stats['requests'], 2) if stats['requests'] else None,
+                'avg_view_ms': round(avg_view_ms, 2) if avg_view_ms is not None else None,
+                'avg_body_bytes': round(avg_bytes) if avg_bytes is not None else None,
+                'est_bytes_saved': round(stats['not_modified'] * avg_bytes) if avg_bytes is not None else None,
+                'est_ms_saved': round(stats['not_modified'] * avg_view_ms, 1) if avg_view_ms is not None else None,
+            }
+    return result
+
+
+def reset_metrics():
+    with _lock:
+        _metrics.clear()
+
+
+# ── Stamps ───────────────────────────────────────────────────────────────
+
+def _rows(queryset, *fields):
+    rows = list(queryset.order_by().values_list(*fields))
+    return sorted(rows, key=lambda row: row[0]), max((row[1] for row in rows if row[1]), default=None)
+
+
+def notifications(view, request, *args, **kwargs):
+    """list / unread / unread_count. time_ago is relative, so the stamp also turns over every minute."""
+    stats = Notification.objects.filter(user=request.user).aggregate(
+        count=Count('id'),
+        last=Max('id'),
+        unread=Count('id', filter=Q(is_read=False)),
+        unread_ids=Sum('id', filter=Q(is_read=False)),
+        newest=Max('created_at'),
+    )
+    minute = timezone.now().replace(second=0, microsecond=0)
+    return (stats['count'], stats['last'], stats['unread'], stats['unread_ids'], minute), stats['newest']
+
+
+def today_plan(view, request, *args, **kwargs):
+    """today-plan/today: the day's plans and the catalog items nested in them"""
+    if not request.user.is_authenticated:
+        return None
+    today = timezone.now().date()
+    rows, last_modified = _rows(
+        TodayPlan.objects.filter(user=request.user, plan_date=today),
+        'id', 'updated_at', 'catalog_item__updated_at', 'catalog_item__project__name', 'catalog_item__task__title',
+    )
+    return (today, rows), last_modified
+
+
+def my_catalog(view, request, *args, **kwargs):
+    rows, last_modified = _rows(
+        Catalog.objects.filter(user=request.user, is_active=True),
+        'id', 'updated_at', 'project__name', 'task__title',
+    )
+    return rows, last_modified
+
+
+def gantt(view, request, *args, **kwargs):
+    """projects/{id}/gantt-view: tasks, assignees and subtask progress; overdue flags depend on the date"""
+    project = view.get_object()
+    tasks = sorted(Task.objects.filter(project=project).values_list(
+        'id', 'title', 'start_date', 'due_date', 'status', 'priority', 'completed_at'
+    ))
+    assignees = sorted(TaskAssignee.objects.filter(task__project=project).values_list(
+        'task_id', 'id', 'user__email', 'role'
+    ))
+    progress = sorted(
+        SubTask.objects.filter(task__project=project).order_by().values('task_id')
+        .annotate(count=Count('id'), done=Count('id', filter=Q(status='DONE')))
+        .values_list('task_id', 'count', 'done')
+    )
+    return (project.name, timezone.now().date(), tasks, assignees, progress), None
+
+
+def current_session(view, request, *args, **kwargs):
+    today = timezone.now().date()
+    session = DaySession.objects.filter(user=request.user, session_date=today).values_list('id', 'updated_at').first()
+    return (today, session), session[1] if session else None
+
+
+def daily_analytics(view, request, *args, **kwargs):
+    """analytics/daily: the user's DailyPlanner rows in the window ending today"""
+    try:
+        user_id = int(request.query_params.get('user_id', request.user.id))
+    except (TypeError, ValueError):
+        return None
+    stats = DailyPlanner.objects.filter(user_id=user_id).aggregate(count=Count('id'), last=Max('updated_at'))
+    return (timezone.localdate(), stats['count'], stats['last']), stats['last']
+
+
+def project_bars(view, request, pk=None, *args, **kwargs):
+    """analytics/{id}/project-bars: task planned hours and logged hours per task (Task.get_achieved_hours)"""
+    tasks = sorted(Task.objects.filter(project_id=pk).values_list('id', 'title', 'planned_hours'))
+    if not tasks:
+        return None
+    achieved = sorted(
+        ActivityLog.objects.filter(today_plan__catalog_item__task__project_id=pk).order_by()
+        .values('today_plan__catalog_item__task_id').annotate(total=Sum('hours_worked'))
+        .values_list('today_plan__catalog_item__task_id', 'total')
+    )
+    return (tasks, achieved), None
+
+
+def completion_chart(view, request, *args, **kwargs):
+    """project- / task-completion-chart: the completed rows in scope and their completion dates"""
+    queryset, start_date, end_date = view.completion_scope(request)
+    user = request.user
+    rows = sorted(queryset.values_list('id', 'actual_completion_date'))
+    return (start_date, end_date, user.role, user.hrm_department, rows), None
@@ -1,38 +1,59 @@
+import asyncio
 import json
+from datetime import datetime, timezone as dt_timezone
 from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 
+from . import live, timers
+from .auth_context import AuthContext
+from .models import Notification
+from .user_cache import aget_cached_user
+
 User = get_user_model()
 
 
+async def authenticate_scope(scope):
+    """Session user, or the user of the ?token= access token; None if unauthenticated or deactivated"""
+    user = scope["user"]
+    
+    # Try to authenticate with token in query string if anonymous
+    if user.is_anonymous:
+        try:
+            query_string = scope['query_string'].decode()
+            params = parse_qs(query_string)
+            token = params.get('token', [None])[0]
+            
+            if token:
+                access_token = AccessToken(token)
+                user_id = access_token['user_id']
+                user = await aget_cached_user(user_id)
+        except (InvalidToken, TokenError, User.DoesNotExist):
+            return None
+    
+    # Reject connection if still unauthenticated (or deactivated)
+    if user.is_anonymous or not user.is_active:
+        return None
+    return user
+
+
 class NotificationConsumer(AsyncWebsocketConsumer):
-    """WebSocket consumer for real-time notifications"""
+    """
+    WebSocket consumer for real-time notifications
+
+    All database access uses Django's async ORM, and the user (with its
+    department) is loaded once at connect.
+    """
     
     async def connect(self):
         """Handle WebSocket connection"""
-        self.user = self.scope["user"]
-        
-        # Try to authenticate with token in query string if anonymous
-        if self.user.is_anonymous:
-            try:
-                query_string = self.scope['query_string'].decode()
-                params = parse_qs(query_string)
-                token = params.get('token', [None])[0]
-                
-                if token:
-                    access_token = AccessToken(token)
-                    user_id = access_token['user_id']
-                    self.user = await database_sync_to_async(User.objects.get)(id=user_id)
-            except (InvalidToken, TokenError, User.DoesNotExist):
-                await self.close()
-                return
-        
-        # Reject connection if still unauthenticated
-        if self.user.is_anonymous:
+        self.user = await authenticate_scope(self.scope)
+        if self.user is None:
             await self.close()
             return
         
@@ -52,8 +73,8 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 
         # Department-based group if available
         self.dept_group_name = None
-        if hasattr(self.user, 'department') and self.user.department:
-            self.dept_group_name = f'notifications_dept_{self.user.department.id}'
+        if getattr(self.user, 'department_id', None):
+            self.dept_group_name = f'notifications_dept_{self.user.department_id}'
             await self.channel_layer.group_add(
                 self.dept_group_name,
                 self.channel_name
@@ -97,14 +118,22 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             action = data.get('action')
             
             if action == 'mark_read':
-                # Mark notification as read
+                # Mark one notification ('notification_id') or a batch ('notification_ids') as read
                 notification_id = data.get('notification_id')
+                notification_ids = data.get('notification_ids')
                 if notification_id:
-                    await self.mark_notification_read(notification_id)
+                    await self.mark_notifications_read([notification_id])
                     await self.send(text_data=json.dumps({
                         'type': 'marked_read',
                         'notification_id': notification_id
                     }))
+                elif isinstance(notification_ids, list) and notification_ids:
+                    updated = await self.mark_notifications_read(notification_ids)
+                    await self.send(text_data=json.dumps({
+                        'type': 'marked_read',
+                        'notification_ids': notification_ids,
+                        'updated': updated
+                    }))
             
             elif action == 'get_unread_count':
                 # Send current unread count
@@ -135,26 +164,160 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             'count': event['count']
         }))
     
-    @database_sync_to_async
-    def get_unread_count(self):
+    async def hrm_sync_progress(self, event):
+        """Send HRM sync job progress to WebSocket client"""
+        await self.send(text_data=json.dumps({
+            'type': 'hrm_sync_progress',
+            'job': event['job']
+        }))
+    
+    async def get_unread_count(self):
         """Get count of unread notifications for the user"""
-        from .models import Notification
-        return Notification.objects.filter(
-            user=self.user,
+        return await Notification.objects.filter(
+            user_id=self.user.id,
+            is_read=False
+        ).acount()
+    
+    async def mark_notifications_read(self, notification_ids):
+        """Mark the user's unread notifications among `notification_ids` as read in one UPDATE"""
+        ids = [int(i) for i in notification_ids if str(i).isdigit()]
+        if not ids:
+            return 0
+        return await Notification.objects.filter(
+            id__in=ids,
+            user_id=self.user.id,
             is_read=False
-        ).count()
+        ).aupdate(is_read=True)
+
+
+class DashboardConsumer(AsyncWebsocketConsumer):
+    """
+    WebSocket consumer pushing live dashboard deltas (see live.py)
+
+    Client messages:
+        {"action": "subscribe", "topics": ["activity", "tasks", "approvals", "timers"]}
+        {"action": "unsubscribe", "topics": ["tasks"]}
+    Server messages:
+        {"type": "dashboard_deltas", "deltas": [{"topic", "key", "data"}, ...]}
+        {"type": "timers", "timers": [...]}  every TIMER_TICK_INTERVAL seconds while
+        subscribed to 'timers' (running sessions from the timer registry, see timers.py)
+    """
+    
+    TICK_TOPICS = ('timers',)
+    
+    async def connect(self):
+        """Handle WebSocket connection"""
+        self.user = await authenticate_scope(self.scope)
+        if self.user is None:
+            await self.close()
+            return
+        
+        self.topics = set()
+        self.pending = {}
+        self.flush_task = None
+        self.tick_task = None
+        # Users whose changes this subscriber may see (None: everyone)
+        self.audience = await sync_to_async(self.load_audience)()
+        await self.accept()
+    
+    def load_audience(self):
+        scope_user_ids = AuthContext(self.user).scope_user_ids
+        return None if scope_user_ids is None else set(scope_user_ids)
     
-    @database_sync_to_async
-    def mark_notification_read(self, notification_id):
-        """Mark a notification as read"""
-        from .models import Notification
+    async def disconnect(self, close_code):
+        """Handle WebSocket disconnection"""
+        for topic in getattr(self, 'topics', ()):
+            if topic not in self.TICK_TOPICS:
+                await self.channel_layer.group_discard(live.topic_group(topic), self.channel_name)
+        for task in (getattr(self, 'flush_task', None), getattr(self, 'tick_task', None)):
+            if task:
+                task.cancel()
+    
+    async def receive(self, text_data):
+        """Handle subscribe / unsubscribe messages"""
         try:
-            notification = Notification.objects.get(
-                id=notification_id,
-                user=self.user
-            )
-            notification.is_read = True
-            notification.save()
-            return True
-        except Notification.DoesNotExist:
-            return False
+            data = json.loads(text_data)
+        except json.JSONDecodeError:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Invalid JSON'
+            }))
+            return
+        
+        action = data.get('action')
+        topics = data.get('topics') or []
+        if not isinstance(topics, list):
+            topics = [topics]
+        unknown = [t for t in topics if t not in live.TOPICS + self.TICK_TOPICS]
+        if action not in ('subscribe', 'unsubscribe') or unknown:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': f'Unknown action or topics: {unknown or action}',
+                'topics': list(live.TOPICS + self.TICK_TOPICS)
+            }))
+            return
+        
+        for topic in topics:
+            if action == 'subscribe' and topic not in self.topics:
+                if topic == 'timers':
+                    self.tick_task = asyncio.ensure_future(self.tick_timers())
+                else:
+                    await self.channel_layer.group_add(live.topic_group(topic), self.channel_name)
+                self.topics.add(topic)
+            elif action == 'unsubscribe' and topic in self.topics:
+                if topic == 'timers':
+                    self.tick_task.cancel()
+                    self.tick_task = None
+                else:
+                    await self.channel_layer.group_discard(live.topic_group(topic), self.channel_name)
+                self.topics.discard(topic)
+        
+        await self.send(text_data=json.dumps({
+            'type': 'subscribed',
+            'topics': sorted(self.topics)
+        }))
+    
+    async def dashboard_delta(self, event):
+        """Queue a delta from the topic group, keeping only the latest state per row"""
+        if event['topic'] not in self.topics:
+            return
+        if self.audience is not None and self.user.role not in event['roles'] \
+                and not self.audience.intersection(event['user_ids']):
+            return
+        self.pending[(event['topic'], event['key'])] = event['data']
+        if self.flush_task is None:
+            self.flush_task = asyncio.ensure_future(self.flush_later())
+    
+    async def flush_later(self):
+        await asyncio.sleep(getattr(settings, 'DASHBOARD_PUSH_INTERVAL', 2))
+        pending, self.pending, self.flush_task = self.pending, {}, None
+        if pending:
+            await self.send(text_data=json.dumps({
+                'type': 'dashboard_deltas',
+                'deltas': [
+                    {'topic': topic, 'key': key, 'data': data}
+                    for (topic, key), data in pending.items()
+                ]
+            }))
+    
+    async def tick_timers(self):
+        """Send the running sessions in the subscriber's scope at TIMER_TICK_INTERVAL"""
+        while True:
+            sessions = await sync_to_async(timers.registry.for_users)(self.audience)
+            now = timezone.now()
+            await self.send(text_data=json.dumps({
+                'type': 'timers',
+                'timers': [
+                    {
+                        'activity_log_id': session.id,
+                        'user_id': session.user_id,
+                        'today_plan_id': session.today_plan_id,
+                        'task_id': session.task_id,
+                        'project_id': session.project_id,
+                        'started_at': datetime.fromtimestamp(session.started_at, dt_timezone.utc).isoformat(),
+                        'elapsed_seconds': int(timers.registry.elapsed_seconds(session, now)),
+                    }
+                    for session in sessions
+                ]
+            }))
+            await asyncio.sleep(getattr(settings, 'TIMER_TICK_INTERVAL', 5))
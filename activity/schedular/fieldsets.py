@@ -0,0 +1,122 @@
+"""
+Sparse fieldsets for read endpoints (?fields= / ?expand=)
+
+List screens rarely show everything the serializers return: TodayPlanSerializer
+nests the whole catalog item, ProjectDetailSerializer every task with its
+subtasks, assignees and progress. A GET request can name the fields it wants:
+
+    GET /api/tasks/?fields=id,title,status
+    GET /api/today-plan/today/?fields=id,status,catalog_item_details.name
+    GET /api/projects/?fields=id,name,tasks.id,tasks.title&expand=tasks.subtasks
+
+`fields` is the allowlist; dotted names select inside nested serializers
+(`tasks.title` keeps only the title of every task). `expand` adds fields,
+rendered in full, to that list, so a screen can keep one `fields` list and
+expand what it opens. Unknown names are ignored; without `fields` the
+response is unchanged.
+
+Fields that are not rendered cost nothing: they are dropped from the
+serializer, so their SerializerMethodFields (progress, assignees_list,
+overall_progress, ...) never run, and the queryset only loads the relations
+the remaining fields read. Serializers declare what a field reads in Meta:
+
+    field_select_related = {'project_name': ('project',)}
+    field_prefetch_related = {'progress': ('subtasks',)}
+
+nested serializers and many-to-many fields are followed on their own.
+
+Only GET / HEAD responses are pruned; writes validate and answer with the full
+serializer.
+"""
+from rest_framework import serializers
+
+
+def parse(value):
+    """'id,tasks.title,tasks.id' -> {'id': None, 'tasks': {'title': None, 'id': None}} (None: the whole field)"""
+    tree = {}
+    for path in (value or '').split(','):
+        names = [name.strip() for name in path.split('.') if name.strip()]
+        if names:
+            _add(tree, names)
+    return tree
+
+
+def _add(tree, names):
+    head, rest = names[0], names[1:]
+    if not rest:
+        tree[head] = None
+    elif head not in tree:
+        tree[head] = {}
+        _add(tree[head], rest)
+    elif tree[head] is not None:
+        _add(tree[head], rest)
+    # else: the whole field is already asked for
+
+
+def requested(request):
+    """The field tree asked for by a GET request, or None to render everything"""
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    return parse(f"{fields},{request.query_params.get('expand') or ''}") or None
+
+
+def _unwrap(serializer):
+    return serializer.child if isinstance(serializer, serializers.ListSerializer) else serializer
+
+
+def prune(serializer, tree):
+    """Drop every field of `serializer` (and of its nested serializers) that `tree` does not name"""
+    fields = _unwrap(serializer).fields
+    for name in list(fields):
+        if name not in tree:
+            fields.pop(name)
+        elif tree[name] and isinstance(fields[name], serializers.BaseSerializer):
+            prune(fields[name], tree[name])
+    return serializer
+
+
+def loading(serializer, prefix='', nested_in_prefetch=False):
+    """(select_related, prefetch_related) lookups for the fields `serializer` still renders"""
+    serializer = _unwrap(serializer)
+    meta = getattr(serializer, 'Meta', None)
+    selects = getattr(meta, 'field_select_related', {})
+    prefetches = getattr(meta, 'field_prefetch_related', {})
+    select, prefetch = set(), set()
+    # Below a prefetched relation every lookup is a prefetch
+    add_select = prefetch.add if nested_in_prefetch else select.add
+
+    for name, field in serializer.fields.items():
+        for lookup in selects.get(name, ()):
+            add_select(prefix + lookup)
+        for lookup in prefetches.get(name, ()):
+            prefetch.add(prefix + lookup)
+        if field.source == '*':
+            continue
+        source = field.source.replace('.', '__')
+        if isinstance(field, serializers.ListSerializer):
+            prefetch.add(prefix + source)
+            inner = loading(field, f'{prefix}{source}__', nested_in_prefetch=True)
+        elif isinstance(field, serializers.BaseSerializer):
+            add_select(prefix + source)
+            inner = loading(field, f'{prefix}{source}__', nested_in_prefetch)
+        elif isinstance(field, serializers.ManyRelatedField):
+            prefetch.add(prefix + source)
+            continue
+        else:
+            continue
+        select |= inner[0]
+        prefetch |= inner[1]
+    return select, prefetch
+
+
+def optimize(queryset, serializer):
+    """`queryset` with the relations `serializer` reads joined or prefetched, and no others"""
+    select, prefetch = loading(serializer)
+    if select:
+        queryset = queryset.select_related(*sorted(select))
+    if prefetch:
+        queryset = queryset.prefetch_related(*sorted(prefetch))
+    return queryset
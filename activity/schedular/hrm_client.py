@@ -0,0 +1,246 @@
+"""
+Shared HTTP client for the HRM backend
+
+Every HRM call (SSO status checks, profile fetches, employee sync, auto-login
+code validation, the status-check middleware and the sync/cleanup commands)
+goes through one pooled requests.Session, so connections are kept alive
+instead of opening a new TCP/TLS connection per call.
+
+Features:
+- bounded retries with jittered exponential backoff for transient failures
+- per-endpoint (connect, read) timeouts
+- TTL response cache with ETag revalidation (If-None-Match / 304)
+- per-endpoint latency and cache metrics
+
+TLS certificates are always verified, except for the auto-login code
+validation, which keeps its VERIFY_SSL_HRM switch.
+
+Errors are raised as the usual requests exceptions, so existing
+`except requests.exceptions.Timeout` handlers keep working.
+"""
+import logging
+import random
+import threading
+import time
+from collections import defaultdict, deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts per logical endpoint
+ENDPOINT_TIMEOUTS = {
+    'employee_status': (3, 5),
+    'employee_details': (3, 10),
+    'employees_active': (5, 30),
+    'validate_das_code': (3, 15),
+    'default': (3, 10),
+}
+
+RETRY_STATUSES = {502, 503, 504}
+LATENCY_SAMPLES = 200
+
+
+def _connect_failed(exc):
+    """True when the request never reached HRM, so even a POST is safe to resend"""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], 'reason', None) if exc.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class HRMClient:
+    """Pooled, retrying, caching client for one HRM base URL"""
+
+    def __init__(self, base_url=None, verify=True, max_retries=None, backoff=0.2,
+                 pool_size=10, cache_ttl=None):
+        base_url = base_url or getattr(settings, 'HRM_BASE_URL', 'http://localhost:8001')
+        self.base_url = base_url.rstrip('/')
+        self.verify = verify
+        self.max_retries = getattr(settings, 'HRM_MAX_RETRIES', 2) if max_retries is None else max_retries
+        self.backoff = backoff
+        self.cache_ttl = getattr(settings, 'HRM_CACHE_TTL', 60) if cache_ttl is None else cache_ttl
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'User-Agent': 'DAS-Backend/1.0', 'Accept': 'application/json'})
+
+        self._cache = {}  # key -> (expires_at, etag, response)
+        self._lock = threading.Lock()
+        self._metrics = defaultdict(lambda: {
+            'calls': 0, 'errors': 0, 'retries': 0,
+            'cache_hits': 0, 'revalidated': 0,
+            'latencies': deque(maxlen=LATENCY_SAMPLES),
+        })
+
+    # ── Core request path ───────────────────────────────────────────────
+
+    def url(self, path):
+        return f'{self.base_url}/{path.lstrip("/")}'
+
+    def request(self, method, path, endpoint='default', cache_ttl=0, revalidate=False, params=None, **kwargs):
+        """
+        Send a request to HRM and return the requests.Response.
+
+        GET responses with status 200 are cached for `cache_ttl` seconds; once
+        stale (or always, with `revalidate=True`) they are revalidated with
+        If-None-Match when HRM sent an ETag.
+        """
+        url = self.url(path)
+        key = None
+        cached = None
+        if method == 'GET' and cache_ttl:
+            key = (url, tuple(sorted((params or {}).items())))
+            with self._lock:
+                cached = self._cache.get(key)
+            if cached and not revalidate and cached[0] > time.monotonic():
+                self._record(endpoint, cache_hit=True)
+                return cached[2]
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if cached and cached[1]:
+            headers['If-None-Match'] = cached[1]
+
+        kwargs.setdefault('timeout', ENDPOINT_TIMEOUTS.get(endpoint, ENDPOINT_TIMEOUTS['default']))
+        kwargs.setdefault('verify', self.verify)
+
+        response = self._send(method, url, endpoint, params=params, headers=headers, **kwargs)
+
+        if key is not None:
+            if response.status_code == 304 and cached:
+                with self._lock:
+                    self._cache[key] = (time.monotonic() + cache_ttl, cached[1], cached[2])
+                self._record(endpoint, revalidated=True)
+                return cached[2]
+            if response.status_code == 200:
+                with self._lock:
+                    self._cache[key] = (time.monotonic() + cache_ttl, response.headers.get('ETag'), response)
+        return response
+
+    def _send(self, method, url, endpoint, **kwargs):
+        # Only idempotent requests are retried on a response; a POST is only
+        # retried when the connection could not be established at all.
+        idempotent = method in ('GET', 'HEAD', 'OPTIONS')
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt < self.max_retries and (idempotent or _connect_failed(e)):
+                    attempt += 1
+                    self._record(endpoint, retry=True)
+                    self._sleep(attempt)
+                    continue
+                self._record(endpoint, elapsed=time.perf_counter() - started, error=True)
+                logger.error(f'HRM {method} {url} failed after {attempt + 1} attempt(s): {str(e)}')
+                raise
+
+            if idempotent and response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                attempt += 1
+                self._record(endpoint, retry=True)
+                response.close()
+                self._sleep(attempt)
+                continue
+
+            self._record(endpoint, elapsed=time.perf_counter() - started, error=response.status_code >= 500)
+            return response
+
+    def _sleep(self, attempt):
+        # Full jitter: random delay in [0, backoff * 2^(attempt-1)]
+        time.sleep(random.uniform(0, self.backoff * (2 ** (attempt - 1))))
+
+    # ── Metrics and cache control ───────────────────────────────────────
+
+    def _record(self, endpoint, elapsed=None, error=False, retry=False, cache_hit=False, revalidated=False):
+        with self._lock:
+            stats = self._metrics[endpoint]
+            if retry:
+                stats['retries'] += 1
+                return
+            if revalidated:
+                # The 304 itself was already recorded as a network call
+                stats['revalidated'] += 1
+                return
+            stats['calls'] += 1
+            stats['errors'] += int(error)
+            stats['cache_hits'] += int(cache_hit)
+            if elapsed is not None:
+                stats['latencies'].append(elapsed * 1000)
+
+    def metrics(self):
+        """Per-endpoint counters plus p50/p95 latency (ms) of network calls"""
+        result = {}
+        with self._lock:
+            for endpoint, stats in self._metrics.items():
+                samples = sorted(stats['latencies'])
+                result[endpoint] = {
+                    'calls': stats['calls'],
+                    'errors': stats['errors'],
+                    'retries': stats['retries'],
+                    'cache_hits': stats['cache_hits'],
+                    'revalidated': stats['revalidated'],
+                    'p50_ms': round(samples[len(samples) // 2], 2) if samples else None,
+                    'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2) if samples else None,
+                }
+        return result
+
+    def reset_metrics(self):
+        with self._lock:
+            self._metrics.clear()
+
+    def invalidate(self, path=None):
+        """Drop cached responses, either all of them or those for one path"""
+        with self._lock:
+            if path is None:
+                self._cache.clear()
+                return
+            url = self.url(path)
+            for key in [k for k in self._cache if k[0] == url]:
+                del self._cache[key]
+
+    def close(self):
+        self.session.close()
+
+    # ── HRM endpoints ───────────────────────────────────────────────────
+
+    def employee_status(self, email, path='/root/api/check-employee-status/{email}/'):
+        """Active status of one employee, cached briefly since it is checked on every request"""
+        return self.request('GET', path.format(email=email), endpoint='employee_status',
+                            cache_ttl=self.cache_ttl)
+
+    def employee_details(self, email):
+        """Full HRM profile of one employee"""
+        return self.request('GET', f'/root/api/check-employee-status/{email}/', endpoint='employee_details',
+                            params={'full_details': 'true'})
+
+    def active_employees(self, path='/root/api/employees-active/'):
+        """All active employees; always revalidated, so an unchanged list costs only a 304"""
+        return self.request('GET', path, endpoint='employees_active', cache_ttl=self.cache_ttl,
+                            revalidate=True)
+
+    def validate_das_code(self, code, email):
+        """Validate a one-time auto-login code (never cached)"""
+        # The only call that honours VERIFY_SSL_HRM (off for local HRM servers with self-signed certificates)
+        return self.request('POST', '/api/validate-das-code/', endpoint='validate_das_code',
+                            json={'code': code, 'email': email},
+                            verify=getattr(settings, 'VERIFY_SSL_HRM', True))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_hrm_client(base_url=None):
+    """Return the process-wide HRMClient for `base_url` (default: settings.HRM_BASE_URL)"""
+    key = (base_url or getattr(settings, 'HRM_BASE_URL', 'http://localhost:8001')).rstrip('/')
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = HRMClient(base_url=key)
+        return client
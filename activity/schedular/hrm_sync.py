@@ -0,0 +1,221 @@
+"""
+Background HRM employee sync
+
+POST /api/sync-hrm-employees/sync/ only enqueues an HRMSyncJob and returns its
+id; the fetch-and-upsert runs outside the request, either on the in-process
+worker thread (HRM_SYNC_WORKER='thread', the default) or in a separate
+process via `python manage.py run_hrm_sync_jobs` (HRM_SYNC_WORKER='command').
+
+Progress is written to the job row every PROGRESS_EVERY employees and pushed to
+the requesting admin over the notifications WebSocket as `hrm_sync_progress`.
+
+At most one job is pending or running at a time: the hrmsyncjob_single_active
+constraint rejects a second one, so concurrent requests in any number of
+processes collapse onto the same job. Jobs left behind by a dead worker
+(running without progress, or never picked up) are failed after
+HRM_SYNC_STALE_MINUTES so they do not block new syncs.
+"""
+import logging
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from .hrm_client import get_hrm_client
+from .models import User, Employee, HRMSyncJob
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_EVERY = 25
+MAX_ERROR_DETAILS = 100
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='hrm-sync')
+
+
+def map_das_role(designation):
+    """Map an HRM designation to a DAS role"""
+    if designation == 'Admin':
+        return 'ADMIN'
+    if designation == 'HR':
+        return 'MANAGER'
+    return 'EMPLOYEE'
+
+
+def parse_date(date_str):
+    if date_str:
+        try:
+            return datetime.fromisoformat(date_str).date()
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def upsert_employee(emp_data):
+    """Create or update the DAS User and Employee for one HRM record. Returns True if created."""
+    email = emp_data.get('email')
+    hrm_designation = emp_data.get('designation')
+
+    user, created = User.objects.update_or_create(
+        email=email,
+        defaults={
+            'hrm_employee_id': emp_data.get('employee_Id'),
+            'employee_name': emp_data.get('full_name'),
+            'employee_type': emp_data.get('Employeement_Type'),
+            'designation': hrm_designation,
+            'hrm_department': emp_data.get('department'),
+            'role': map_das_role(hrm_designation),
+            'location': emp_data.get('work_location'),
+            'date_of_joining': emp_data.get('hired_date'),
+            'is_active_in_hrm': True,
+            'last_sync_time': timezone.now(),
+            'is_active': True,
+        }
+    )
+
+    # Set password for new users (they'll need to reset it)
+    if created:
+        user.set_password(secrets.token_urlsafe(16))
+        user.save()
+
+    Employee.objects.update_or_create(
+        user=user,
+        defaults={
+            'name': emp_data.get('full_name', ''),
+            'email': emp_data.get('email', ''),
+            'phone': emp_data.get('phone', ''),
+            'role': emp_data.get('designation', ''),
+            'department': emp_data.get('department', ''),
+            'employment_type': emp_data.get('Employeement_Type', ''),
+            'designation': emp_data.get('designation', ''),
+            'work_location': emp_data.get('work_location', ''),
+            'date_of_joining': parse_date(emp_data.get('hired_date')),
+            'date_of_birth': parse_date(emp_data.get('date_of_birth')),
+            'is_active': True,
+            'employee_status': 'active',
+            'employee_id': emp_data.get('employee_Id', ''),
+        }
+    )
+    return created
+
+
+def _publish(job):
+    """Push job progress to the admin who requested it"""
+    if not job.requested_by_id:
+        return
+    from .signals import send_sync_progress
+    try:
+        send_sync_progress(job.requested_by_id, job.to_dict())
+    except Exception as e:
+        logger.warning(f'Could not publish HRM sync progress for job {job.id}: {str(e)}')
+
+
+def _save_progress(job, **fields):
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.save(update_fields=list(fields) + ['updated_at'])
+    _publish(job)
+
+
+def run_sync_job(job_id):
+    """
+    Claim and execute one pending job. Returns the job, or None if another
+    worker already claimed it.
+    """
+    claimed = HRMSyncJob.objects.filter(id=job_id, status='PENDING').update(
+        status='RUNNING', started_at=timezone.now(), updated_at=timezone.now()
+    )
+    if not claimed:
+        return None
+    job = HRMSyncJob.objects.get(id=job_id)
+    _publish(job)
+
+    try:
+        response = get_hrm_client().active_employees()
+        if response.status_code != 200:
+            _save_progress(
+                job, status='FAILED', finished_at=timezone.now(),
+                message=f'Failed to fetch employees from HRM. Status: {response.status_code}',
+            )
+            return job
+
+        employees = [e for e in response.json().get('employees', []) if e.get('email')]
+        _save_progress(job, total=len(employees))
+
+        errors = []
+        for index, emp_data in enumerate(employees, start=1):
+            try:
+                if upsert_employee(emp_data):
+                    job.created += 1
+                else:
+                    job.updated += 1
+            except Exception as e:
+                job.errors += 1
+                if len(errors) < MAX_ERROR_DETAILS:
+                    errors.append({'email': emp_data.get('email', 'unknown'), 'error': str(e)})
+            job.processed = index
+            if index % PROGRESS_EVERY == 0:
+                _save_progress(job, processed=job.processed, created=job.created,
+                               updated=job.updated, errors=job.errors, error_details=errors)
+
+        message = 'Sync completed successfully' if employees else 'No active employees found in HRM'
+        _save_progress(
+            job, status='COMPLETED', finished_at=timezone.now(), message=message,
+            processed=job.processed, created=job.created, updated=job.updated,
+            errors=job.errors, error_details=errors,
+        )
+    except Exception as e:
+        logger.error(f'HRM sync job {job_id} failed: {str(e)}')
+        _save_progress(job, status='FAILED', finished_at=timezone.now(), message=str(e))
+    return job
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        run_sync_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def fail_stale_jobs():
+    """
+    Fail the jobs a dead worker left behind; they would otherwise block new syncs
+    forever. Running jobs expire once they stop reporting progress, pending jobs
+    once they have waited that long for a worker (the process that queued them
+    exited before its thread picked them up, or no run_hrm_sync_jobs is running).
+    """
+    cutoff = timezone.now() - timedelta(minutes=getattr(settings, 'HRM_SYNC_STALE_MINUTES', 10))
+    running = HRMSyncJob.objects.filter(status='RUNNING', updated_at__lt=cutoff).update(
+        status='FAILED', finished_at=timezone.now(), message='Worker stopped responding'
+    )
+    pending = HRMSyncJob.objects.filter(status='PENDING', updated_at__lt=cutoff).update(
+        status='FAILED', finished_at=timezone.now(), message='No worker picked the job up'
+    )
+    return running + pending
+
+
+def enqueue_sync(requested_by=None):
+    """
+    Queue an HRM sync, collapsing onto the pending/running job if there is one.
+    Returns (job, created).
+    """
+    fail_stale_jobs()
+    for attempt in range(3):
+        job = HRMSyncJob.objects.filter(status__in=HRMSyncJob.ACTIVE_STATUSES).order_by('created_at').first()
+        if job:
+            return job, False
+        try:
+            with transaction.atomic():
+                job = HRMSyncJob.objects.create(requested_by=requested_by)
+            break
+        except IntegrityError:
+            # Another request queued a job since the lookup (hrmsyncjob_single_active)
+            if attempt == 2:
+                raise
+
+    if getattr(settings, 'HRM_SYNC_WORKER', 'thread') == 'thread':
+        transaction.on_commit(lambda: _executor.submit(_run_in_thread, job.id))
+    return job, True
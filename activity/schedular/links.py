@@ -0,0 +1,184 @@
+"""
+Write-time TodayPlan / ActivityLog -> Task linkage
+
+Analytics used to link work logs to tasks at read time in three ways: the
+catalog item's task FK, a catalog item with the task's title in the task's
+project, or an unplanned plan whose custom_title is the task's title. The
+case-insensitive title predicates could not use an index and ran for every
+task on every request.
+
+TodayPlan.resolved_task / resolved_project now hold that link, computed when a
+plan is created or its catalog item / custom title changes, and re-resolved
+(after commit) when a catalog item or task is renamed, moved or deleted.
+ActivityLog copies the link of its plan so achieved-hours aggregates are
+plain indexed FK filters. `python manage.py backfill_task_links` recomputes
+every row from a normalized-title index.
+
+Where a title matches several tasks (same-named tasks in one project, or an
+unplanned title used in several projects) one task is chosen: a task assigned
+to the plan's user first, then the oldest task.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.db.models.functions import Lower, Trim
+from django.utils import timezone
+
+from .models import Task, TaskAssignee, TodayPlan, ActivityLog
+
+BATCH_SIZE = 500
+
+
+def normalize_title(title):
+    return (title or '').strip().lower()
+
+
+# ── Pure resolution ──────────────────────────────────────────────────────
+
+def build_title_index(tasks):
+    """tasks: iterable of (task_id, project_id, title)"""
+    index = {'project': {}, 'by_project': defaultdict(list), 'by_title': defaultdict(list)}
+    for task_id, project_id, title in sorted(tasks):
+        key = normalize_title(title)
+        index['project'][task_id] = project_id
+        index['by_project'][(project_id, key)].append(task_id)
+        index['by_title'][key].append(task_id)
+    return index
+
+
+def resolve_link(plan, index, assigned=frozenset()):
+    """
+    plan: (user_id, catalog_item_id, catalog_task_id, catalog_project_id, catalog_name, custom_title)
+    assigned: set of (user_id, task_id) used to break ties between same-titled tasks
+    Returns (task_id, project_id).
+    """
+    user_id, catalog_item_id, catalog_task_id, catalog_project_id, catalog_name, custom_title = plan
+    if catalog_item_id:
+        if catalog_task_id:
+            return catalog_task_id, index['project'].get(catalog_task_id, catalog_project_id)
+        candidates = index['by_project'].get((catalog_project_id, normalize_title(catalog_name)), [])
+    else:
+        candidates = index['by_title'].get(normalize_title(custom_title), []) if normalize_title(custom_title) else []
+
+    if not candidates:
+        return None, catalog_project_id if catalog_item_id else None
+    task_id = next((t for t in candidates if (user_id, t) in assigned), candidates[0])
+    return task_id, index['project'][task_id]
+
+
+# ── Loading from the live tables ─────────────────────────────────────────
+
+PLAN_FIELDS = (
+    'user_id', 'catalog_item_id', 'catalog_item__task_id', 'catalog_item__project_id',
+    'catalog_item__name', 'custom_title',
+)
+
+
+def load_index(titles=None, task_ids=()):
+    """Title index over all tasks, or only tasks with one of `titles` (plus `task_ids`)"""
+    tasks = Task.objects.all()
+    if titles is not None:
+        keys = {normalize_title(t) for t in titles} - {''}
+        tasks = tasks.annotate(title_key=Lower(Trim('title'))).filter(title_key__in=keys) | Task.objects.filter(id__in=task_ids)
+    return build_title_index(tasks.values_list('id', 'project_id', 'title'))
+
+
+def load_assigned(task_ids=None):
+    pairs = TaskAssignee.objects.all()
+    if task_ids is not None:
+        pairs = pairs.filter(task_id__in=task_ids)
+    return set(pairs.values_list('user_id', 'task_id'))
+
+
+def plan_link(plan):
+    """(task_id, project_id) for an unsaved / changed TodayPlan instance"""
+    catalog = plan.catalog_item
+    row = (
+        plan.user_id, plan.catalog_item_id,
+        catalog.task_id if catalog else None, catalog.project_id if catalog else None,
+        catalog.name if catalog else None, plan.custom_title,
+    )
+    if row[2]:
+        index = load_index(titles=(), task_ids=[row[2]])
+        return resolve_link(row, index)
+    index = load_index(titles=[row[4] if catalog else row[5]])
+    return resolve_link(row, index, load_assigned(index['project'].keys()))
+
+
+# ── Maintenance ──────────────────────────────────────────────────────────
+
+def relink_plans(plans=None):
+    """
+    Re-resolve the given TodayPlan queryset (default: all plans), update the
+    rows whose link changed and copy the new link to their activity logs
+    (all logs when re-resolving every plan). Returns (plans_updated, logs_updated).
+    """
+    full = plans is None
+    plans = TodayPlan.objects.all() if full else plans
+    rows = list(plans.values_list('id', 'resolved_task_id', 'resolved_project_id', *PLAN_FIELDS))
+    if not rows:
+        return 0, 0
+
+    if full:
+        index, assigned = load_index(), load_assigned()
+    else:
+        titles = {row[7] if row[4] else row[8] for row in rows}
+        index = load_index(titles=titles, task_ids={row[5] for row in rows if row[5]})
+        assigned = load_assigned(index['project'].keys())
+
+    changed = []
+    now = timezone.now()
+    for plan_id, task_id, project_id, *plan in rows:
+        link = resolve_link(tuple(plan), index, assigned)
+        if link != (task_id, project_id):
+            changed.append(TodayPlan(id=plan_id, resolved_task_id=link[0], resolved_project_id=link[1], updated_at=now))
+
+    logs_updated = 0
+    with transaction.atomic():
+        for start in range(0, len(changed), BATCH_SIZE):
+            batch = changed[start:start + BATCH_SIZE]
+            # bulk_update skips save(), so the links (and the change stamp read by
+            # conditional GET and delta sync) are written as computed here
+            TodayPlan.objects.bulk_update(batch, ['resolved_task', 'resolved_project', 'updated_at'])
+            by_link = defaultdict(list)
+            for plan in batch:
+                by_link[(plan.resolved_task_id, plan.resolved_project_id)].append(plan.id)
+            for (task_id, project_id), plan_ids in by_link.items():
+                logs_updated += ActivityLog.objects.filter(today_plan_id__in=plan_ids).update(
+                    resolved_task_id=task_id, resolved_project_id=project_id, updated_at=now
+                )
+        if full:
+            logs_updated = sync_logs()
+    if logs_updated:
+        from .timers import refresh_after_commit
+        refresh_after_commit()
+    return len(changed), logs_updated
+
+
+def sync_logs():
+    """Copy every plan's link to its activity logs in one UPDATE (returns the log count)"""
+    plan = TodayPlan.objects.filter(id=OuterRef('today_plan_id'))
+    return ActivityLog.objects.update(
+        resolved_task_id=Subquery(plan.values('resolved_task_id')[:1]),
+        resolved_project_id=Subquery(plan.values('resolved_project_id')[:1]),
+    )
+
+
+def schedule_relink(plans):
+    """Re-resolve the plans of a queryset after the current transaction commits"""
+    plan_ids = list(plans.values_list('id', flat=True))
+    if plan_ids:
+        transaction.on_commit(lambda: relink_plans(TodayPlan.objects.filter(id__in=plan_ids)))
+
+
+def relink_new_tasks(project_id, titles):
+    """Bulk form of the task_link_refresh signal for tasks inserted with bulk_create"""
+    keys = {normalize_title(title) for title in titles} - {''}
+    if keys:
+        schedule_relink(TodayPlan.objects.annotate(
+            catalog_key=Lower(Trim('catalog_item__name')), custom_key=Lower(Trim('custom_title'))
+        ).filter(
+            Q(catalog_item__task__isnull=True, catalog_item__project_id=project_id, catalog_key__in=keys) |
+            Q(catalog_item__isnull=True, custom_key__in=keys)
+        ))
@@ -0,0 +1,116 @@
+"""
+Live dashboard deltas
+
+Dashboards used to poll dashboard/statistics, team-activity-status,
+activity-log/active and the performance endpoints. Instead, clients can
+subscribe to topics on ws/dashboard/ (DashboardConsumer) and receive the
+changed rows as they are committed:
+
+- 'activity':  ActivityLog started / stopped / completed
+- 'tasks':     Task created, status changed or deleted
+- 'approvals': approval requested or decided
+
+Each delta names the users it concerns (and, for approvals, the roles that act
+on it); the consumer only forwards deltas within the subscriber's scope and
+coalesces them per DASHBOARD_PUSH_INTERVAL, keeping the latest state per row.
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+TOPICS = ('activity', 'tasks', 'approvals')
+
+APPROVER_ROLES = ['ADMIN', 'MANAGER', 'TEAMLEAD']
+
+
+def topic_group(topic):
+    return f'dashboard_{topic}'
+
+
+def publish(topic, key, build):
+    """
+    After the current transaction commits, push the delta returned by `build()`
+    to the topic's subscribers. `build` returns (data, user_ids, roles) or None.
+    """
+    def send():
+        try:
+            delta = build()
+            if delta is None:
+                return
+            data, user_ids, roles = delta
+            async_to_sync(get_channel_layer().group_send)(
+                topic_group(topic),
+                {
+                    'type': 'dashboard_delta',
+                    'topic': topic,
+                    'key': key,
+                    'data': data,
+                    'user_ids': [user_id for user_id in user_ids if user_id],
+                    'roles': list(roles),
+                }
+            )
+        except Exception as e:
+            print(f"Dashboard delta error ({topic}): {e}")
+
+    transaction.on_commit(send)
+
+
+# ── Delta builders (run after commit) ─────────────────────────────────────
+
+def activity_delta(log, event):
+    def build():
+        return {
+            'event': event,
+            'activity_log_id': log.id,
+            'user_id': log.user_id,
+            'today_plan_id': log.today_plan_id,
+            'status': log.status,
+            'actual_start_time': log.actual_start_time.isoformat() if log.actual_start_time else None,
+            'actual_end_time': log.actual_end_time.isoformat() if log.actual_end_time else None,
+            'minutes_worked': log.minutes_worked,
+            'is_task_completed': log.is_task_completed,
+        }, [log.user_id], ()
+    return build
+
+
+def task_delta(task, event, user_ids=None):
+    """`user_ids`: the task's assignees plus project lead / handler, when the caller already has them"""
+    from .models import Projects, TaskAssignee
+
+    def build():
+        if user_ids is not None:
+            audience = user_ids
+        else:
+            audience = list(TaskAssignee.objects.filter(task_id=task.id).values_list('user_id', flat=True))
+            project = Projects.objects.filter(id=task.project_id).values('project_lead_id', 'handled_by_id').first()
+            if project:
+                audience += [project['project_lead_id'], project['handled_by_id']]
+        return {
+            'event': event,
+            'task_id': task.id,
+            'project_id': task.project_id,
+            'status': task.status,
+            'priority': task.priority,
+            'due_date': str(task.due_date) if task.due_date else None,
+        }, audience, ()
+    return build
+
+
+def task_deleted_delta(task_id, project_id, user_ids):
+    def build():
+        return {'event': 'deleted', 'task_id': task_id, 'project_id': project_id}, user_ids, ()
+    return build
+
+
+def approval_delta(approval, event):
+    def build():
+        return {
+            'event': event,
+            'approval_id': approval.id,
+            'status': approval.status,
+            'approval_type': approval.approval_type,
+            'reference_type': approval.reference_type,
+            'reference_id': approval.reference_id,
+            'requested_by_id': approval.requested_by_id,
+        }, [approval.requested_by_id], APPROVER_ROLES
+    return build
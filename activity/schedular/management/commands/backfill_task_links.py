@@ -0,0 +1,49 @@
+"""
+Management command to recompute the resolved task / project of every TodayPlan and ActivityLog
+Usage: python manage.py backfill_task_links [--verify]
+
+Builds one normalized-title index over all tasks, re-resolves every plan against it
+(see schedular/links.py) and copies each plan's link to its activity logs.
+--verify only reports how many plans are out of date.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from schedular.links import PLAN_FIELDS, load_assigned, load_index, relink_plans, resolve_link
+from schedular.models import TodayPlan
+
+
+class Command(BaseCommand):
+    help = 'Recompute write-time ActivityLog/TodayPlan -> Task links'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only count plans whose stored link differs from a fresh resolution'
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            index, assigned = load_index(), load_assigned()
+            stale = 0
+            total = 0
+            for plan_id, task_id, project_id, *plan in TodayPlan.objects.values_list(
+                'id', 'resolved_task_id', 'resolved_project_id', *PLAN_FIELDS
+            ):
+                total += 1
+                if resolve_link(tuple(plan), index, assigned) != (task_id, project_id):
+                    stale += 1
+            if stale:
+                raise CommandError(f'{stale} of {total} plans have an out-of-date task link')
+            self.stdout.write(self.style.SUCCESS(f'✓ All {total} plan links are up to date'))
+            return
+
+        self.stdout.write(self.style.WARNING('Resolving task links...'))
+        plans, logs = relink_plans()
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('=' * 60))
+        self.stdout.write(self.style.SUCCESS('Backfill completed!'))
+        self.stdout.write(self.style.SUCCESS(f'  Plans updated: {plans}'))
+        self.stdout.write(self.style.SUCCESS(f'  Activity logs synced: {logs}'))
+        self.stdout.write(self.style.SUCCESS('=' * 60))
@@ -7,6 +7,7 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 import requests
 from schedular.models import User, Employee
+from schedular.hrm_client import get_hrm_client
 
 
 class Command(BaseCommand):
@@ -36,7 +37,7 @@ class Command(BaseCommand):
         
         try:
             # Fetch all active employees from HRM
-            response = requests.get(f'{hrm_url}/api/employees-active/', timeout=30)
+            response = get_hrm_client(hrm_url).active_employees(path='/api/employees-active/')
             
             if response.status_code != 200:
                 self.stdout.write(self.style.ERROR(f'Failed to fetch employees from HRM. Status: {response.status_code}'))
@@ -0,0 +1,47 @@
+"""
+Management command to export timesheets (one row per activity log) as CSV or NDJSON
+Usage:
+    python manage.py export_timesheets --start 2026-01-01 --end 2026-03-31 --output q1.csv
+    python manage.py export_timesheets --start 2025-01-01 --users 4,7 --projects 12 --format ndjson > billing.ndjson
+
+Same rows as GET /api/timesheets/export/, for every user unless --users is given.
+Rows are streamed (see schedular/timesheets.py), so memory stays flat for any range.
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from schedular.timesheets import FORMATS, TimesheetError, parse_ids, parse_range, stream, timesheet_logs
+
+
+class Command(BaseCommand):
+    help = 'Stream per-user, per-project hours from activity logs as CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=str, default=None, help='First day, YYYY-MM-DD (default: start of this month)')
+        parser.add_argument('--end', type=str, default=None, help='Last day, YYYY-MM-DD (default: today)')
+        parser.add_argument('--users', type=str, default=None, help='Comma-separated user ids (default: everyone)')
+        parser.add_argument('--projects', type=str, default=None, help='Comma-separated project ids')
+        parser.add_argument('--format', type=str, default='csv', choices=list(FORMATS), help='csv (default) or ndjson')
+        parser.add_argument('--output', type=str, default=None, help='File to write (default: stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            start, end = parse_range(options['start'], options['end'])
+            logs = timesheet_logs(
+                start, end,
+                user_ids=parse_ids(options['users'], '--users'),
+                project_ids=parse_ids(options['projects'], '--projects'),
+            )
+        except TimesheetError as e:
+            raise CommandError(str(e))
+
+        if not options['output']:
+            for chunk in stream(logs, options['format']):
+                sys.stdout.write(chunk)
+            return
+
+        with open(options['output'], 'w', encoding='utf-8', newline='') as fh:
+            for chunk in stream(logs, options['format']):
+                fh.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f'Timesheet {start} - {end} written to {options["output"]}'))
@@ -0,0 +1,50 @@
+"""
+Management command to materialize upcoming occurrences of recurring tasks
+Usage: python manage.py materialize_recurring_tasks [--days 30] [--dry-run]
+"""
+from django.core.management.base import BaseCommand
+from schedular.recurrence import materialize_recurring_tasks
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generate all due occurrences of RECURRING tasks up to a horizon'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Horizon in days from today (default: 30)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be created without writing anything'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        dry_run = options['dry_run']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
+
+        self.stdout.write(self.style.WARNING(f'Materializing recurring tasks for the next {days} days...'))
+
+        summary = materialize_recurring_tasks(horizon_days=days, dry_run=dry_run)
+
+        for item in summary['skipped']:
+            self.stdout.write(self.style.ERROR(
+                f'  ✗ Skipped "{item["title"]}" on {item["date"]} (task {item["task_id"]}): project budget exceeded'
+            ))
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('=' * 60))
+        self.stdout.write(self.style.SUCCESS(f'Recurring series: {summary["series"]}'))
+        self.stdout.write(self.style.SUCCESS(f'  {"Would create" if dry_run else "Created"}: {summary["created"]} tasks (up to {summary["horizon"]})'))
+        if not dry_run and summary['created']:
+            self.stdout.write(self.style.SUCCESS(f'  Assignees: {summary["assignees_created"]}'))
+            self.stdout.write(self.style.SUCCESS(f'  Milestones: {summary["subtasks_created"]}'))
+        if summary['skipped_over_budget']:
+            self.stdout.write(self.style.ERROR(f'  Over budget: {summary["skipped_over_budget"]}'))
+        self.stdout.write(self.style.SUCCESS('=' * 60))
@@ -0,0 +1,18 @@
+"""
+Management command to delete old /api/sync/ tombstones
+Usage: python manage.py prune_sync_tombstones
+
+Run daily. Clients whose cursors have not caught up with the tombstones within
+SYNC_TOMBSTONE_DAYS are told to reload the collection (see schedular/sync.py).
+"""
+from django.core.management.base import BaseCommand
+
+from schedular.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete /api/sync/ tombstones older than SYNC_TOMBSTONE_DAYS'
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} sync tombstones'))
@@ -0,0 +1,35 @@
+"""
+Management command to rebuild the ProjectVisibility table from scratch
+Usage: python manage.py rebuild_project_visibility [--team-only]
+"""
+from django.core.management.base import BaseCommand
+
+from schedular.visibility import rebuild_all, rebuild_team_rows
+
+
+class Command(BaseCommand):
+    help = 'Recompute the materialized project visibility (ACL) rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--team-only',
+            action='store_true',
+            help='Only recompute the hierarchy-derived TEAM_* rows'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Rebuilding project visibility...'))
+
+        if options['team_only']:
+            team = rebuild_team_rows()
+            direct = None
+        else:
+            direct, team = rebuild_all()
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('=' * 60))
+        self.stdout.write(self.style.SUCCESS('Rebuild completed!'))
+        if direct is not None:
+            self.stdout.write(self.style.SUCCESS(f'  Direct rows: {direct}'))
+        self.stdout.write(self.style.SUCCESS(f'  Team rows:   {team}'))
+        self.stdout.write(self.style.SUCCESS('=' * 60))
@@ -0,0 +1,148 @@
+"""
+Management command to benchmark the read-heavy API endpoints on a synthetic tenant
+Usage:
+    python manage.py run_benchmarks --output bench_baseline.json
+    python manage.py run_benchmarks --users 300 --years 3 --compare bench_baseline.json
+    python manage.py run_benchmarks --users 500 --projects 300 --scopes
+    python manage.py run_benchmarks --renderers --iterations 50
+
+The tenant is seeded into a throwaway test database, so real data is never touched.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from schedular.benchmark import (DEFAULT_TENANT, seed_tenant, run_benchmarks, compare_results, compare_scope_forms,
+                                 compare_renderers)
+
+
+class Command(BaseCommand):
+    help = 'Seed a synthetic tenant and record query counts, latency and memory per endpoint'
+
+    def add_arguments(self, parser):
+        for key, value in DEFAULT_TENANT.items():
+            parser.add_argument(
+                f'--{key.replace("_", "-")}',
+                type=int,
+                default=None,
+                help=f'Tenant size: {key} (default: {value})'
+            )
+        parser.add_argument('--iterations', type=int, default=5, help='Timed runs per endpoint (default: 5)')
+        parser.add_argument('--roles', nargs='+', default=None, help='Roles to benchmark (default: all four)')
+        parser.add_argument('--only', nargs='+', default=None, help='Only endpoints whose name contains one of these')
+        parser.add_argument('--output', type=str, default=None, help='Write results as JSON to this file')
+        parser.add_argument('--compare', type=str, default=None, help='Baseline JSON file to compare against')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Allowed relative slowdown (default: 0.2)')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database between runs')
+        parser.add_argument('--scopes', action='store_true',
+                            help='Compare DISTINCT, scope-builder and ProjectVisibility role scopes instead of endpoints')
+        parser.add_argument('--renderers', action='store_true',
+                            help='Compare JSONRenderer and FastJSONRenderer on the largest responses instead of endpoints')
+
+    def handle(self, *args, **options):
+        tenant = {key: options[key] for key in DEFAULT_TENANT}
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            self.stdout.write(self.style.WARNING('Seeding synthetic tenant...'))
+            context = seed_tenant(**tenant)
+            self.stdout.write(self.style.SUCCESS(f'Tenant: {context["spec"]}'))
+
+            if options['scopes']:
+                scope_results = compare_scope_forms(context, roles=options['roles'], iterations=options['iterations'])
+            elif options['renderers']:
+                renderer_results = compare_renderers(
+                    context, roles=options['roles'], iterations=options['iterations'], only=options['only'],
+                )
+            else:
+                results = run_benchmarks(
+                    context,
+                    roles=options['roles'],
+                    iterations=options['iterations'],
+                    only=options['only'],
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        if options['scopes']:
+            self.write_scope_results(scope_results, context['spec'], options['output'])
+            return
+        if options['renderers']:
+            self.write_renderer_results(renderer_results, context['spec'], options['output'])
+            return
+
+        self.stdout.write('')
+        self.stdout.write(f'{"endpoint":<58}{"status":>7}{"queries":>9}{"p50 ms":>10}{"p95 ms":>10}{"peak KB":>10}')
+        for key, metrics in results.items():
+            self.stdout.write(
+                f'{key:<58}{metrics["status"]:>7}{metrics["queries"]:>9}'
+                f'{metrics["p50_ms"]:>10}{metrics["p95_ms"]:>10}{metrics["peak_kb"]:>10}'
+            )
+
+        payload = {'tenant': context['spec'], 'results': results}
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(payload, fh, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+        if options['compare']:
+            with open(options['compare']) as fh:
+                baseline = json.load(fh)
+            if baseline.get('tenant') != context['spec']:
+                self.stdout.write(self.style.WARNING('Baseline was recorded with a different tenant size'))
+            regressions = compare_results(baseline.get('results', {}), results, threshold=options['threshold'])
+            self.stdout.write('')
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
+                return
+            for key, metric, before, after in regressions:
+                self.stdout.write(self.style.ERROR(f'  ✗ {key}: {metric} {before} -> {after}'))
+            raise CommandError(f'{len(regressions)} regression(s) against {options["compare"]}')
+
+    def write_scope_results(self, results, spec, output):
+        self.stdout.write('')
+        self.stdout.write(f'{"scope":<28}{"form":<10}{"rows":>7}{"count ms":>10}{"page ms":>10}  same')
+        mismatches = 0
+        for key, forms in results.items():
+            for form, metrics in forms.items():
+                mismatches += not metrics['same']
+                self.stdout.write(
+                    f'{key:<28}{form:<10}{metrics["rows"]:>7}{metrics["count_ms"]:>10}{metrics["page_ms"]:>10}'
+                    f'  {"yes" if metrics["same"] else "NO"}'
+                )
+
+        if output:
+            with open(output, 'w') as fh:
+                json.dump({'tenant': spec, 'scopes': results}, fh, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {output}'))
+        if mismatches:
+            raise CommandError(f'{mismatches} scope form(s) returned different rows')
+
+    def write_renderer_results(self, results, spec, output):
+        from schedular.renderers import FastJSONRenderer
+        if not FastJSONRenderer.available:
+            self.stdout.write(self.style.WARNING('orjson is not installed: FastJSONRenderer falls back to JSONRenderer'))
+
+        self.stdout.write('')
+        self.stdout.write(f'{"endpoint":<48}{"bytes":>10}{"json ms":>10}{"fast ms":>10}{"speedup":>9}  same')
+        mismatches = 0
+        for key, renderers in results.items():
+            stock, fast = renderers['json'], renderers['fast']
+            mismatches += not fast['same']
+            speedup = f'{stock["p50_ms"] / fast["p50_ms"]:.1f}x' if fast['p50_ms'] else '-'
+            self.stdout.write(
+                f'{key:<48}{stock["bytes"]:>10}{stock["p50_ms"]:>10}{fast["p50_ms"]:>10}{speedup:>9}'
+                f'  {"yes" if fast["same"] else "NO"}'
+            )
+
+        if output:
+            with open(output, 'w') as fh:
+                json.dump({'tenant': spec, 'renderers': results}, fh, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {output}'))
+        if mismatches:
+            raise CommandError(f'{mismatches} response(s) rendered differently')
@@ -0,0 +1,52 @@
+"""
+Management command to run queued HRM sync jobs in a separate worker process
+Usage: python manage.py run_hrm_sync_jobs [--once] [--interval 5]
+
+Use with HRM_SYNC_WORKER='command' so the web process only queues jobs.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from schedular.hrm_sync import fail_stale_jobs, run_sync_job
+from schedular.models import HRMSyncJob
+
+
+class Command(BaseCommand):
+    help = 'Execute pending HRM sync jobs (polls for new jobs unless --once is given)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run the jobs that are pending now and exit'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=5,
+            help='Seconds between polls for new jobs (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Waiting for HRM sync jobs...'))
+
+        while True:
+            stale = fail_stale_jobs()
+            if stale:
+                self.stdout.write(self.style.ERROR(f'  ✗ Marked {stale} stale job(s) as failed'))
+
+            pending = list(HRMSyncJob.objects.filter(status='PENDING').order_by('created_at').values_list('id', flat=True))
+            for job_id in pending:
+                job = run_sync_job(job_id)
+                if job is None:
+                    continue  # claimed by another worker
+                style = self.style.SUCCESS if job.status == 'COMPLETED' else self.style.ERROR
+                self.stdout.write(style(
+                    f'  Job #{job.id} {job.status}: {job.processed}/{job.total} processed, '
+                    f'{job.created} created, {job.updated} updated, {job.errors} errors'
+                ))
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
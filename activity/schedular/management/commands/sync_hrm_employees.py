@@ -8,6 +8,7 @@ from django.contrib.auth.hashers import make_password
 import requests
 import secrets
 from schedular.models import User, Employee
+from schedular.hrm_client import get_hrm_client
 from rest_framework_simplejwt.tokens import RefreshToken
 
 
@@ -31,7 +32,7 @@ class Command(BaseCommand):
         
         try:
             # Fetch all active employees from HRM
-            response = requests.get(f'{hrm_url}/root/api/employees-active/', timeout=30)
+            response = get_hrm_client(hrm_url).active_employees()
             
             if response.status_code != 200:
                 self.stdout.write(self.style.ERROR(f'Failed to fetch employees from HRM. Status: {response.status_code}'))
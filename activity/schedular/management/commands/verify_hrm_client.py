@@ -0,0 +1,117 @@
+"""
+Management command to verify the shared HRM client against a local fake HRM server
+Usage: python manage.py verify_hrm_client
+
+Starts an in-process HTTP server that mimics the HRM endpoints and checks that
+the client reuses pooled connections, serves cached status responses, revalidates
+the employee list with ETags, retries transient 503s and never retries a POST.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand, CommandError
+
+from schedular.hrm_client import HRMClient
+
+
+class FakeHRMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload=None, headers=None):
+        body = json.dumps(payload).encode() if payload is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        server.hits.append(('GET', self.path))
+        server.connections.add(self.client_address)
+
+        if self.path.startswith('/root/api/check-employee-status/'):
+            return self._send(200, {'is_active': True})
+        if self.path == '/root/api/employees-active/':
+            etag = '"employees-v1"'
+            if self.headers.get('If-None-Match') == etag:
+                return self._send(304, headers={'ETag': etag})
+            return self._send(200, {'employees': [{'email': 'a@example.com'}]}, headers={'ETag': etag})
+        if self.path == '/flaky/':
+            server.flaky_calls += 1
+            if server.flaky_calls < 3:
+                return self._send(503, {'error': 'unavailable'})
+            return self._send(200, {'ok': True})
+        return self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        server = self.server
+        server.hits.append(('POST', self.path))
+        server.connections.add(self.client_address)
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        return self._send(503, {'error': 'unavailable'})
+
+
+class Command(BaseCommand):
+    help = 'Check HRM client pooling, caching and retry behaviour against a fake HRM server'
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), FakeHRMHandler)
+        server.hits = []
+        server.connections = set()
+        server.flaky_calls = 0
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        client = HRMClient(base_url=f'http://127.0.0.1:{server.server_port}', cache_ttl=60, backoff=0.01)
+        failures = []
+
+        def check(label, condition):
+            if condition:
+                self.stdout.write(self.style.SUCCESS(f'  ✓ {label}'))
+            else:
+                self.stdout.write(self.style.ERROR(f'  ✗ {label}'))
+                failures.append(label)
+
+        try:
+            for _ in range(5):
+                client.employee_status('a@example.com')
+            status_hits = [h for h in server.hits if 'check-employee-status' in h[1]]
+            check('Employee status served from cache after first call', len(status_hits) == 1)
+
+            first = client.active_employees()
+            second = client.active_employees()
+            metrics = client.metrics()
+            check('Employee list revalidated with ETag (304)', metrics['employees_active']['revalidated'] == 1)
+            check('Revalidated response keeps the cached body', second.json() == first.json())
+
+            flaky = client.request('GET', '/flaky/')
+            check('Transient 503 retried until success', flaky.status_code == 200 and server.flaky_calls == 3)
+
+            check(f'Connections reused ({len(server.hits)} requests over {len(server.connections)} connection(s))',
+                  len(server.connections) == 1)
+
+            # Checked after the reuse count: with VERIFY_SSL_HRM off this call gets its own pool
+            posted = client.validate_das_code('code', 'a@example.com')
+            post_hits = [h for h in server.hits if h[0] == 'POST']
+            check('POST with a response is not retried', posted.status_code == 503 and len(post_hits) == 1)
+        finally:
+            client.close()
+            server.shutdown()
+            server.server_close()
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('=' * 60))
+        for endpoint, stats in client.metrics().items():
+            self.stdout.write(self.style.SUCCESS(f'  {endpoint}: {stats}'))
+        self.stdout.write(self.style.SUCCESS('=' * 60))
+
+        if failures:
+            raise CommandError(f'{len(failures)} HRM client check(s) failed')
@@ -0,0 +1,165 @@
+"""
+Management command to prove the ProjectVisibility-based scoping matches the old OR-chain scoping
+Usage:
+    python manage.py verify_project_visibility
+    python manage.py verify_project_visibility --synthetic --users 120
+
+For every user (all four roles) it compares the project and task ids returned by
+ProjectQuerySetMixin / TaskQuerySetMixin and by the scope builder,
+with and without for_planner, against the previous Q-chain + distinct() querysets. It also checks that the stored
+table matches a fresh rebuild. --synthetic runs on a seeded throwaway database
+and, before comparing, edits projects, members, tasks, task assignees and the
+user hierarchy through the ORM so the rows checked are the ones the signals
+maintained, not the ones the seed's rebuild wrote.
+"""
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from schedular.benchmark import DEFAULT_TENANT, SCOPE_FORMS, seed_tenant
+from schedular.models import User, Projects, Task, TaskAssignee, ProjectVisibility
+from schedular.visibility import load_direct_rows, load_hierarchy, compute_team_rows, schedule_team_rebuild
+
+
+class Command(BaseCommand):
+    help = 'Compare ProjectVisibility scoping with the previous OR-chain scoping for every user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--synthetic', action='store_true', help='Run on a seeded throwaway database')
+        parser.add_argument('--users', type=int, default=None,
+                            help=f'Synthetic tenant users (default: {DEFAULT_TENANT["users"]})')
+
+    def handle(self, *args, **options):
+        if not options['synthetic']:
+            failures = self.verify()
+        else:
+            setup_test_environment()
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                self.stdout.write(self.style.WARNING('Seeding synthetic tenant...'))
+                seed_tenant(users=options['users'])
+                self.stdout.write(self.style.WARNING('Editing it through the ORM...'))
+                self.mutate()
+                failures = self.verify()
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        if failures:
+            raise CommandError(f'{failures} visibility mismatch(es)')
+
+    def mutate(self, seed=7):
+        """Project, membership, task and hierarchy edits, each in its own transaction"""
+        rng = random.Random(seed)
+        users = {role: list(User.objects.filter(role=role).order_by('id')) for role in ('MANAGER', 'TEAMLEAD', 'EMPLOYEE')}
+        workers = users['MANAGER'] + users['TEAMLEAD'] + users['EMPLOYEE']
+        projects = list(Projects.objects.order_by('id'))
+
+        with transaction.atomic():
+            for project in rng.sample(projects, 5):
+                project.project_lead = rng.choice(workers)
+                project.handled_by = rng.choice(workers)
+                project.save()
+
+        with transaction.atomic():
+            for project in rng.sample(projects, 5):
+                project.assignees.add(*rng.sample(workers, 2))
+                project.assignees.remove(project.assignees.first())
+            member = rng.choice([u for u in workers if u.assigned_projects.exists()])
+            member.assigned_projects.clear()
+
+        with transaction.atomic():
+            tasks = list(Task.objects.order_by('id'))
+            for task in rng.sample(tasks, 10):
+                TaskAssignee.objects.create(task=task, user=rng.choice(workers), role='DEV')
+            for assignee in rng.sample(list(TaskAssignee.objects.order_by('id')), 10):
+                assignee.delete()
+            # Raise the target budget so the move passes Task.clean()
+            moved, target = rng.choice(tasks), rng.choice(projects)
+            target.planned_hours = (target.planned_hours or 0) + moved.planned_hours
+            target.save()
+            moved.project = target
+            moved.save()
+            rng.choice(tasks).delete()
+
+        with transaction.atomic():
+            employee = rng.choice(users['EMPLOYEE'])
+            employee.team_lead = rng.choice([lead for lead in users['TEAMLEAD'] if lead.pk != employee.team_lead_id])
+            employee.save()
+            promoted = rng.choice([u for u in users['EMPLOYEE'] if u.pk != employee.pk])
+            promoted.role = 'TEAMLEAD'
+            promoted.save()
+            demoted = rng.choice(users['MANAGER'])
+            demoted.role = 'EMPLOYEE'
+            demoted.save()
+            inactive = rng.choice(users['TEAMLEAD'])
+            inactive.is_active = False
+            inactive.save()
+            User.objects.create(email='bench.new@bench.local', role='EMPLOYEE', team_lead=promoted)
+
+        with transaction.atomic():
+            # Leaves no project behind: every FK from Projects to User cascades
+            leaving = next(u for u in users['EMPLOYEE'] if u.pk not in (employee.pk, promoted.pk) and not (
+                Projects.objects.filter(project_lead=u).exists() or Projects.objects.filter(handled_by=u).exists()
+            ))
+            leaving.delete()
+
+        with transaction.atomic():
+            # Bulk team assignment, as TeamOverviewViewSet.bulk_assign_team_lead does it
+            moving = User.objects.filter(id__in=[u.pk for u in rng.sample(users['EMPLOYEE'], 5)]).exclude(pk=leaving.pk)
+            previous_leads = set(moving.values_list('team_lead_id', flat=True))
+            moving.update(team_lead=rng.choice(users['TEAMLEAD']))
+            schedule_team_rebuild(*moving.values_list('id', flat=True), *previous_leads)
+
+        try:
+            with transaction.atomic():
+                project = rng.choice(projects)
+                project.project_lead = rng.choice(workers)
+                project.save()
+                raise RuntimeError('rolled back')
+        except RuntimeError:
+            pass
+
+    def verify(self):
+        failures = 0
+
+        stored = set(ProjectVisibility.objects.values_list('user_id', 'project_id', 'reason'))
+        direct = load_direct_rows()
+        expected = direct | compute_team_rows(direct, *load_hierarchy())
+        if stored != expected:
+            failures += 1
+            self.stdout.write(self.style.ERROR(
+                f'  ✗ Stored table drifted: {len(expected - stored)} missing, {len(stored - expected)} extra rows '
+                f'(run rebuild_project_visibility)'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'  ✓ Stored table matches a fresh rebuild ({len(stored)} rows)'))
+
+        checked = {}
+        for user in User.objects.order_by('id'):
+            for for_planner in (False, True):
+                for index, label in enumerate(('projects', 'tasks')):
+                    legacy_ids = set(SCOPE_FORMS['distinct'][index](user, for_planner).values_list('id', flat=True))
+                    for form in ('acl', 'builder'):
+                        current_ids = set(SCOPE_FORMS[form][index](user, for_planner).values_list('id', flat=True))
+                        if current_ids != legacy_ids:
+                            failures += 1
+                            self.stdout.write(self.style.ERROR(
+                                f'  ✗ {user.email} ({user.role}) {label}{" [planner]" if for_planner else ""} [{form}]: '
+                                f'{len(current_ids - legacy_ids)} extra, {len(legacy_ids - current_ids)} missing'
+                            ))
+            checked[user.role] = checked.get(user.role, 0) + 1
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('=' * 60))
+        for role, count in sorted(checked.items()):
+            self.stdout.write(self.style.SUCCESS(f'  {role}: {count} users checked'))
+        if failures:
+            self.stdout.write(self.style.ERROR(f'  Mismatches: {failures}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('  All scopes identical'))
+        self.stdout.write(self.style.SUCCESS('=' * 60))
+        return failures
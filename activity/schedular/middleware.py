@@ -4,6 +4,7 @@ from django.shortcuts import redirect
 from django.urls import resolve
 import requests
 from django.contrib.auth.models import AnonymousUser
+from .hrm_client import get_hrm_client
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -125,11 +126,9 @@ class EmployeeStatusCheckMiddleware:
         Returns: True if active, False if inactive, None on error
         """
         try:
-            # HRM API endpoint
-            hrm_api_url = f"http://localhost:8001/api/check-employee-status/{email}/"
-            # hrm_api_url = f"https://hrm.meridahr.com/api/check-employee-status/{email}/"
-            
-            response = requests.get(hrm_api_url, timeout=5)
+            # HRM API endpoint - responses are cached for HRM_CACHE_TTL seconds,
+            # so this no longer costs a round trip on every request
+            response = get_hrm_client().employee_status(email, path='/api/check-employee-status/{email}/')
             
             if response.status_code == 200:
                 data = response.json()
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+def backfill_allocated_planned_hours(apps, schema_editor):
+    Projects = apps.get_model('schedular', 'Projects')
+    Task = apps.get_model('schedular', 'Task')
+    totals = (
+        Task.objects.values('project_id')
+        .annotate(total=models.Sum('planned_hours'))
+        .values_list('project_id', 'total')
+    )
+    for project_id, total in totals:
+        Projects.objects.filter(pk=project_id).update(allocated_planned_hours=total or 0.0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedular', '0042_todayplan_is_unplanned'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projects',
+            name='allocated_planned_hours',
+            field=models.FloatField(default=0.0, help_text='Sum of planned hours of all tasks, maintained on task writes'),
+        ),
+        migrations.RunPython(backfill_allocated_planned_hours, migrations.RunPython.noop),
+    ]
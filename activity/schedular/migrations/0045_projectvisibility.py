@@ -0,0 +1,102 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:45
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Frozen copy of the visibility.py computation as of this migration: later
+# changes to the app module must not change what this backfill writes.
+TEAM_SCOPE_REASONS = {
+    'MANAGER': ('LEAD', 'HANDLER', 'CREATOR'),
+    'TEAMLEAD': ('LEAD', 'HANDLER', 'CREATOR', 'TASK'),
+}
+
+
+def subordinate_ids(user_id, roles, active_reports, seen):
+    if roles.get(user_id) == 'ADMIN':
+        return set(roles)
+    result = set()
+    for report_id in active_reports.get(user_id, ()):
+        result.add(report_id)
+        if report_id not in seen:
+            seen.add(report_id)
+            result |= subordinate_ids(report_id, roles, active_reports, seen)
+    return result
+
+
+def backfill_project_visibility(apps, schema_editor):
+    User = apps.get_model('schedular', 'User')
+    Projects = apps.get_model('schedular', 'Projects')
+    TaskAssignee = apps.get_model('schedular', 'TaskAssignee')
+    ProjectVisibility = apps.get_model('schedular', 'ProjectVisibility')
+
+    direct = set()
+    for project_id, *people in Projects.objects.values_list('id', 'project_lead_id', 'handled_by_id', 'created_by_id'):
+        for user_id, reason in zip(people, ('LEAD', 'HANDLER', 'CREATOR')):
+            if user_id:
+                direct.add((user_id, project_id, reason))
+    direct.update(
+        (user_id, project_id, 'MEMBER')
+        for project_id, user_id in Projects.assignees.through.objects.values_list('projects_id', 'user_id')
+    )
+    direct.update(
+        (user_id, project_id, 'TASK')
+        for project_id, user_id in TaskAssignee.objects.values_list('task__project_id', 'user_id').distinct()
+        if project_id
+    )
+
+    roles = {}
+    active_reports = defaultdict(list)
+    for user_id, role, is_active, team_lead_id in User.objects.values_list('id', 'role', 'is_active', 'team_lead_id'):
+        roles[user_id] = role
+        if team_lead_id and is_active:
+            active_reports[team_lead_id].append(user_id)
+
+    by_user = defaultdict(list)
+    for user_id, project_id, reason in direct:
+        by_user[user_id].append((project_id, reason))
+    team = set()
+    for viewer_id, role in roles.items():
+        scope = TEAM_SCOPE_REASONS.get(role)
+        if not scope:
+            continue
+        if role == 'MANAGER':
+            members = subordinate_ids(viewer_id, roles, active_reports, {viewer_id})
+        else:
+            members = active_reports.get(viewer_id, ())
+        for member_id in members:
+            for project_id, reason in by_user.get(member_id, ()):
+                if reason in scope:
+                    team.add((viewer_id, project_id, f'TEAM_{reason}'))
+
+    ProjectVisibility.objects.bulk_create(
+        [ProjectVisibility(user_id=u, project_id=p, reason=r) for u, p, r in direct | team],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedular', '0044_hrmsyncjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectVisibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('LEAD', 'Project lead'), ('HANDLER', 'Handled by'), ('CREATOR', 'Created by'), ('MEMBER', 'Project assignee'), ('TASK', 'Task assignee'), ('TEAM_LEAD', 'Team: project lead'), ('TEAM_HANDLER', 'Team: handled by'), ('TEAM_CREATOR', 'Team: created by'), ('TEAM_TASK', 'Team: task assignee')], max_length=20)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visibility', to='schedular.projects')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='project_visibility', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'reason', 'project'], name='projvis_user_reason_idx')],
+                'unique_together': {('user', 'project', 'reason')},
+            },
+        ),
+        migrations.RunPython(backfill_project_visibility, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:04
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+# Frozen copy of the links.py resolution as of this migration: later changes to
+# the app module must not change what this backfill writes.
+PLAN_FIELDS = (
+    'user_id', 'catalog_item_id', 'catalog_item__task_id', 'catalog_item__project_id',
+    'catalog_item__name', 'custom_title',
+)
+
+
+def normalize_title(title):
+    return (title or '').strip().lower()
+
+
+def resolve_link(plan, task_project, by_project, by_title, assigned):
+    user_id, catalog_item_id, catalog_task_id, catalog_project_id, catalog_name, custom_title = plan
+    if catalog_item_id:
+        if catalog_task_id:
+            return catalog_task_id, task_project.get(catalog_task_id, catalog_project_id)
+        candidates = by_project.get((catalog_project_id, normalize_title(catalog_name)), [])
+    else:
+        candidates = by_title.get(normalize_title(custom_title), []) if normalize_title(custom_title) else []
+
+    if not candidates:
+        return None, catalog_project_id if catalog_item_id else None
+    task_id = next((t for t in candidates if (user_id, t) in assigned), candidates[0])
+    return task_id, task_project[task_id]
+
+
+def backfill_task_links(apps, schema_editor):
+    Task = apps.get_model('schedular', 'Task')
+    TaskAssignee = apps.get_model('schedular', 'TaskAssignee')
+    TodayPlan = apps.get_model('schedular', 'TodayPlan')
+    ActivityLog = apps.get_model('schedular', 'ActivityLog')
+
+    task_project, by_project, by_title = {}, defaultdict(list), defaultdict(list)
+    for task_id, project_id, title in sorted(Task.objects.values_list('id', 'project_id', 'title')):
+        key = normalize_title(title)
+        task_project[task_id] = project_id
+        by_project[(project_id, key)].append(task_id)
+        by_title[key].append(task_id)
+    assigned = set(TaskAssignee.objects.values_list('user_id', 'task_id'))
+
+    plans = []
+    for plan_id, *plan in TodayPlan.objects.values_list('id', *PLAN_FIELDS):
+        task_id, project_id = resolve_link(tuple(plan), task_project, by_project, by_title, assigned)
+        if task_id or project_id:
+            plans.append(TodayPlan(id=plan_id, resolved_task_id=task_id, resolved_project_id=project_id))
+    TodayPlan.objects.bulk_update(plans, ['resolved_task', 'resolved_project'], batch_size=500)
+
+    plan = TodayPlan.objects.filter(id=OuterRef('today_plan_id'))
+    ActivityLog.objects.update(
+        resolved_task_id=Subquery(plan.values('resolved_task_id')[:1]),
+        resolved_project_id=Subquery(plan.values('resolved_project_id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedular', '0045_projectvisibility'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitylog',
+            name='resolved_project',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resolved_activity_logs', to='schedular.projects'),
+        ),
+        migrations.AddField(
+            model_name='activitylog',
+            name='resolved_task',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resolved_activity_logs', to='schedular.task'),
+        ),
+        migrations.AddField(
+            model_name='todayplan',
+            name='resolved_project',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resolved_plans', to='schedular.projects'),
+        ),
+        migrations.AddField(
+            model_name='todayplan',
+            name='resolved_task',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resolved_plans', to='schedular.task'),
+        ),
+        migrations.RunPython(backfill_task_links, migrations.RunPython.noop),
+    ]
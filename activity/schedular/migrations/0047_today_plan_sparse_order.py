@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:12
+
+from django.db import migrations, models
+from django.db.models import F, Min
+
+
+ORDER_GAP = 1024
+
+
+def respace_order_keys(apps, schema_editor):
+    """Re-space the keys of every day ORDER_GAP apart, keeping each day's order"""
+    TodayPlan = apps.get_model('schedular', 'TodayPlan')
+
+    plans, day, position = [], None, 0
+    for pk, user_id, plan_date in TodayPlan.objects.order_by(
+        'user_id', 'plan_date', 'order_index', 'id'
+    ).values_list('id', 'user_id', 'plan_date'):
+        position = position + 1 if (user_id, plan_date) == day else 1
+        day = (user_id, plan_date)
+        plans.append(TodayPlan(id=pk, order_index=position * ORDER_GAP))
+    if not plans:
+        return
+
+    # Park every row below the existing keys first so (user, plan_date,
+    # order_index) never holds a duplicate in the middle of the update
+    lowest = min(TodayPlan.objects.aggregate(low=Min('order_index'))['low'] or 0, 0) - 1
+    TodayPlan.objects.update(order_index=lowest - F('id'))
+    TodayPlan.objects.bulk_update(plans, ['order_index'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedular', '0046_activity_task_links'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='todayplan',
+            name='order_index',
+            field=models.IntegerField(default=0, help_text="Sparse ordering key in the user's day (see ordering.py)"),
+        ),
+        migrations.RunPython(respace_order_keys, migrations.RunPython.noop),
+    ]
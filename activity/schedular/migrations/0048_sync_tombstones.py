@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedular', '0047_today_plan_sparse_order'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('collection', models.CharField(max_length=30)),
+                ('object_id', models.IntegerField()),
+                ('user_id', models.IntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='activitylog_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='catalog',
+            index=models.Index(fields=['updated_at', 'id'], name='catalog_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pending',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='pending_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stickynote',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='stickynote_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todayplan',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='todayplan_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['collection', 'user_id', 'id'], name='tombstone_sync_idx'),
+        ),
+    ]
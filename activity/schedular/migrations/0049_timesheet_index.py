@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedular', '0048_sync_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['user', 'actual_start_time'], name='activitylog_timesheet_idx'),
+        ),
+    ]
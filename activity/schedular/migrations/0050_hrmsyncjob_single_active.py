@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+def fail_duplicate_active_jobs(apps, schema_editor):
+    """Keep the oldest pending/running job; fail the others so the constraint can be added"""
+    HRMSyncJob = apps.get_model('schedular', 'HRMSyncJob')
+    active = HRMSyncJob.objects.filter(status__in=('PENDING', 'RUNNING')).order_by('created_at', 'id')
+    keep = active.values_list('id', flat=True).first()
+    if keep is not None:
+        active.exclude(id=keep).update(status='FAILED', message='Superseded by an earlier job')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedular', '0049_timesheet_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_active_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='hrmsyncjob',
+            constraint=models.UniqueConstraint(models.Value(1), condition=models.Q(('status__in', ('PENDING', 'RUNNING'))), name='hrmsyncjob_single_active'),
+        ),
+    ]
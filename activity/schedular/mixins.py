@@ -1,5 +1,8 @@
 from django.db.models import Q
-from .models import User
+from . import fieldsets
+from .auth_context import AuthContext, get_auth_context
+from .scopes import assigned_tasks
+from .visibility import PLANNER_REASONS, ROLE_PROJECT_REASONS, TASK_PROJECT_REASONS, visible_project_ids
 
 class RoleBasedQuerySetMixin:
     """
@@ -7,37 +10,30 @@ class RoleBasedQuerySetMixin:
     This ensures users only see data they are permitted to see.
     """
     
+    @property
+    def auth_context(self):
+        """Per-request role/hierarchy cache (see schedular.auth_context)"""
+        return get_auth_context(self.request)
+
     def get_queryset_for_role(self, queryset, user):
+        context = self.auth_context if user is self.request.user else AuthContext(user)
+
         # Admin sees everything
-        if user.role == 'ADMIN':
+        if context.role == 'ADMIN':
             return queryset
         
         # Managers see everything in their hierarchy
-        if user.role == 'MANAGER':
-            subordinates = user.get_all_subordinates()
-            # Assuming 'user', 'created_by', 'assigned_to', or similar fields exist on the model
-            # This is a generic fallback, but specific mixins below act better
-            if hasattr(queryset.model, 'user'):
-                return queryset.filter(Q(user=user) | Q(user__in=subordinates))
-            elif hasattr(queryset.model, 'created_by'):
-                return queryset.filter(Q(created_by=user) | Q(created_by__in=subordinates))
-            return queryset
-
         # Team Leads see their team's data
-        if user.role == 'TEAMLEAD':
-            team_members = user.get_team_members()
-            if hasattr(queryset.model, 'user'):
-                return queryset.filter(Q(user=user) | Q(user__in=team_members))
-            elif hasattr(queryset.model, 'created_by'):
-                 return queryset.filter(Q(created_by=user) | Q(created_by__in=team_members))
-            return queryset
-            
         # Employees see only their own data
-        if user.role == 'EMPLOYEE':
+        if context.role in ['MANAGER', 'TEAMLEAD', 'EMPLOYEE']:
+            # Assuming 'user', 'created_by', 'assigned_to', or similar fields exist on the model
+            # This is a generic fallback, but specific mixins below act better
             if hasattr(queryset.model, 'user'):
-                return queryset.filter(user=user)
+                return queryset.filter(user_id__in=context.scope_user_ids)
             elif hasattr(queryset.model, 'created_by'):
-                return queryset.filter(created_by=user)
+                return queryset.filter(created_by_id__in=context.scope_user_ids)
+            if context.role != 'EMPLOYEE':
+                return queryset
                 
         return queryset.none()  # Default deny
 
@@ -72,53 +68,19 @@ class ProjectQuerySetMixin(RoleBasedQuerySetMixin):
             
         if for_planner:
             # For planner catalog: ALL users (including ADMIN) only see projects where they have assigned tasks
-            return queryset.filter(
-                Q(project_lead=user) |
-                Q(handled_by=user) |
-                Q(tasks__assignees__user=user)
-            ).distinct()
+            # (lead, handled_by or a task assignee - see ProjectVisibility)
+            return queryset.filter(id__in=visible_project_ids(user, PLANNER_REASONS))
         
         # Normal behavior: Admin sees all for dashboard/management
         if user.role == 'ADMIN':
             return queryset
-            
-        if user.role == 'MANAGER':
-            # Manager sees projects where they are lead, handled_by, or created_by
-            # OR projects where the lead/handler is one of their subordinates
-            subordinates = user.get_all_subordinates()
-            return queryset.filter(
-                Q(project_lead=user) | 
-                Q(handled_by=user) | 
-                Q(created_by=user) |
-                Q(project_lead__in=subordinates) |
-                Q(handled_by__in=subordinates) |
-                Q(created_by__in=subordinates)
-            ).distinct()
-            
-        if user.role == 'TEAMLEAD':
-            # Team Lead sees projects where they are involved
-            # OR projects where their direct reports are involved
-            team_members = user.get_team_members()
-            return queryset.filter(
-                Q(project_lead=user) | 
-                Q(handled_by=user) | 
-                Q(created_by=user) |
-                Q(project_lead__in=team_members) |
-                Q(handled_by__in=team_members) |
-                Q(created_by__in=team_members) |
-                # Also include projects where specific TASKS are assigned to team
-                Q(tasks__assignees__user__in=team_members)
-            ).distinct()
-            
-        if user.role == 'EMPLOYEE':
-            # Employee only sees projects assigned to them directly (if any)
-            # OR projects containing tasks assigned to them
-            return queryset.filter(
-                Q(project_lead=user) |
-                Q(handled_by=user) |
-                Q(assignees=user) |
-                Q(tasks__assignees__user=user)
-            ).distinct()
+        
+        # Manager: lead/handled_by/created_by by them or any of their subordinates
+        # Team Lead: same for their direct team, plus projects with tasks assigned to the team
+        # Employee: lead/handled_by, project assignee, or assigned to one of its tasks
+        # ProjectVisibility holds these relations, so this is one semi-join without DISTINCT
+        if user.role in ROLE_PROJECT_REASONS:
+            return queryset.filter(id__in=visible_project_ids(user, ROLE_PROJECT_REASONS[user.role]))
             
         return queryset.none()
 
@@ -148,40 +110,47 @@ class TaskQuerySetMixin(RoleBasedQuerySetMixin):
         
         if for_planner:
             # For planner catalog: ALL users (including ADMIN) only see tasks assigned to them
-            return queryset.filter(
-                assignees__user=user
-            ).distinct()
+            return queryset.filter(assigned_tasks(user))
         
         # Normal behavior: Admin sees all for dashboard/management
         if user.role == 'ADMIN':
             return queryset
-            
-        if user.role == 'MANAGER':
-            subordinates = user.get_all_subordinates()
-            return queryset.filter(
-                Q(assignees__user=user) |
-                Q(project__project_lead=user) |
-                Q(project__handled_by=user) |
-                Q(assignees__user__in=subordinates) |
-                Q(project__project_lead__in=subordinates)
-            ).distinct()
-            
-        if user.role == 'TEAMLEAD':
-            team_members = user.get_team_members()
-            return queryset.filter(
-                Q(assignees__user=user) |
-                Q(project__project_lead=user) |
-                Q(assignees__user__in=team_members)
-            ).distinct()
-            
-        if user.role == 'EMPLOYEE':
-            # Employees only see tasks assigned to them Or the task in the project that assigned to them
-            return queryset.filter(
-                Q(assignees__user=user) | 
-                Q(project__assignees=user) |
-                Q(project__project_lead=user) |
-                Q(project__handled_by=user)
-            ).distinct()
-            
-        return queryset.none()
+        
+        # Manager: assigned to them or a subordinate, or in a project led/handled by them
+        # (or led by a subordinate)
+        # Team Lead: assigned to them or their team, or in a project they lead
+        # Employee: assigned to them, or in a project they lead/handle/are assigned to
+        if user.role not in TASK_PROJECT_REASONS:
+            return queryset.none()
+        assignee_ids = self.auth_context.scope_user_ids
+        
+        return queryset.filter(
+            assigned_tasks(assignee_ids) |
+            Q(project_id__in=visible_project_ids(user, TASK_PROJECT_REASONS[user.role]))
+        )
+
+
+class SparseFieldsetMixin:
+    """
+    ?fields= / ?expand= on GET responses (see schedular.fieldsets).
+    Must come before the queryset mixins in the bases.
+    """
+    # Actions whose queryset is loaded for the serializer's remaining fields
+    fieldset_actions = ('list', 'retrieve')
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fieldset = fieldsets.requested(self.request)
+        if fieldset:
+            fieldsets.prune(serializer, fieldset)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action in self.fieldset_actions and self.request.method in ('GET', 'HEAD'):
+            queryset = self.with_fieldset_loading(queryset)
+        return queryset
 
+    def with_fieldset_loading(self, queryset):
+        """Join / prefetch what the (pruned) serializer of this action reads"""
+        return fieldsets.optimize(queryset, self.get_serializer())
@@ -1,10 +1,77 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractBaseUser,BaseUserManager
 from django.utils import timezone
 from datetime import timedelta
 import random
 import uuid
 # Create your models here.
+class DirtyFieldsMixin:
+    """
+    Model mixin that remembers field values as loaded from the DB.
+
+    save() on an existing row only writes the fields that changed (plus auto_now
+    fields), and skips the write entirely when nothing changed. The set of changed
+    field names is exposed as `instance.changed_fields` while post_save receivers
+    run, so they can skip work that is irrelevant to the change.
+
+    Fields listed in `maintained_fields` are kept up to date with queryset
+    updates elsewhere; they never count as changed, so save() does not write a
+    possibly stale in-memory value back over them.
+    """
+    maintained_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_loaded_values()
+        return instance
+
+    def _snapshot_loaded_values(self, fields=None):
+        if fields is None or not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+        for field in self._meta.concrete_fields:
+            if field.attname in self.__dict__ and (fields is None or field.name in fields or field.attname in fields):
+                self._loaded_values[field.attname] = self.__dict__[field.attname]
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot_loaded_values(fields)
+
+    def get_loaded_value(self, attname, default=None):
+        """Value of a field as last loaded from / written to the DB"""
+        return getattr(self, '_loaded_values', {}).get(attname, default)
+
+    def get_changed_fields(self):
+        """Names of concrete fields that differ from their loaded values"""
+        fields = [f for f in self._meta.concrete_fields if not f.primary_key and f.name not in self.maintained_fields]
+        if self._state.adding or not hasattr(self, '_loaded_values'):
+            return {f.name for f in fields}
+        return {
+            f.name for f in fields
+            if f.attname in self.__dict__
+            and (f.attname not in self._loaded_values or self.__dict__[f.attname] != self._loaded_values[f.attname])
+        }
+
+    def save(self, *args, **kwargs):
+        changed = self.get_changed_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            names = {self._meta.get_field(name).name for name in update_fields}
+            changed &= names
+        elif not self._state.adding and not kwargs.get('force_insert'):
+            if hasattr(self, '_loaded_values'):
+                auto_now = {f.name for f in self._meta.concrete_fields if getattr(f, 'auto_now', False)}
+                kwargs['update_fields'] = (changed | auto_now) if changed else []
+            elif self.maintained_fields:
+                # Nothing loaded to compare with: write every field but the maintained ones
+                kwargs['update_fields'] = changed
+        self.changed_fields = frozenset(changed)
+        super().save(*args, **kwargs)
+        self._snapshot_loaded_values(kwargs.get('update_fields'))
+
+
 class UserManager(BaseUserManager):
    def create_user(self, email, password=None,role = 'EMPLOYEE'):
       if not email:
@@ -16,7 +83,7 @@ class UserManager(BaseUserManager):
    def create_superuser(self, email, password):
       return self.create_user(email=email, password=password, role="ADMIN")
    
-class User(AbstractBaseUser):
+class User(DirtyFieldsMixin, AbstractBaseUser):
    ROLE_CHOICES = (
       ('ADMIN', 'Admin'),
       ('EMPLOYEE', 'Employee'),
@@ -264,7 +331,7 @@ class OTPVerification(models.Model):
         return f"{self.email} - {self.otp_type} - {self.otp}"
 
 
-class Projects(models.Model):
+class Projects(DirtyFieldsMixin, models.Model):
     status_choice = (
          ('ACTIVE', 'ACTIVE'),
          ('COMPLETED', 'COMPLETED'),
@@ -278,6 +345,7 @@ class Projects(models.Model):
     description = models.TextField()
     working_hours = models.IntegerField()
     planned_hours = models.FloatField(default=0.0)
+    allocated_planned_hours = models.FloatField(default=0.0, help_text='Sum of planned hours of all tasks, maintained on task writes')
     create_date = models.DateTimeField(auto_now_add=True)
     duration = models.IntegerField()
     completed_date = models.DateField(null=True,blank=True)
@@ -289,9 +357,26 @@ class Projects(models.Model):
     rejection_reason = models.TextField(null=True, blank=True)
     assignees = models.ManyToManyField(User, related_name='assigned_projects', blank=True)
 
+    # Maintained with F() updates from Task writes (adjust_allocated_hours)
+    maintained_fields = ('allocated_planned_hours',)
+
     def get_planned_hours_total(self):
         """Sum of planned hours for all tasks in this project"""
-        return self.tasks.aggregate(total=models.Sum('planned_hours'))['total'] or 0.0
+        return self.allocated_planned_hours or 0.0
+
+    @classmethod
+    def adjust_allocated_hours(cls, project_id, delta):
+        """Atomically shift the maintained task planned-hours total of a project"""
+        if project_id and delta:
+            cls.objects.filter(pk=project_id).update(
+                allocated_planned_hours=models.F('allocated_planned_hours') + delta
+            )
+
+    def recalculate_allocated_hours(self):
+        """Rebuild the maintained total from the tasks table"""
+        self.allocated_planned_hours = self.tasks.aggregate(total=models.Sum('planned_hours'))['total'] or 0.0
+        Projects.objects.filter(pk=self.pk).update(allocated_planned_hours=self.allocated_planned_hours)
+        return self.allocated_planned_hours
 
     def get_achieved_hours(self):
         """Sum of achieved hours for all COMPLETED tasks in this project"""
@@ -302,6 +387,41 @@ class Projects(models.Model):
         return self.name
 
 
+class ProjectVisibility(models.Model):
+    """
+    Materialized project access list: one row per (user, project, reason).
+
+    Direct reasons record how a user is attached to a project; TEAM_* rows are
+    derived from the viewer's hierarchy (all subordinates for managers, direct
+    team members for team leads). Maintained by schedular/visibility.py and
+    rebuilt with `python manage.py rebuild_project_visibility`.
+    """
+    REASON_CHOICES = (
+        ('LEAD', 'Project lead'),
+        ('HANDLER', 'Handled by'),
+        ('CREATOR', 'Created by'),
+        ('MEMBER', 'Project assignee'),
+        ('TASK', 'Task assignee'),
+        ('TEAM_LEAD', 'Team: project lead'),
+        ('TEAM_HANDLER', 'Team: handled by'),
+        ('TEAM_CREATOR', 'Team: created by'),
+        ('TEAM_TASK', 'Team: task assignee'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='project_visibility')
+    project = models.ForeignKey(Projects, on_delete=models.CASCADE, related_name='visibility')
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+
+    class Meta:
+        unique_together = ('user', 'project', 'reason')
+        indexes = [
+            models.Index(fields=['user', 'reason', 'project'], name='projvis_user_reason_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.project_id} ({self.reason})"
+
+
 class ApprovalRequest(models.Model):
     """Model for users to request approvals"""
     
@@ -363,7 +483,7 @@ class ApprovalResponse(models.Model):
         self.approval_request.save()
         super().save(*args, **kwargs)
 
-class Task(models.Model):
+class Task(DirtyFieldsMixin, models.Model):
     """Model for tasks created after project approval"""
     
     PRIORITY_CHOICES = (
@@ -402,12 +522,19 @@ class Task(models.Model):
     due_date = models.DateField()
     planned_hours = models.FloatField(default=0.0)
 
+    def budget_fields_changed(self):
+        """True when planned_hours or project differ from the values loaded from the DB"""
+        return bool({'planned_hours', 'project'} & self.get_changed_fields())
+
     def clean(self):
         """Ensure task planned hours don't exceed project planned_hours budget"""
-        if self.planned_hours > 0 and self.project.planned_hours > 0:
-            total_planned = self.project.tasks.exclude(id=self.id).aggregate(
-                total=models.Sum('planned_hours')
-            )['total'] or 0
+        if self.budget_fields_changed() and self.planned_hours > 0 and self.project.planned_hours > 0:
+            # Use the maintained project total instead of re-aggregating sibling tasks
+            total_planned = Projects.objects.filter(pk=self.project_id).values_list(
+                'allocated_planned_hours', flat=True
+            ).first() or 0
+            if not self._state.adding and self.get_loaded_value('project_id') == self.project_id:
+                total_planned -= self.get_loaded_value('planned_hours') or 0
             
             if total_planned + self.planned_hours > self.project.planned_hours:
                 from django.core.exceptions import ValidationError
@@ -418,8 +545,28 @@ class Task(models.Model):
         super().clean()
 
     def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+        adding = self._state.adding
+        # Only validate what changed; status-only saves skip FK/budget lookups
+        changed = self.get_changed_fields()
+        self.full_clean(exclude=None if adding else [
+            f.name for f in self._meta.concrete_fields if f.name not in changed
+        ])
+        budget_changed = self.budget_fields_changed()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {'planned_hours', 'project', 'project_id'} & set(update_fields):
+            budget_changed = False
+        old_project_id = self.get_loaded_value('project_id')
+        old_hours = self.get_loaded_value('planned_hours') or 0
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if budget_changed:
+                if adding:
+                    Projects.adjust_allocated_hours(self.project_id, self.planned_hours or 0)
+                elif old_project_id != self.project_id:
+                    Projects.adjust_allocated_hours(old_project_id, -old_hours)
+                    Projects.adjust_allocated_hours(self.project_id, self.planned_hours or 0)
+                else:
+                    Projects.adjust_allocated_hours(self.project_id, (self.planned_hours or 0) - old_hours)
     
     next_occurrence = models.DateField(null=True, blank=True, help_text='For recurring tasks')
     recurrence_pattern = models.CharField(max_length=20, choices=RECURRENCE_PATTERN_CHOICES, null=True, blank=True)
@@ -461,28 +608,36 @@ class Task(models.Model):
             # If no subtasks, check if task itself is done (fallback)
             return 100 if self.status == 'DONE' else 0
         
-        completed_count = subtasks.filter(status='DONE').count()
+        if 'subtasks' in getattr(self, '_prefetched_objects_cache', {}):
+            # Prefetched (list serializers): count in memory instead of one query per task
+            completed_count = sum(1 for subtask in subtasks if subtask.status == 'DONE')
+        else:
+            completed_count = subtasks.filter(status='DONE').count()
         return round((completed_count / count) * 100)
     
     def regenerate_recurring_task(self):
         """Regenerate a new instance of this recurring task"""
         if self.task_type != 'RECURRING' or not self.recurrence_pattern:
             return None
-        from datetime import timedelta
-        from dateutil.relativedelta import relativedelta
+        from .recurrence import get_next_occurrence, series_key
         
         # Calculate next occurrence based on pattern
-        if self.recurrence_pattern == 'DAILY':
-            next_occurrence = self.next_occurrence + timedelta(days=1)
-        elif self.recurrence_pattern == 'WEEKLY':
-            next_occurrence = self.next_occurrence + timedelta(weeks=1)
-        elif self.recurrence_pattern == 'MONTHLY':
-            next_occurrence = self.next_occurrence + relativedelta(months=1)
-        elif self.recurrence_pattern == 'YEARLY':
-            next_occurrence = self.next_occurrence + relativedelta(years=1)
-        else:
+        next_occurrence = get_next_occurrence(self.next_occurrence, self.recurrence_pattern)
+        if next_occurrence is None:
             return None
         
+        # Idempotent: the occurrence may already have been materialized in bulk
+        project_id, title, pattern = series_key(self)
+        existing = Task.objects.filter(
+            project_id=project_id,
+            title=title,
+            recurrence_pattern=pattern,
+            task_type='RECURRING',
+            next_occurrence=next_occurrence
+        ).first()
+        if existing:
+            return existing
+        
         # Create new task instance
         new_task = Task.objects.create(
             title=self.title,
@@ -536,7 +691,7 @@ class TaskAssignee(models.Model):
     def __str__(self):
         return f"{self.user.email} - {self.task.title} ({self.role})"
     
-class SubTask(models.Model):
+class SubTask(DirtyFieldsMixin, models.Model):
     """Model for subtasks under a main task"""
     
     STATUS_CHOICES = (
@@ -617,7 +772,7 @@ class Notification(models.Model):
 
     
 
-class Catalog(models.Model):
+class Catalog(DirtyFieldsMixin, models.Model):
     """Master catalog containing all work items (Projects, Tasks, Courses, Routines)"""
     CATALOG_TYPE_CHOICES = (
         ('PROJECT', 'Project'),
@@ -646,37 +801,119 @@ class Catalog(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='catalog_sync_idx'),
+        ]
     
     def __str__(self):
         return f"{self.catalog_type}: {self.name}"
     
+    @staticmethod
+    def progress_from_counts(task_status=None, subtask_count=0, subtask_done=0,
+                             has_project=False, task_count=0, task_done=0):
+        """Progress rule shared by single-item and bulk recalculation"""
+        if task_status is not None:
+            if task_status == 'DONE':
+                return 100
+            if task_status == 'IN_PROGRESS':
+                # Calculate based on subtasks if available
+                if subtask_count > 0:
+                    return int((subtask_done / subtask_count) * 100)
+                return 50  # Default for in-progress
+            return 0
+        if has_project and task_count > 0:
+            return int((task_done / task_count) * 100)
+        return 0
+
     def calculate_progress(self):
         """Calculate progress based on linked task or project"""
         if self.task:
-            if self.task.status == 'DONE':
-                self.progress_percentage = 100
-            elif self.task.status == 'IN_PROGRESS':
-                # Calculate based on subtasks if available
-                subtasks = self.task.subtasks.all()
-                if subtasks.count() > 0:
-                    completed = subtasks.filter(status='DONE').count()
-                    self.progress_percentage = int((completed / subtasks.count()) * 100)
-                else:
-                    self.progress_percentage = 50  # Default for in-progress
-            else:
-                self.progress_percentage = 0
+            subtasks = self.task.subtasks.all()
+            subtask_count = subtasks.count() if self.task.status == 'IN_PROGRESS' else 0
+            self.progress_percentage = self.progress_from_counts(
+                task_status=self.task.status,
+                subtask_count=subtask_count,
+                subtask_done=subtasks.filter(status='DONE').count() if subtask_count else 0,
+            )
         elif self.project:
             tasks = self.project.tasks.all()
-            if tasks.count() > 0:
-                completed = tasks.filter(status='DONE').count()
-                self.progress_percentage = int((completed / tasks.count()) * 100)
-            else:
-                self.progress_percentage = 0
+            self.progress_percentage = self.progress_from_counts(
+                has_project=True,
+                task_count=tasks.count(),
+                task_done=tasks.filter(status='DONE').count(),
+            )
         self.save()
         return self.progress_percentage
 
+    @classmethod
+    def bulk_calculate_progress(cls, queryset=None):
+        """
+        Recalculate progress for many catalog items at once.
+
+        Subtask/task completion counts are annotated in a single query and only
+        rows whose percentage changed are written back with bulk_update.
+        Returns (checked_count, updated_count).
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+
+        def count_subquery(model, fk, outer, **filters):
+            return Coalesce(Subquery(
+                model.objects.filter(**{fk: OuterRef(outer)}, **filters)
+                .order_by().values(fk).annotate(c=Count('pk')).values('c')[:1]
+            ), 0)
+
+        rows = (
+            queryset.filter(models.Q(task__isnull=False) | models.Q(project__isnull=False))
+            .annotate(
+                linked_task_status=models.F('task__status'),
+                subtask_count=count_subquery(SubTask, 'task', 'task_id'),
+                subtask_done=count_subquery(SubTask, 'task', 'task_id', status='DONE'),
+                task_count=count_subquery(Task, 'project', 'project_id'),
+                task_done=count_subquery(Task, 'project', 'project_id', status='DONE'),
+            )
+            .only('id', 'task_id', 'project_id', 'progress_percentage')
+        )
+
+        now = timezone.now()
+        changed = []
+        checked = 0
+        for catalog in rows:
+            checked += 1
+            progress = cls.progress_from_counts(
+                task_status=catalog.linked_task_status if catalog.task_id else None,
+                subtask_count=catalog.subtask_count,
+                subtask_done=catalog.subtask_done,
+                has_project=catalog.project_id is not None,
+                task_count=catalog.task_count,
+                task_done=catalog.task_done,
+            )
+            if progress != catalog.progress_percentage:
+                catalog.progress_percentage = progress
+                catalog.updated_at = now
+                changed.append(catalog)
+
+        if changed:
+            cls.objects.bulk_update(changed, ['progress_percentage', 'updated_at'], batch_size=500)
+        return checked, len(changed)
+
+    @classmethod
+    def refresh_progress_for(cls, task_ids=(), project_ids=()):
+        """Incrementally refresh catalog items linked to the given tasks/projects"""
+        task_ids = [pk for pk in task_ids if pk]
+        project_ids = [pk for pk in project_ids if pk]
+        if not task_ids and not project_ids:
+            return 0, 0
+        return cls.bulk_calculate_progress(
+            cls.objects.filter(
+                models.Q(task_id__in=task_ids)
+                | models.Q(project_id__in=project_ids)
+                | models.Q(task__project_id__in=project_ids)
+            )
+        )
+
 
-class TodayPlan(models.Model):
+class TodayPlan(DirtyFieldsMixin, models.Model):
     """Daily plan - items dragged from catalog with scheduled times"""
     STATUS_CHOICES = (
         ('PLANNED', 'Planned'),
@@ -706,25 +943,40 @@ class TodayPlan(models.Model):
     planned_duration_minutes = models.IntegerField(help_text="Planned duration in minutes")
     
     quadrant = models.CharField(max_length=2, choices=QUADRANT_CHOICES, default='Q2', help_text="Eisenhower Matrix quadrant")
-    order_index = models.IntegerField(default=0, help_text="Order in today's plan")
+    order_index = models.IntegerField(default=0, help_text="Sparse ordering key in the user's day (see ordering.py)")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PLANNED')
     
     is_unplanned = models.BooleanField(default=False, help_text="True if this was an unplanned addition to the daily plan")
     notes = models.TextField(blank=True, null=True)
     
+    # Task / project this plan's work counts towards, resolved at write time (see links.py)
+    resolved_task = models.ForeignKey(Task, on_delete=models.SET_NULL, null=True, blank=True, related_name='resolved_plans')
+    resolved_project = models.ForeignKey(Projects, on_delete=models.SET_NULL, null=True, blank=True, related_name='resolved_plans')
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['plan_date', 'order_index']
         unique_together = ['user', 'plan_date', 'order_index']
+        indexes = [
+            models.Index(fields=['user', 'updated_at', 'id'], name='todayplan_sync_idx'),
+        ]
     
     def __str__(self):
         task_name = self.catalog_item.name if self.catalog_item else self.custom_title
         return f"{self.user.email} - {task_name} on {self.plan_date}"
+    
+    def save(self, *args, **kwargs):
+        if self._state.adding or self.get_changed_fields() & {'catalog_item', 'custom_title'}:
+            from .links import plan_link
+            self.resolved_task_id, self.resolved_project_id = plan_link(self)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'resolved_task', 'resolved_project'}
+        super().save(*args, **kwargs)
 
 
-class ActivityLog(models.Model):
+class ActivityLog(DirtyFieldsMixin, models.Model):
     """Tracks actual work time when user clicks arrow on today's plan item"""
     STATUS_CHOICES = (
         ('IN_PROGRESS', 'In Progress'),
@@ -753,15 +1005,32 @@ class ActivityLog(models.Model):
     work_notes = models.TextField(blank=True, null=True, help_text="Notes about the work done")
     is_task_completed = models.BooleanField(default=False)
     
+    # Copied from today_plan so analytics aggregate on an indexed FK (see links.py)
+    resolved_task = models.ForeignKey(Task, on_delete=models.SET_NULL, null=True, blank=True, related_name='resolved_activity_logs')
+    resolved_project = models.ForeignKey(Projects, on_delete=models.SET_NULL, null=True, blank=True, related_name='resolved_activity_logs')
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'updated_at', 'id'], name='activitylog_sync_idx'),
+            # Timesheet export (timesheets.py) reads per user in start-time order
+            models.Index(fields=['user', 'actual_start_time'], name='activitylog_timesheet_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.today_plan.catalog_item.name} - {self.status}"
     
+    def save(self, *args, **kwargs):
+        if self._state.adding or 'today_plan' in self.get_changed_fields():
+            self.resolved_task_id = self.today_plan.resolved_task_id
+            self.resolved_project_id = self.today_plan.resolved_project_id
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'resolved_task', 'resolved_project'}
+        super().save(*args, **kwargs)
+    
     def calculate_time_worked(self):
         """Calculate time worked when stopped"""
         if self.actual_end_time:
@@ -797,6 +1066,9 @@ class Pending(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'updated_at', 'id'], name='pending_sync_idx'),
+        ]
 
 class DailyPlanner(models.Model):
     """Tracks daily planned hours and targets for users"""
@@ -844,6 +1116,87 @@ class StickyNote(models.Model):
 
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['user', 'updated_at', 'id'], name='stickynote_sync_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - Note {self.id}"
+
+
+class HRMSyncJob(models.Model):
+    """Background HRM employee sync, polled by the client for progress"""
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    )
+    ACTIVE_STATUSES = ('PENDING', 'RUNNING')
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING', db_index=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='hrm_sync_jobs')
+
+    total = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)
+    created = models.IntegerField(default=0)
+    updated = models.IntegerField(default=0)
+    errors = models.IntegerField(default=0)
+    error_details = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            # At most one pending or running job (enqueue_sync relies on it)
+            models.UniqueConstraint(
+                models.Value(1),
+                condition=models.Q(status__in=('PENDING', 'RUNNING')),
+                name='hrmsyncjob_single_active',
+            ),
+        ]
+
+    def __str__(self):
+        return f"HRM sync #{self.id} - {self.status}"
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'total': self.total,
+            'processed': self.processed,
+            'created': self.created,
+            'updated': self.updated,
+            'errors': self.errors,
+            'error_details': self.error_details or None,
+            'message': self.message,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class SyncTombstone(models.Model):
+    """
+    A deleted row of a collection served by /api/sync/ (see sync.py), so offline
+    clients can drop their copy. user_id is the owner of the deleted row (None for
+    shared collections such as the catalog); kept as a plain integer so the
+    tombstones of a deleted user's rows do not block the user's own deletion.
+    """
+    collection = models.CharField(max_length=30)
+    object_id = models.IntegerField()
+    user_id = models.IntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['collection', 'user_id', 'id'], name='tombstone_sync_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.collection} #{self.object_id} deleted at {self.deleted_at}"
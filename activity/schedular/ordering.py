@@ -0,0 +1,138 @@
+"""
+Sparse ordering keys for TodayPlan
+
+TodayPlan.order_index is unique per (user, plan_date). Keys are spaced
+ORDER_GAP apart so that moving one plan rewrites only that plan: it takes the
+midpoint between its new neighbours (or a gap past the first / last plan).
+When two neighbours are adjacent the day is rebalanced - re-spaced in its
+current order - before the move.
+
+Rewrites that permute several keys (rebalance, bulk reorder) first park the
+affected rows on temporary keys below every key of their days, then write the
+final keys with one bulk_update, so the unique constraint never sees two rows
+sharing a key in the middle of the update.
+"""
+from django.db import transaction
+from django.db.models import F, Min
+from django.utils import timezone
+
+from .models import TodayPlan
+
+ORDER_GAP = 1024
+BATCH_SIZE = 500
+
+
+def spaced_keys(count):
+    return [(i + 1) * ORDER_GAP for i in range(count)]
+
+
+def _assign(scope, plan_ids, keys, parked=None):
+    """
+    Give plan_ids[i] the key keys[i]. `scope` holds every row that could share a
+    key with them, `parked` the rows to park (default: plan_ids).
+    """
+    if not plan_ids:
+        return {}
+    lowest = min(scope.aggregate(low=Min('order_index'))['low'] or 0, 0) - 1
+    if parked is None:
+        parked = TodayPlan.objects.filter(id__in=plan_ids)
+    parked.update(order_index=lowest - F('id'))
+
+    now = timezone.now()
+    TodayPlan.objects.bulk_update(
+        [TodayPlan(id=pk, order_index=key, updated_at=now) for pk, key in zip(plan_ids, keys)],
+        ['order_index', 'updated_at'],
+        batch_size=BATCH_SIZE,
+    )
+    return dict(zip(plan_ids, keys))
+
+
+def key_after(plan):
+    """Key for a plan appended after `plan`, the current last plan of its day (None: empty day)"""
+    return _between(None if plan is None else plan.order_index, None)
+
+
+def next_order_index(user, plan_date):
+    """Key for a plan appended at the end of the user's day"""
+    return key_after(
+        TodayPlan.objects.filter(user=user, plan_date=plan_date).only('order_index').order_by('-order_index').first()
+    )
+
+
+def rebalance(user_id, plan_date):
+    """Re-space one day's keys ORDER_GAP apart, keeping the current order. Returns {plan_id: order_index}."""
+    day = TodayPlan.objects.filter(user_id=user_id, plan_date=plan_date)
+    with transaction.atomic():
+        plan_ids = list(day.select_for_update().order_by('order_index', 'id').values_list('id', flat=True))
+        return _assign(day, plan_ids, spaced_keys(len(plan_ids)), parked=day)
+
+
+def _between(lower, upper):
+    """A free key strictly between two neighbour keys (None: no neighbour), or None when they are adjacent"""
+    if lower is None and upper is None:
+        return ORDER_GAP
+    if lower is None:
+        return upper - ORDER_GAP
+    if upper is None:
+        return lower + ORDER_GAP
+    if upper - lower < 2:
+        return None
+    return (lower + upper) // 2
+
+
+def move(plan, after_id=None):
+    """
+    Place `plan` directly after plan `after_id` of the same day (None: first).
+    A single-row UPDATE unless the new neighbours' keys are adjacent, in which
+    case the day is rebalanced first. Returns (order_index, rebalanced).
+    Raises TodayPlan.DoesNotExist when `after_id` is not a plan of that day.
+    """
+    others = TodayPlan.objects.filter(user_id=plan.user_id, plan_date=plan.plan_date).exclude(pk=plan.pk)
+    rebalanced = False
+    with transaction.atomic():
+        while True:
+            lower = None
+            if after_id is not None:
+                lower = others.filter(pk=after_id).values_list('order_index', flat=True).first()
+                if lower is None:
+                    raise TodayPlan.DoesNotExist(f'Plan {after_id} is not part of this day')
+            following = others if lower is None else others.filter(order_index__gt=lower)
+            upper = following.order_by('order_index').values_list('order_index', flat=True).first()
+            key = _between(lower, upper)
+            if key is not None or rebalanced:
+                break
+            rebalance(plan.user_id, plan.plan_date)
+            rebalanced = True
+
+        TodayPlan.objects.filter(pk=plan.pk).update(order_index=key, updated_at=timezone.now())
+    plan.order_index = key
+    return key, rebalanced
+
+
+def reorder(user, plan_ids):
+    """
+    Apply a drag-and-drop order in one bulk_update: per day, the listed plans
+    take the keys they already hold, in the order given, so plans left out of
+    the list keep their places. Ids of other users' plans are ignored.
+    Returns {plan_id: order_index}.
+    """
+    plan_ids = list(dict.fromkeys(plan_ids))
+    with transaction.atomic():
+        rows = TodayPlan.objects.select_for_update().filter(user=user, id__in=plan_ids).values_list(
+            'id', 'plan_date', 'order_index'
+        )
+        days, keys = {}, {}
+        for pk, plan_date, order_index in rows:
+            days[pk] = plan_date
+            keys.setdefault(plan_date, []).append(order_index)
+
+        ordered, new_keys = [], []
+        remaining = {plan_date: sorted(day_keys) for plan_date, day_keys in keys.items()}
+        for pk in plan_ids:
+            if pk in days:
+                ordered.append(pk)
+                new_keys.append(remaining[days[pk]].pop(0))
+
+        scope = TodayPlan.objects.filter(user=user, plan_date__in=list(keys))
+        return _assign(scope, ordered, new_keys)
+
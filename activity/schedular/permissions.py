@@ -1,18 +1,20 @@
 from rest_framework.permissions import BasePermission
 
+from .auth_context import get_auth_context
+
 class IsAdmin(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role == 'ADMIN'
+        return request.user.is_authenticated and get_auth_context(request).role == 'ADMIN'
     
     def has_object_permission(self, request, view, obj):
         return True # Admin has full access
 
 class IsManager(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role in ['MANAGER','ADMIN']
+        return request.user.is_authenticated and get_auth_context(request).role in ['MANAGER','ADMIN']
     
     def has_object_permission(self, request, view, obj):
-        if request.user.role == 'ADMIN':
+        if get_auth_context(request).role == 'ADMIN':
             return True
         # Check if object is owned by manager or their subordinates
         # This implementation requires the object to have user-linking fields 
@@ -23,19 +25,19 @@ class IsManager(BasePermission):
 
 class IsTeamLead(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role in ['TEAMLEAD','ADMIN','MANAGER']
+        return request.user.is_authenticated and get_auth_context(request).role in ['TEAMLEAD','ADMIN','MANAGER']
     
     def has_object_permission(self, request, view, obj):
-        if request.user.role in ['ADMIN', 'MANAGER']:
+        if get_auth_context(request).role in ['ADMIN', 'MANAGER']:
             return True
         return True # Rely on queryset filtering
 
 class IsEmployee(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role in ['EMPLOYEE','TEAMLEAD','MANAGER','ADMIN']
+        return request.user.is_authenticated and get_auth_context(request).role in ['EMPLOYEE','TEAMLEAD','MANAGER','ADMIN']
         
     def has_object_permission(self, request, view, obj):
-        if request.user.role in ['ADMIN', 'MANAGER', 'TEAMLEAD']:
+        if get_auth_context(request).role in ['ADMIN', 'MANAGER', 'TEAMLEAD']:
             return True
         # For Employee, we must be strict
         # Example: obj.assignees.filter(user=request.user).exists()
@@ -0,0 +1,273 @@
+"""
+Adding items to a user's plan
+
+add_item and the batch endpoints (TodayPlanViewSet.bulk_add,
+PendingViewSet.bulk_replan) share plan_item_fields(), which turns one custom
+or catalog payload into TodayPlan fields. insert_plans() appends a whole batch
+for one user: the last plan of every target day is loaded once, keys and
+default start times chain from it (ordering.key_after), the rows go in with
+one bulk_create, and what TodayPlan.save() and today_plan_notification would
+have done per row - resolving task links, the websocket notice - happens once
+for the batch.
+"""
+from datetime import date, datetime, time, timedelta
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .links import relink_plans
+from .models import Catalog, TodayPlan
+from .ordering import key_after
+
+
+class PlanItemError(Exception):
+    """An add-to-plan payload that cannot be planned; carries the HTTP status to answer with"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def parse_plan_date(value):
+    if not value:
+        return timezone.now().date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise PlanItemError(f"Invalid plan_date '{value}', expected YYYY-MM-DD")
+
+
+def _parse_time(value, name):
+    """'HH:MM[:SS]' (or a time) -> time; None when absent. Raises PlanItemError."""
+    if not value or isinstance(value, time):
+        return value or None
+    if isinstance(value, str):
+        for fmt in ('%H:%M:%S', '%H:%M'):
+            try:
+                return datetime.strptime(value, fmt).time()
+            except ValueError:
+                pass
+    raise PlanItemError(f"Invalid {name} '{value}', expected HH:MM or HH:MM:SS")
+
+
+def _parse_minutes(value):
+    """planned_duration_minutes -> int. Raises PlanItemError."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise PlanItemError(f"Invalid planned_duration_minutes '{value}', expected a whole number of minutes")
+
+
+def _default_start(previous_end):
+    """Start after the plan it follows, else at the next full hour"""
+    now = timezone.now()
+    if previous_end:
+        return datetime.combine(now.date(), previous_end)
+    start_dt = now.replace(minute=0, second=0, microsecond=0)
+    if now.minute > 0:
+        start_dt = start_dt + timedelta(hours=1)
+    return start_dt
+
+
+def plan_item_fields(data, previous_end=None, catalog_items=None):
+    """
+    TodayPlan fields (besides user, plan_date and order_index) for one add_item payload.
+    previous_end: scheduled_end_time of the plan the item follows, for the default start time
+    catalog_items: {id: Catalog} preloaded for a batch; looked up when omitted
+    Raises PlanItemError.
+    """
+    item_type = (data.get('item_type') or '').lower()
+    quadrant = data.get('quadrant', 'Q2')
+    is_unplanned = data.get('is_unplanned', False)
+
+    # ==========================================
+    # CUSTOM TASK
+    # ==========================================
+    if item_type == 'custom':
+        title = data.get('title')
+        if not title:
+            raise PlanItemError("title is required for custom tasks")
+
+        description = data.get('description', '')
+        # Set default duration if not provided
+        planned_duration_minutes = _parse_minutes(data.get('planned_duration_minutes') or 30)
+        scheduled_start_time = _parse_time(data.get('scheduled_start_time'), 'scheduled_start_time')
+        scheduled_end_time = _parse_time(data.get('scheduled_end_time'), 'scheduled_end_time')
+
+        # Generate default scheduled times if not provided
+        if not scheduled_start_time:
+            scheduled_start_time = _default_start(previous_end).time()
+
+        # Calculate end time based on duration
+        if not scheduled_end_time and scheduled_start_time:
+            start_dt = datetime.combine(timezone.now().date(), scheduled_start_time)
+            end_dt = start_dt + timedelta(minutes=planned_duration_minutes)
+            scheduled_end_time = end_dt.time()
+
+        return {
+            'custom_title': title,
+            'custom_description': description,
+            'scheduled_start_time': scheduled_start_time,
+            'scheduled_end_time': scheduled_end_time,
+            'planned_duration_minutes': planned_duration_minutes,
+            'quadrant': quadrant,
+            'notes': description,
+            'is_unplanned': is_unplanned,
+        }
+
+    # ==========================================
+    # CATALOG ITEM
+    # ==========================================
+    if item_type == 'catalog':
+        catalog_id = data.get('catalog_id')
+        if not catalog_id:
+            raise PlanItemError("catalog_id is required for catalog items")
+
+        if catalog_items is None:
+            catalog_item = Catalog.objects.filter(id=catalog_id).first()
+        else:
+            catalog_item = catalog_items.get(_as_int(catalog_id))
+        if catalog_item is None:
+            raise PlanItemError("Catalog item not found", status_code=404)
+
+        scheduled_start_time = _parse_time(data.get('scheduled_start_time'), 'scheduled_start_time')
+        scheduled_end_time = _parse_time(data.get('scheduled_end_time'), 'scheduled_end_time')
+        planned_duration_minutes = data.get('planned_duration_minutes')
+
+        # Calculate duration if not provided
+        if planned_duration_minutes:
+            planned_duration_minutes = _parse_minutes(planned_duration_minutes)
+        else:
+            if scheduled_start_time and scheduled_end_time:
+                start_dt = datetime.combine(timezone.now().date(), scheduled_start_time)
+                end_dt = datetime.combine(timezone.now().date(), scheduled_end_time)
+                planned_duration_minutes = int((end_dt - start_dt).total_seconds() / 60)
+            else:
+                # Use estimated hours from catalog
+                planned_duration_minutes = int(float(catalog_item.estimated_hours) * 60)
+
+        # Generate default scheduled times if not provided
+        if not scheduled_start_time or not scheduled_end_time:
+            start_dt = _default_start(previous_end)
+            end_dt = start_dt + timedelta(minutes=planned_duration_minutes)
+            scheduled_start_time = start_dt.time()
+            scheduled_end_time = end_dt.time()
+
+        return {
+            'catalog_item': catalog_item,
+            'scheduled_start_time': scheduled_start_time,
+            'scheduled_end_time': scheduled_end_time,
+            'planned_duration_minutes': planned_duration_minutes,
+            'quadrant': quadrant,
+            'notes': data.get('notes', ''),
+            'is_unplanned': is_unplanned,
+        }
+
+    raise PlanItemError("item_type must be either 'custom' or 'catalog'")
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def last_plans(user, plan_dates):
+    """{plan_date: the user's last plan of that day} for the given days, in two queries"""
+    plan_dates = set(plan_dates)
+    if not plan_dates:
+        return {}
+    tails = (
+        TodayPlan.objects.filter(user=user, plan_date__in=plan_dates)
+        .values('plan_date').annotate(last=Max('order_index')).values_list('plan_date', 'last')
+    )
+    conditions = [Q(plan_date=plan_date, order_index=last) for plan_date, last in tails]
+    if not conditions:
+        return {}
+    return {plan.plan_date: plan for plan in TodayPlan.objects.filter(reduce(or_, conditions), user=user)}
+
+
+def build_plans(user, items, default_date=None):
+    """
+    Unsaved TodayPlans for a list of add_item payloads, appended in order to
+    their days. Returns (plans, errors) with errors keyed by item index.
+    """
+    dates, errors = [], {}
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise PlanItemError("Each item must be an object")
+            dates.append(parse_plan_date(item.get('plan_date') or default_date))
+        except PlanItemError as e:
+            dates.append(None)
+            errors[index] = str(e)
+
+    catalog_ids = {
+        _as_int(item.get('catalog_id')) for item, plan_date in zip(items, dates) if plan_date and item.get('catalog_id')
+    } - {None}
+    catalog_items = Catalog.objects.in_bulk(catalog_ids) if catalog_ids else {}
+    tails = last_plans(user, {d for d in dates if d})
+
+    plans = []
+    for index, (item, plan_date) in enumerate(zip(items, dates)):
+        if plan_date is None:
+            continue
+        previous = tails.get(plan_date)
+        try:
+            fields = plan_item_fields(item, previous.scheduled_end_time if previous else None, catalog_items)
+        except PlanItemError as e:
+            errors[index] = str(e)
+            continue
+        plan = TodayPlan(user=user, plan_date=plan_date, order_index=key_after(previous), **fields)
+        tails[plan_date] = plan
+        plans.append(plan)
+    return plans, errors
+
+
+def insert_plans(user, plans):
+    """bulk_create plans built by build_plans() and apply the per-row side effects once"""
+    if not plans:
+        return []
+    from .signals import send_websocket_notification
+
+    with transaction.atomic():
+        TodayPlan.objects.bulk_create(plans)
+        # Backends without RETURNING support (MySQL) don't set pks on bulk_create
+        if any(plan.pk is None for plan in plans):
+            lookup = {
+                (p.plan_date, p.order_index): p.pk
+                for p in TodayPlan.objects.filter(
+                    user=user,
+                    plan_date__in={plan.plan_date for plan in plans},
+                    order_index__in={plan.order_index for plan in plans},
+                ).only('id', 'plan_date', 'order_index')
+            }
+            for plan in plans:
+                plan.pk = lookup[(plan.plan_date, plan.order_index)]
+        # bulk_create skips TodayPlan.save(), which resolves the task / project link
+        relink_plans(TodayPlan.objects.filter(id__in=[plan.id for plan in plans]))
+
+    if len(plans) == 1:
+        plan = plans[0]
+        task_name = plan.catalog_item.name if plan.catalog_item else plan.custom_title or 'a task'
+        message = f'"{task_name}" has been added to your plan for {plan.plan_date}.'
+    else:
+        days = sorted({plan.plan_date for plan in plans})
+        message = f'{len(plans)} tasks have been added to your plan for {", ".join(str(day) for day in days)}.'
+    notif_data = {
+        'id': f"plan_new_{plans[0].id}" if len(plans) == 1 else f"plan_bulk_{plans[0].id}",
+        'title': 'Task Added to Today\'s Plan' if len(plans) == 1 else 'Tasks Added to Your Plan',
+        'message': message,
+        'type': 'TODAY_PLAN_UPDATED',
+        'reference_type': 'today_plan',
+        'reference_id': plans[0].id if len(plans) == 1 else None,
+        'created_at': str(timezone.now()),
+    }
+    transaction.on_commit(lambda: send_websocket_notification(user.id, notif_data))
+    return plans
@@ -0,0 +1,173 @@
+"""
+Recurring task materialization engine
+
+Generates every due occurrence of RECURRING tasks up to a horizon in bulk,
+instead of one Task.objects.create() (plus per-row assignee/subtask inserts
+and budget aggregation) per occurrence.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Projects, Task, TaskAssignee, SubTask
+
+
+def get_next_occurrence(current, pattern):
+    """Return the occurrence date following `current` for a recurrence pattern"""
+    if pattern == 'DAILY':
+        return current + timedelta(days=1)
+    if pattern == 'WEEKLY':
+        return current + timedelta(weeks=1)
+    if pattern == 'MONTHLY':
+        return current + relativedelta(months=1)
+    if pattern == 'YEARLY':
+        return current + relativedelta(years=1)
+    return None
+
+
+def series_key(task):
+    """Occurrences of the same recurring task share project, title and pattern"""
+    return (task.project_id, task.title, task.recurrence_pattern)
+
+
+def materialize_recurring_tasks(horizon_days=30, today=None, dry_run=False):
+    """
+    Materialize all due occurrences of RECURRING tasks up to `today + horizon_days`.
+
+    Idempotent: occurrences are keyed by `next_occurrence` within a series, so
+    dates that already have a task are never generated twice.
+
+    Missed occurrences are not backfilled: a series whose latest task is in the
+    past resumes at its first occurrence on or after `today` (same cadence), so
+    a run after a long pause does not create, and charge to the budget, work
+    for days that are already over.
+
+    Project planned-hours budgets are validated once per project; occurrences
+    that would exceed the budget are skipped and reported.
+
+    Returns a summary dict with created/skipped counts per series.
+    """
+    today = today or timezone.now().date()
+    horizon = today + timedelta(days=horizon_days)
+
+    recurring_tasks = (
+        Task.objects.filter(
+            task_type='RECURRING',
+            recurrence_pattern__isnull=False,
+            next_occurrence__isnull=False,
+        )
+        .select_related('project')
+        .prefetch_related('assignees', 'subtasks')
+        .order_by('next_occurrence', 'id')
+    )
+
+    # Group into series; the latest occurrence acts as template
+    series = defaultdict(list)
+    for task in recurring_tasks:
+        series[series_key(task)].append(task)
+
+    # Plan new occurrences per series
+    planned = []  # list of (template, occurrence_date)
+    for key, tasks in series.items():
+        existing_dates = {t.next_occurrence for t in tasks}
+        template = tasks[-1]
+        occurrence = get_next_occurrence(template.next_occurrence, template.recurrence_pattern)
+        while occurrence and occurrence < today:
+            occurrence = get_next_occurrence(occurrence, template.recurrence_pattern)
+        while occurrence and occurrence <= horizon:
+            if occurrence not in existing_dates:
+                planned.append((template, occurrence))
+            occurrence = get_next_occurrence(occurrence, template.recurrence_pattern)
+
+    # Validate project budgets once per project against the maintained totals
+    project_ids = {template.project_id for template, _ in planned}
+    allocated = {
+        template.project_id: template.project.allocated_planned_hours
+        for template, _ in planned
+    }
+
+    to_create = []
+    skipped = []
+    planned.sort(key=lambda item: (item[0].project_id, item[1]))
+    for template, occurrence in planned:
+        project = template.project
+        hours = template.planned_hours or 0
+        total = allocated.get(project.id) or 0
+        if hours > 0 and project.planned_hours > 0 and total + hours > project.planned_hours:
+            skipped.append((template, occurrence))
+            continue
+        allocated[project.id] = total + hours
+        to_create.append((template, occurrence))
+
+    summary = {
+        'series': len(series),
+        'created': len(to_create),
+        'skipped_over_budget': len(skipped),
+        'horizon': horizon,
+        'skipped': [
+            {'task_id': template.id, 'title': template.title, 'date': occurrence}
+            for template, occurrence in skipped
+        ],
+    }
+
+    if dry_run or not to_create:
+        return summary
+
+    with transaction.atomic():
+        new_tasks = Task.objects.bulk_create([
+            Task(
+                title=template.title,
+                project_id=template.project_id,
+                task_type='RECURRING',
+                priority=template.priority,
+                start_date=occurrence,
+                due_date=occurrence,
+                next_occurrence=occurrence,
+                recurrence_pattern=template.recurrence_pattern,
+                planned_hours=template.planned_hours,
+            )
+            for template, occurrence in to_create
+        ])
+
+        # Backends without RETURNING support (MySQL) don't set pks on bulk_create
+        if any(task.pk is None for task in new_tasks):
+            lookup = {
+                (t.project_id, t.title, t.recurrence_pattern, t.next_occurrence): t.pk
+                for t in Task.objects.filter(
+                    task_type='RECURRING',
+                    project_id__in=project_ids,
+                    next_occurrence__gte=today,
+                ).only('id', 'project_id', 'title', 'recurrence_pattern', 'next_occurrence')
+            }
+            for task in new_tasks:
+                task.pk = lookup[(task.project_id, task.title, task.recurrence_pattern, task.next_occurrence)]
+
+        assignees = []
+        subtasks = []
+        for (template, occurrence), new_task in zip(to_create, new_tasks):
+            for assignee in template.assignees.all():
+                assignees.append(TaskAssignee(task_id=new_task.pk, user_id=assignee.user_id, role=assignee.role))
+            for subtask in template.subtasks.all():
+                subtasks.append(SubTask(
+                    task_id=new_task.pk,
+                    title=subtask.title,
+                    progress_weight=subtask.progress_weight,
+                    due_date=occurrence,
+                ))
+
+        TaskAssignee.objects.bulk_create(assignees, ignore_conflicts=True)
+        SubTask.objects.bulk_create(subtasks)
+
+        # bulk_create bypasses Task.save, so bump the project totals here
+        added_hours = defaultdict(float)
+        for template, _ in to_create:
+            added_hours[template.project_id] += template.planned_hours or 0
+        for project_id, hours in added_hours.items():
+            Projects.adjust_allocated_hours(project_id, hours)
+
+    summary['assignees_created'] = len(assignees)
+    summary['subtasks_created'] = len(subtasks)
+    return summary
@@ -0,0 +1,65 @@
+"""
+Fast JSON rendering
+
+FastJSONRenderer is a drop-in JSONRenderer that encodes with orjson when it
+is installed (`pip install orjson`) and falls back to the stock renderer
+otherwise. Strings, numbers, dicts, lists and UUIDs are encoded natively by
+orjson. Dates, times, Decimals, lazy strings, querysets and the rest go
+through DRF's own JSONEncoder.default, so the output parses to what
+JSONRenderer produces. Datetimes keep DRF's millisecond precision and 'Z'
+suffix, and raw Decimals in view-built dicts are still floats.
+
+One difference: orjson writes NaN and +/-Infinity as null, where the stock
+renderer (STRICT_JSON) raises ValueError. Finding them up front would mean
+walking every response in Python, which costs more than orjson saves, so
+views must not rely on the renderer to reject non-finite floats.
+
+The renderer classes come from API_RENDERER_PROFILE in settings:
+'development' also serves the browsable API, 'production' serves JSON only.
+`manage.py run_benchmarks --renderers` compares the two renderers on the
+largest responses.
+"""
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # orjson only calls this for types it does not encode itself
+    return _encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer on orjson (stock JSONRenderer when orjson is missing)"""
+
+    available = orjson is not None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        renderer_context = renderer_context or {}
+        # orjson only indents by 2; honour other ?indent= values through the stock renderer
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if indent not in (None, 2):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            ret = orjson.dumps(data, default=_default, option=option)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits, recursion limits: leave them to json
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same as JSONRenderer: U+2028 / U+2029 are valid JSON but not valid javascript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
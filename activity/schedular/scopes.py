@@ -0,0 +1,71 @@
+"""
+Role scope builder
+
+Compiles "who is involved in this project/task" rules into filters that never
+multiply rows of the main query:
+
+- many-to-one columns (project_lead, handled_by, created_by, task.project) stay
+  plain Q() lookups, including `__in` lists of subordinate ids;
+- every to-many relation (task assignees, project assignees, a project's
+  tasks) becomes an `id__in` semi-join against a narrow id subquery, which
+  SQLite and MySQL plan from the user_id index instead of probing per row
+  like a correlated Exists().
+
+Querysets filtered this way need no .distinct(), so count(), aggregates and
+pagination run on the base table instead of a DISTINCT over a fan-out join.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q, QuerySet
+
+from .models import Projects, TaskAssignee
+
+PROJECT_RELATIONS = ('lead', 'handler', 'creator', 'member', 'task')
+
+
+def user_ids(users):
+    """Normalise a user, id, iterable of either, or a User queryset for `__in` lookups"""
+    if isinstance(users, QuerySet):
+        return users.values('pk')
+    if isinstance(users, (list, tuple, set, frozenset)):
+        return [getattr(u, 'pk', u) for u in users]
+    return [getattr(users, 'pk', users)]
+
+
+def any_of(*conditions):
+    """OR together Q conditions, skipping None"""
+    conditions = [c for c in conditions if c is not None]
+    return reduce(or_, conditions) if conditions else Q(pk__in=[])
+
+
+def assigned_tasks(users, task_ref='pk'):
+    """Rows whose task (`task_ref`) has one of `users` as assignee"""
+    return Q(**{f'{task_ref}__in': TaskAssignee.objects.filter(user_id__in=user_ids(users)).values('task_id')})
+
+
+def project_involvement(users, relations=PROJECT_RELATIONS, prefix=''):
+    """
+    Rows whose project involves any of `users` through one of `relations`.
+
+    `prefix` is '' to filter Projects itself, or 'project__' to filter rows
+    with a `project` foreign key (e.g. Task).
+    """
+    ids = user_ids(users)
+    project_ref = f'{prefix[:-2]}_id' if prefix else 'pk'
+    conditions = []
+    if 'lead' in relations:
+        conditions.append(Q(**{f'{prefix}project_lead_id__in': ids}))
+    if 'handler' in relations:
+        conditions.append(Q(**{f'{prefix}handled_by_id__in': ids}))
+    if 'creator' in relations:
+        conditions.append(Q(**{f'{prefix}created_by_id__in': ids}))
+    if 'member' in relations:
+        conditions.append(Q(**{f'{project_ref}__in': Projects.assignees.through.objects.filter(
+            user_id__in=ids
+        ).values('projects_id')}))
+    if 'task' in relations:
+        conditions.append(Q(**{f'{project_ref}__in': TaskAssignee.objects.filter(
+            user_id__in=ids
+        ).values('task__project_id')}))
+    return any_of(*conditions)
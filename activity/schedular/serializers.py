@@ -147,6 +147,7 @@ class ProjectSerializer(serializers.ModelSerializer):
     class Meta:
         model = Projects
         fields = '__all__'
+        read_only_fields = ('allocated_planned_hours',)
 
     def get_project_assignees(self, obj):
         # Gather all related users at the project level
@@ -194,10 +195,16 @@ class TaskSerializer(serializers.ModelSerializer):
         model = Task
         fields = '__all__'
         read_only_fields = ('created_at',)
+        # Relations read by each field (see schedular.fieldsets)
+        field_select_related = {'project_name': ('project',)}
+        field_prefetch_related = {
+            'assignees_list': ('assignees__user',),
+            'progress': ('subtasks',),
+            'subtasks': ('subtasks__completed_by',),
+        }
     
     def get_assignees_list(self, obj):
-        assignees = TaskAssignee.objects.filter(task=obj)
-        return TaskAssigneeSerializer(assignees, many=True).data
+        return TaskAssigneeSerializer(obj.assignees.all(), many=True).data
     
     def get_progress(self, obj):
         return obj.calculate_progress()
@@ -215,6 +222,7 @@ class TaskAssigneeSerializer(serializers.ModelSerializer):
         model = TaskAssignee
         fields = '__all__'
         read_only_fields = ('assigned_at',)
+        field_select_related = {'user_email': ('user',), 'task_title': ('task',)}
 
 class SubTaskSerializer(serializers.ModelSerializer):
     task_title = serializers.CharField(source='task.title', read_only=True)
@@ -227,6 +235,12 @@ class SubTaskSerializer(serializers.ModelSerializer):
         model = SubTask
         fields = '__all__'
         read_only_fields = ('created_at',)
+        field_select_related = {
+            'task_title': ('task',),
+            'completed_by_name': ('completed_by',),
+            'completed_by_avatar': ('completed_by',),
+        }
+        field_prefetch_related = {'progress_weight': ('task__subtasks',)}
     
     def get_is_completed(self, obj):
         return obj.status == 'DONE'
@@ -267,10 +281,11 @@ class TaskDetailSerializer(serializers.ModelSerializer):
         model = Task
         fields = '__all__'
         read_only_fields = ('created_at',)
+        field_select_related = {'project_name': ('project',)}
+        field_prefetch_related = {'assignees_list': ('assignees__user',), 'progress': ('subtasks',)}
     
     def get_assignees_list(self, obj):
-        assignees = TaskAssignee.objects.filter(task=obj)
-        return TaskAssigneeSerializer(assignees, many=True).data
+        return TaskAssigneeSerializer(obj.assignees.all(), many=True).data
     
     def get_progress(self, obj):
         return obj.calculate_progress()
@@ -288,6 +303,14 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Projects
         fields = '__all__'
+        read_only_fields = ('allocated_planned_hours',)
+        field_select_related = {
+            'created_by_email': ('created_by',),
+            'handled_by_email': ('handled_by',),
+            'project_lead_email': ('project_lead',),
+            'project_assignees': ('project_lead', 'handled_by'),
+        }
+        field_prefetch_related = {'overall_progress': ('tasks__subtasks',), 'project_assignees': ('assignees',)}
     
     def get_overall_progress(self, obj):
         """Calculate overall project progress based on all tasks"""
@@ -329,6 +352,7 @@ class CatalogSerializer(serializers.ModelSerializer):
         model = Catalog
         fields = '__all__'
         read_only_fields = ('created_at', 'updated_at')
+        field_select_related = {'user_email': ('user',), 'project_name': ('project',), 'task_title': ('task',)}
 
 
 class TodayPlanSerializer(serializers.ModelSerializer):
@@ -349,6 +373,11 @@ class TodayPlanSerializer(serializers.ModelSerializer):
             'scheduled_end_time': {'required': False, 'allow_null': True},
             'catalog_item': {'required': False, 'allow_null': True},
         }
+        field_select_related = {
+            'user_email': ('user',),
+            'catalog_name': ('catalog_item',),
+            'catalog_type': ('catalog_item',),
+        }
     
     def get_catalog_name(self, obj):
         """Return catalog name or custom title, with unplanned prefix if applicable"""
@@ -375,6 +404,7 @@ class ActivityLogSerializer(serializers.ModelSerializer):
         model = ActivityLog
         fields = '__all__'
         read_only_fields = ('created_at', 'updated_at', 'hours_worked', 'minutes_worked')
+        field_select_related = {'user_email': ('user',)}
 
 
 class PendingSerializer(serializers.ModelSerializer):
@@ -388,6 +418,7 @@ class PendingSerializer(serializers.ModelSerializer):
         model = Pending
         fields = '__all__'
         read_only_fields = ('created_at', 'updated_at')
+        field_select_related = {'user_email': ('user',), 'catalog_name': ('today_plan__catalog_item',)}
 
     def get_catalog_name(self, obj):
         if obj.today_plan.catalog_item:
@@ -730,45 +761,128 @@ class ProjectCreateWithTasksSerializer(serializers.Serializer):
         help_text="List of task objects with: name, priority, start_date, end_date, planned_hours, assignees (user IDs), milestones (title strings)"
     )
     
+    @staticmethod
+    def _project_due(deadline):
+        from datetime import date, timedelta
+        return deadline or (date.today() + timedelta(days=30))
+
+    def _build_tasks(self, tasks_data, due):
+        """Unsaved Task / SubTask instances plus assignee ids for every task in the payload"""
+        from datetime import date
+        from django.core.exceptions import ValidationError as ModelValidationError
+        today = date.today()
+
+        def parse_user_id(uid):
+            try:
+                return int(uid) if not isinstance(uid, int) else uid
+            except (ValueError, TypeError):
+                return None
+
+        # Unknown assignees are skipped, as before; resolved for the whole payload in one query
+        requested = {parse_user_id(uid) for t in tasks_data for uid in t.get('assignees', [])} - {None}
+        known = set(User.objects.filter(id__in=requested).values_list('id', flat=True)) if requested else set()
+
+        built, errors = [], {}
+        for index, t in enumerate(tasks_data):
+            task_name = t.get('name', t.get('title', 'Untitled Task'))
+            # Map frontend priority (Low/Medium/High) to backend (LOW/MEDIUM/HIGH)
+            raw_priority = t.get('priority', 'Medium')
+            priority = raw_priority.upper() if raw_priority else 'MEDIUM'
+            if priority not in ('LOW', 'MEDIUM', 'HIGH', 'CRITICAL'):
+                priority = 'MEDIUM'
+
+            # Parse dates
+            start_date = t.get('start_date') or t.get('startDate')
+            end_date = t.get('end_date') or t.get('endDate') or t.get('due_date')
+
+            if isinstance(start_date, str):
+                try:
+                    start_date = date.fromisoformat(start_date)
+                except (ValueError, TypeError):
+                    start_date = today
+
+            if isinstance(end_date, str):
+                try:
+                    end_date = date.fromisoformat(end_date)
+                except (ValueError, TypeError):
+                    end_date = due
+
+            task = Task(
+                title=task_name,
+                task_type='STANDARD',
+                priority=priority,
+                start_date=start_date or today,
+                due_date=end_date or due,
+                planned_hours=t.get('planned_hours', 0.0),
+            )
+            # Create milestones (subtasks) - frontend sends string titles
+            subtasks = []
+            for m in t.get('milestones', []):
+                title = m if isinstance(m, str) else m.get('title', str(m))
+                weight = 25 if isinstance(m, str) else m.get('progress_weight', 25)
+                subtasks.append(SubTask(title=title, progress_weight=weight, due_date=task.due_date))
+
+            # Field validation only: the project does not exist yet and the budget is checked once below
+            try:
+                task.clean_fields(exclude=['project'])
+                for subtask in subtasks:
+                    subtask.clean_fields(exclude=['task'])
+            except ModelValidationError as e:
+                errors[index] = e.message_dict
+                continue
+
+            assignee_ids = [uid for uid in dict.fromkeys(map(parse_user_id, t.get('assignees', []))) if uid in known]
+            built.append((task, assignee_ids, subtasks))
+
+        if errors:
+            raise serializers.ValidationError({'tasks': errors})
+        return built
+
     def validate(self, data):
-        """Validate that sum of task planned_hours does not exceed project planned_hours"""
+        """Validate every task up front and check that their planned_hours fit the project budget"""
         project_planned_hours = data.get('planned_hours', 0.0)
-        tasks_data = data.get('tasks', [])
-        
+        data['tasks'] = self._build_tasks(data.get('tasks', []), self._project_due(data.get('deadline')))
+
         # Calculate total task planned hours
-        total_task_hours = 0.0
-        for task in tasks_data:
-            task_hours = float(task.get('planned_hours', 0.0))
-            total_task_hours += task_hours
-        
+        total_task_hours = sum(task.planned_hours for task, _, _ in data['tasks'])
+
         # Validate constraint
         if project_planned_hours > 0 and total_task_hours > project_planned_hours:
             raise serializers.ValidationError(
                 f"Total task planned hours ({total_task_hours}) exceeds project planned hours ({project_planned_hours}). "
                 f"Please adjust task hours or increase project budget."
             )
-        
+
         return data
-    
+
     def create(self, validated_data):
-        from datetime import date, timedelta
+        """
+        Create the project, then insert its tasks, assignees and milestones with one
+        bulk_create each. bulk_create skips the per-row signals, so their effects
+        (planned-hours total, visibility, task links, live deltas, assignment
+        notifications) are applied once for the whole batch.
+        """
+        from datetime import date
+        from .links import relink_new_tasks
+        from .signals import send_notifications
+        from .visibility import schedule_project_refresh
+        from . import live
         tasks_data = validated_data.pop('tasks', [])
         deadline = validated_data.pop('deadline', None)
-        
+        task_status = validated_data.pop('task_status', 'PENDING')
 
-        
         # Set smart defaults for required model fields
         today = date.today()
-        due = deadline or (today + timedelta(days=30))
+        due = self._project_due(deadline)
         duration_days = (due - today).days if due > today else 1
-        
+
         # handled_by: use first admin, or first active user
         handled_by = None
         if not handled_by:
             handled_by = User.objects.filter(role='ADMIN', is_active=True).first()
         if not handled_by:
             handled_by = User.objects.filter(is_active=True).first()
-        
+
         project = Projects.objects.create(
             name=validated_data['name'],
             description=validated_data.get('description', ''),
@@ -780,76 +894,67 @@ class ProjectCreateWithTasksSerializer(serializers.Serializer):
             planned_hours=validated_data.get('planned_hours', 0.0),
             duration=duration_days,
             handled_by=handled_by,
-            is_approved=False,  # Default to False, view will handle approval logic based on user role
+            created_by=validated_data.get('created_by'),
+            is_approved=validated_data.get('is_approved', False),  # The view decides based on user role
         )
-        
+
         # Add project assignees
         project_assignee_ids = validated_data.get('assignees', [])
         if project_assignee_ids:
             project.assignees.set(project_assignee_ids)
-            
 
-        
         # Create tasks
-        created_tasks = []
-        for t in tasks_data:
-            task_name = t.get('name', t.get('title', 'Untitled Task'))
-            # Map frontend priority (Low/Medium/High) to backend (LOW/MEDIUM/HIGH)
-            raw_priority = t.get('priority', 'Medium')
-            priority = raw_priority.upper() if raw_priority else 'MEDIUM'
-            if priority not in ('LOW', 'MEDIUM', 'HIGH', 'CRITICAL'):
-                priority = 'MEDIUM'
-            
-            # Parse dates
-            start_date = t.get('start_date') or t.get('startDate')
-            end_date = t.get('end_date') or t.get('endDate') or t.get('due_date')
-            
-            if isinstance(start_date, str):
-                try:
-                    start_date = date.fromisoformat(start_date)
-                except (ValueError, TypeError):
-                    start_date = today
-            
-            if isinstance(end_date, str):
-                try:
-                    end_date = date.fromisoformat(end_date)
-                except (ValueError, TypeError):
-                    end_date = due
-            
-            task = Task.objects.create(
-                title=task_name,
-                project=project,
-                task_type='STANDARD',
-                priority=priority,
-                start_date=start_date or today,
-                due_date=end_date or due,
-                planned_hours=float(t.get('planned_hours', 0.0)),  # Set task planned hours
-            )
-            
-            # Create assignees
-            assignee_ids = t.get('assignees', [])
+        created_tasks = [task for task, _, _ in tasks_data]
+        for task in created_tasks:
+            task.project = project
+            task.status = task_status
+        Task.objects.bulk_create(created_tasks)
+        # Backends without RETURNING support (MySQL) don't set pks on bulk_create;
+        # the project is new, so its tasks are exactly these, in insert order
+        if any(task.pk is None for task in created_tasks):
+            pks = Task.objects.filter(project=project).order_by('id').values_list('id', flat=True)
+            for task, pk in zip(created_tasks, pks):
+                task.pk = pk
+        Projects.adjust_allocated_hours(project.id, sum(task.planned_hours for task in created_tasks))
+
+        assignees, subtasks, assigned = [], [], {}
+        for task, assignee_ids, milestones in tasks_data:
             for uid in assignee_ids:
-                try:
-                    uid_int = int(uid) if not isinstance(uid, int) else uid
-                    user = User.objects.get(id=uid_int)
-                    TaskAssignee.objects.create(task=task, user=user, role='DEV')
-                except (User.DoesNotExist, ValueError, TypeError):
-                    continue
-            
-            # Create milestones (subtasks) - frontend sends string titles
-            milestones = t.get('milestones', [])
-            for m in milestones:
-                title = m if isinstance(m, str) else m.get('title', str(m))
-                weight = 25 if isinstance(m, str) else m.get('progress_weight', 25)
-                SubTask.objects.create(
-                    task=task,
-                    title=title,
-                    progress_weight=weight,
-                    due_date=task.due_date,
-                )
-            
-            created_tasks.append(task)
-        
+                assignees.append(TaskAssignee(task=task, user_id=uid, role='DEV'))
+                assigned.setdefault(uid, []).append(task)
+            for subtask in milestones:
+                subtask.task = task
+                subtasks.append(subtask)
+        TaskAssignee.objects.bulk_create(assignees)
+        SubTask.objects.bulk_create(subtasks)
+
+        if assignees:
+            schedule_project_refresh(project.id)
+        relink_new_tasks(project.id, {task.title for task in created_tasks})
+        for task, assignee_ids, _ in tasks_data:
+            live.publish('tasks', task.id, live.task_delta(task, 'created', assignee_ids + [handled_by.id if handled_by else None]))
+
+        # One assignment notification per user for the whole project
+        notifications = []
+        for uid, tasks in assigned.items():
+            if len(tasks) == 1:
+                title = 'Task Assigned to You'
+                message = f'You have been assigned to task "{tasks[0].title}" as DEV'
+                reference_type, reference_id = 'task', tasks[0].id
+            else:
+                title = 'Tasks Assigned to You'
+                message = f'You have been assigned to {len(tasks)} tasks in project "{project.name}" as DEV'
+                reference_type, reference_id = 'project', project.id
+            notifications.append(Notification(
+                user_id=uid,
+                notification_type='TASK_ASSIGNED',
+                title=title,
+                message=message,
+                reference_type=reference_type,
+                reference_id=reference_id
+            ))
+        send_notifications(Notification.objects.bulk_create(notifications))
+
         # Attach tasks to project object for response
         project._created_tasks = created_tasks
         return project
@@ -876,6 +981,55 @@ class StickyNoteSerializer(serializers.ModelSerializer):
         read_only_fields = ('user', 'created_at', 'updated_at')
 
 
+# ── Delta sync (sync.py): flat rows, related objects as ids ─────────────
+
+class CatalogSyncSerializer(serializers.ModelSerializer):
+    created_at = LocalDateTimeField(read_only=True)
+    updated_at = LocalDateTimeField(read_only=True)
+
+    class Meta:
+        model = Catalog
+        fields = '__all__'
+
+
+class TodayPlanSyncSerializer(serializers.ModelSerializer):
+    created_at = LocalDateTimeField(read_only=True)
+    updated_at = LocalDateTimeField(read_only=True)
+
+    class Meta:
+        model = TodayPlan
+        exclude = ('resolved_task', 'resolved_project')
+
+
+class ActivityLogSyncSerializer(serializers.ModelSerializer):
+    actual_start_time = LocalDateTimeField(read_only=True)
+    actual_end_time = LocalDateTimeField(read_only=True)
+    created_at = LocalDateTimeField(read_only=True)
+    updated_at = LocalDateTimeField(read_only=True)
+
+    class Meta:
+        model = ActivityLog
+        exclude = ('resolved_task', 'resolved_project')
+
+
+class PendingSyncSerializer(serializers.ModelSerializer):
+    created_at = LocalDateTimeField(read_only=True)
+    updated_at = LocalDateTimeField(read_only=True)
+
+    class Meta:
+        model = Pending
+        fields = '__all__'
+
+
+class StickyNoteSyncSerializer(serializers.ModelSerializer):
+    created_at = LocalDateTimeField(read_only=True)
+    updated_at = LocalDateTimeField(read_only=True)
+
+    class Meta:
+        model = StickyNote
+        fields = '__all__'
+
+
 class CompletionChartDataSerializer(serializers.Serializer):
     """Serializer for completion chart data - shows completed count by month"""
     month = serializers.CharField(help_text="Month in format 'YYYY-MMM', e.g., '2026-Jan'")
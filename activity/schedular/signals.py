@@ -1,5 +1,6 @@
-from django.db.models.signals import post_save, m2m_changed
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.db import transaction
+from django.db.models import Q
 
 from django.dispatch import receiver
 from django.utils import timezone
@@ -11,6 +12,11 @@ from .models import (
     StickyNote, Catalog, TodayPlan, ActivityLog, Department, Pending, DaySession
 )
 from .utils import send_team_instruction_email
+from .visibility import TEAM_SCOPE_REASONS, schedule_project_refresh, schedule_team_rebuild
+from .user_cache import invalidate_users
+from . import live, timers
+from .links import schedule_relink
+from .sync import record_deletion
 
 
 def send_websocket_notification(user_id, notification_data):
@@ -25,6 +31,26 @@ def send_websocket_notification(user_id, notification_data):
     )
 
 
+def send_notifications(notifications):
+    """Push already-saved Notification rows (e.g. from bulk_create) once the transaction commits"""
+    def push():
+        for notification in notifications:
+            try:
+                send_websocket_notification(notification.user_id, {
+                    'id': notification.id,
+                    'title': notification.title,
+                    'message': notification.message,
+                    'type': notification.notification_type,
+                    'reference_type': notification.reference_type,
+                    'reference_id': notification.reference_id,
+                    'created_at': str(notification.created_at),
+                })
+            except Exception as e:
+                print(f"WebSocket notification error: {e}")
+
+    transaction.on_commit(push)
+
+
 def send_unread_count_update(user_id, count):
     """Helper function to send unread count update via WebSocket"""
     channel_layer = get_channel_layer()
@@ -61,6 +87,26 @@ def send_to_department(dept_id, notification_data):
     )
 
 
+def send_sync_progress(user_id, job_data):
+    """Push HRM sync job progress to the admin who started it"""
+    channel_layer = get_channel_layer()
+    async_to_sync(channel_layer.group_send)(
+        f'notifications_{user_id}',
+        {
+            'type': 'hrm_sync_progress',
+            'job': job_data
+        }
+    )
+
+
+def fields_changed(instance, *fields):
+    """True if any of `fields` were written by the save being signalled (unknown -> True)"""
+    changed = getattr(instance, 'changed_fields', None)
+    if changed is None:
+        return True
+    return bool(changed.intersection(fields))
+
+
 @receiver(post_save, sender=Projects)
 def project_notification(sender, instance, created, **kwargs):
     """Send notification when project is created or updated"""
@@ -165,10 +211,9 @@ def task_status_notification(sender, instance, created, **kwargs):
         # Use on_commit to ensure subtasks (milestones) are available
         transaction.on_commit(notify_creation)
     else:
-        # Check if significant fields changed (status, priority, due_date)
-        # We can't easily check 'old' values in post_save without a trick, 
-        # but we can at least avoid notifying on EVERY save if we wanted to.
-        # For now, let's just make the message more concise.
+        # Only notify when significant fields changed (status, priority, due_date)
+        if not fields_changed(instance, 'status', 'priority', 'due_date', 'title'):
+            return
         
         notif_data = {
             'id': f"task_upd_{instance.id}",
@@ -189,6 +234,107 @@ def task_status_notification(sender, instance, created, **kwargs):
             send_websocket_notification(assignee.user.id, notif_data)
 
 
+@receiver(post_delete, sender=Task)
+def task_planned_hours_release(sender, instance, **kwargs):
+    """Release the task's planned hours from the project's maintained total"""
+    Projects.adjust_allocated_hours(
+        instance.get_loaded_value('project_id', instance.project_id),
+        -(instance.get_loaded_value('planned_hours', instance.planned_hours) or 0)
+    )
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def task_catalog_progress_refresh(sender, instance, created=False, **kwargs):
+    """Keep linked catalog progress fresh when a task's status changes"""
+    if kwargs.get('signal') is post_save and not created and not fields_changed(instance, 'status', 'project'):
+        return
+    task_id, project_ids = instance.pk, {instance.project_id, instance.get_loaded_value('project_id')}
+    transaction.on_commit(lambda: Catalog.refresh_progress_for(task_ids=[task_id], project_ids=project_ids))
+
+
+@receiver(post_save, sender=SubTask)
+@receiver(post_delete, sender=SubTask)
+def subtask_catalog_progress_refresh(sender, instance, created=False, **kwargs):
+    """Keep linked catalog progress fresh when a milestone is completed/reopened"""
+    if kwargs.get('signal') is post_save and not created and not fields_changed(instance, 'status'):
+        return
+    task_id = instance.task_id
+    transaction.on_commit(lambda: Catalog.refresh_progress_for(task_ids=[task_id]))
+
+
+@receiver(post_save, sender=Projects)
+def project_visibility_refresh(sender, instance, created, **kwargs):
+    """Keep ProjectVisibility rows in step with lead/handler/creator changes"""
+    if created or fields_changed(instance, 'project_lead', 'handled_by', 'created_by'):
+        schedule_project_refresh(instance.pk)
+
+
+@receiver(m2m_changed, sender=Projects.assignees.through)
+def project_members_visibility_refresh(sender, instance, action, reverse, pk_set, **kwargs):
+    """Project assignees are a visibility reason (MEMBER)"""
+    if action == 'pre_clear' and reverse:
+        # user.assigned_projects.clear(): the affected projects are gone after the clear
+        instance._cleared_project_ids = list(instance.assigned_projects.values_list('id', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        schedule_project_refresh(instance.pk)
+    elif action == 'post_clear':
+        schedule_project_refresh(*getattr(instance, '_cleared_project_ids', []))
+    else:
+        schedule_project_refresh(*(pk_set or ()))
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def task_visibility_refresh(sender, instance, created=False, **kwargs):
+    """Moving or deleting a task changes which projects its assignees can see"""
+    if kwargs.get('signal') is post_save and (created or not fields_changed(instance, 'project')):
+        return
+    schedule_project_refresh(instance.project_id, instance.get_loaded_value('project_id'))
+
+
+@receiver(post_save, sender=TaskAssignee)
+@receiver(post_delete, sender=TaskAssignee)
+def task_assignee_visibility_refresh(sender, instance, created=False, **kwargs):
+    """Task assignees see the task's project (TASK)"""
+    if kwargs.get('signal') is post_save and not created:
+        return
+    project_id = Task.objects.filter(pk=instance.task_id).values_list('project_id', flat=True).first()
+    schedule_project_refresh(project_id)
+
+
+@receiver(post_save, sender=User)
+def user_hierarchy_visibility_refresh(sender, instance, created, **kwargs):
+    """TEAM_* rows depend on role, team_lead and is_active of everyone in the hierarchy"""
+    if created:
+        if instance.team_lead_id or instance.role in TEAM_SCOPE_REASONS:
+            schedule_team_rebuild(instance.pk)
+    elif fields_changed(instance, 'role', 'team_lead', 'is_active'):
+        # The previous team lead's chain loses this user
+        schedule_team_rebuild(instance.pk, instance.get_loaded_value('team_lead_id'))
+
+
+@receiver(post_delete, sender=User)
+def user_delete_visibility_refresh(sender, instance, **kwargs):
+    # The user's own rows cascade; only the chain above it can change
+    if instance.team_lead_id:
+        schedule_team_rebuild(instance.team_lead_id)
+
+
+@receiver(post_save, sender=User)
+def user_auth_cache_invalidate(sender, instance, created, **kwargs):
+    """The cached User is request.user: any saved change must show on the next request"""
+    if not created:
+        invalidate_users(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_delete_auth_cache_invalidate(sender, instance, **kwargs):
+    invalidate_users(instance.pk)
+
+
 @receiver(post_save, sender=TaskAssignee)
 def task_assignee_notification(sender, instance, created, **kwargs):
     """Send notification when user is assigned to a task"""
@@ -377,27 +523,19 @@ def subtask_notification(sender, instance, created, **kwargs):
         }
         for assignee in instance.task.assignees.all():
             send_websocket_notification(assignee.user.id, notif_data)
-    else:
-        try:
-            old_instance = SubTask.objects.get(pk=instance.pk)
-            if old_instance.status != 'DONE' and instance.status == 'DONE':
-                # Notify task assignees about subtask completion
-                notif_data = {
-                    'id': f"subtask_done_{instance.id}",
-                    'title': 'SubTask Completed',
-                    'message': f'SubTask "{instance.title}" for task "{instance.task.title}" has been completed',
-                    'type': 'SUBTASK_COMPLETED',
-                    'reference_type': 'subtask',
-                    'reference_id': instance.id,
-                    'created_at': str(timezone.now()),
-                }
-                for assignee in instance.task.assignees.all():
-                    send_websocket_notification(assignee.user.id, notif_data)
-                
-                # Check if all subtasks are completed logic (existing comment)
-                pass
-        except SubTask.DoesNotExist:
-            pass
+    elif fields_changed(instance, 'status') and instance.status == 'DONE':
+        # Notify task assignees about subtask completion
+        notif_data = {
+            'id': f"subtask_done_{instance.id}",
+            'title': 'SubTask Completed',
+            'message': f'SubTask "{instance.title}" for task "{instance.task.title}" has been completed',
+            'type': 'SUBTASK_COMPLETED',
+            'reference_type': 'subtask',
+            'reference_id': instance.id,
+            'created_at': str(timezone.now()),
+        }
+        for assignee in instance.task.assignees.all():
+            send_websocket_notification(assignee.user.id, notif_data)
 
 
 # Custom notification for task assignment
@@ -473,6 +611,10 @@ def today_plan_notification(sender, instance, created, **kwargs):
 @receiver(post_save, sender=ActivityLog)
 def activity_log_notification(sender, instance, created, **kwargs):
     """Smart notification for activity log — detect unplanned starts, completions, etc."""
+    # Updates only matter when the log was stopped/completed
+    if not created and not fields_changed(instance, 'status', 'is_task_completed'):
+        return
+    
     # Get meaningful task name
     task_name = 'a task'
     is_unplanned = False
@@ -658,3 +800,100 @@ def day_session_notification(sender, instance, created, **kwargs):
         except Exception:
             pass
 
+
+
+# ── Live dashboard deltas (see live.py) ──────────────────────────────────
+
+@receiver(post_save, sender=ActivityLog)
+def activity_log_live_delta(sender, instance, created, **kwargs):
+    if created:
+        live.publish('activity', instance.id, live.activity_delta(instance, 'started'))
+    elif fields_changed(instance, 'status', 'is_task_completed', 'actual_end_time', 'minutes_worked'):
+        event = 'completed' if instance.status == 'COMPLETED' else 'stopped' if instance.actual_end_time else 'updated'
+        live.publish('activity', instance.id, live.activity_delta(instance, event))
+
+
+@receiver(post_save, sender=ActivityLog)
+def activity_log_timer_refresh(sender, instance, created, **kwargs):
+    """Running sessions change when a log starts, stops or is re-timed"""
+    if created or fields_changed(instance, 'status', 'actual_start_time', 'hours_worked', 'today_plan', 'user'):
+        timers.refresh_after_commit()
+
+
+@receiver(post_delete, sender=ActivityLog)
+def activity_log_delete_timer_refresh(sender, instance, **kwargs):
+    if instance.status == 'IN_PROGRESS':
+        timers.refresh_after_commit()
+
+
+@receiver(post_save, sender=Task)
+def task_live_delta(sender, instance, created, **kwargs):
+    if created or fields_changed(instance, 'status', 'priority', 'due_date'):
+        live.publish('tasks', instance.id, live.task_delta(instance, 'created' if created else 'updated'))
+
+
+@receiver(pre_delete, sender=Task)
+def task_delete_live_delta(sender, instance, **kwargs):
+    # Collected before the cascade removes the assignees
+    user_ids = list(instance.assignees.values_list('user_id', flat=True))
+    live.publish('tasks', instance.id, live.task_deleted_delta(instance.id, instance.project_id, user_ids))
+
+
+@receiver(post_save, sender=ApprovalRequest)
+def approval_request_live_delta(sender, instance, created, **kwargs):
+    live.publish('approvals', instance.id, live.approval_delta(instance, 'requested' if created else 'updated'))
+
+
+@receiver(post_save, sender=ApprovalResponse)
+def approval_response_live_delta(sender, instance, created, **kwargs):
+    if created:
+        live.publish('approvals', instance.approval_request_id, live.approval_delta(instance.approval_request, 'decided'))
+
+
+# ── Write-time task links (see links.py) ─────────────────────────────────
+
+@receiver(post_save, sender=TodayPlan)
+def today_plan_link_propagate(sender, instance, created, **kwargs):
+    """Activity logs carry a copy of their plan's resolved task / project"""
+    if not created and fields_changed(instance, 'resolved_task', 'resolved_project'):
+        if ActivityLog.objects.filter(today_plan=instance).update(
+            resolved_task_id=instance.resolved_task_id, resolved_project_id=instance.resolved_project_id,
+            updated_at=timezone.now()
+        ):
+            timers.refresh_after_commit()
+
+
+@receiver(post_save, sender=Catalog)
+def catalog_link_refresh(sender, instance, created, **kwargs):
+    if not created and fields_changed(instance, 'name', 'task', 'project'):
+        schedule_relink(TodayPlan.objects.filter(catalog_item=instance))
+
+
+@receiver(post_save, sender=Task)
+def task_link_refresh(sender, instance, created, **kwargs):
+    """A new or renamed/moved task can take over (or lose) title-matched plans"""
+    if created or fields_changed(instance, 'title', 'project'):
+        title = (instance.title or '').strip()
+        schedule_relink(TodayPlan.objects.filter(
+            Q(resolved_task=instance) |
+            Q(catalog_item__task__isnull=True, catalog_item__project_id=instance.project_id,
+              catalog_item__name__iexact=title) |
+            Q(catalog_item__isnull=True, custom_title__iexact=title)
+        ))
+
+
+@receiver(pre_delete, sender=Task)
+def task_delete_link_refresh(sender, instance, **kwargs):
+    # Plans linked by title may fall back to another task with the same title
+    schedule_relink(TodayPlan.objects.filter(resolved_task=instance, catalog_item__task__isnull=True))
+
+
+# ── Delta sync tombstones (see sync.py) ──────────────────────────────────
+
+@receiver(post_delete, sender=Catalog)
+@receiver(post_delete, sender=TodayPlan)
+@receiver(post_delete, sender=ActivityLog)
+@receiver(post_delete, sender=Pending)
+@receiver(post_delete, sender=StickyNote)
+def sync_tombstone(sender, instance, **kwargs):
+    record_deletion(instance)
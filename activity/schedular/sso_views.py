@@ -13,6 +13,8 @@ from rest_framework_simplejwt.tokens import UntypedToken, RefreshToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django.conf import settings
 from .models import User, Employee
+from .hrm_client import get_hrm_client
+from .hrm_sync import enqueue_sync
 import requests
 import jwt
 import logging
@@ -166,15 +168,14 @@ class SSOLoginView(View):
                 logger.warning(f"Inactive employee attempted SSO login: {email}")
                 return redirect('/inactive-user/')
             
-            # Sync all employees if admin is logging in
+            # Sync all employees if admin is logging in (in the background)
             if das_role == 'ADMIN':
-                logger.info(f"Admin login detected, triggering full employee sync")
+                logger.info(f"Admin login detected, queueing full employee sync")
                 try:
-                    sync_result = self.sync_all_employees_from_hrm()
-                    if sync_result:
-                        logger.info(f"Employee sync completed: {sync_result.get('created', 0)} created, {sync_result.get('updated', 0)} updated")
+                    job, _ = enqueue_sync(requested_by=user)
+                    logger.info(f"Employee sync job {job.id} is {job.status}")
                 except Exception as sync_error:
-                    logger.error(f"Employee sync failed during admin login: {str(sync_error)}")
+                    logger.error(f"Could not queue employee sync during admin login: {str(sync_error)}")
                     # Don't block login even if sync fails
             
             # Login user (for session-based auth if needed)
@@ -219,12 +220,8 @@ class SSOLoginView(View):
         Returns: dict with is_active status or None on error
         """
         try:
-            # HRM API endpoint - use configured URL from settings
-            # hrm_base_url = getattr(settings, 'HRM_BASE_URL', 'https://hrmbackendapi.meridahr.com')
-            # hrm_api_url = f"{hrm_base_url}/root/api/check-employee-status/{email}/"
-            hrm_api_url = getattr(settings, 'HRM_API_URL', 'http://localhost:8001/root/api/check-employee-status/{email}/')
-            
-            response = requests.get(hrm_api_url, timeout=5)
+            # HRM API endpoint - shared pooled client on settings.HRM_BASE_URL
+            response = get_hrm_client().employee_status(email)
             
             if response.status_code == 200:
                 return response.json()
@@ -242,12 +239,8 @@ class SSOLoginView(View):
         Returns: dict with full employee data or None on error
         """
         try:
-            # HRM API endpoint with full_details parameter - use configured URL from settings
-            # hrm_base_url = getattr(settings, 'HRM_BASE_URL', 'https://hrmbackendapi.meridahr.com/')
-            hrm_base_url = getattr(settings, 'HRM_BASE_URL', 'http://localhost:8001/')
-            hrm_api_url = f"{hrm_base_url}/root/api/check-employee-status/{email}/?full_details=true"
-            
-            response = requests.get(hrm_api_url, timeout=10)
+            # HRM API endpoint with full_details parameter
+            response = get_hrm_client().employee_details(email)
             
             if response.status_code == 200:
                 data = response.json()
@@ -320,126 +313,6 @@ class SSOLoginView(View):
         
         logger.info(f"Employee profile synced successfully for {user.email}")
     
-    def sync_all_employees_from_hrm(self):
-        """
-        Sync all active employees from HRM to DAS
-        Called when admin logs in
-        Returns dict with sync results
-        """
-        import secrets
-        from django.utils import timezone
-        
-        # Get HRM URL from settings
-        # hrm_url = getattr(settings, 'HRM_BASE_URL', 'https://hrmbackendapi.meridahr.com/')
-        hrm_url = getattr(settings, 'HRM_BASE_URL', 'http://localhost:8001/')
-        hrm_api_url = f"{hrm_url}/root/api/check-employee-status/{email}/"
-        
-        try:
-            # Fetch all active employees from HRM
-            response = requests.get(
-                f'{hrm_url}/root/api/employees-active/',
-                timeout=30
-            )
-            
-            if response.status_code != 200:
-                logger.error(f'Failed to fetch employees from HRM. Status: {response.status_code}')
-                return None
-            
-            data = response.json()
-            employees = data.get('employees', [])
-            
-            if not employees:
-                return {'created': 0, 'updated': 0, 'total': 0}
-            
-            created_count = 0
-            updated_count = 0
-            
-            for emp_data in employees:
-                try:
-                    email = emp_data.get('email')
-                    
-                    if not email:
-                        continue
-                    
-                    # Map HRM designation to DAS role
-                    das_role = self.map_das_role(emp_data.get('designation', ''))
-                    
-                    # Create or update User
-                    user, created = User.objects.update_or_create(
-                        email=email,
-                        defaults={
-                            'hrm_employee_id': emp_data.get('employee_Id'),
-                            'employee_name': emp_data.get('full_name'),
-                            'employee_type': emp_data.get('Employeement_Type'),
-                            'designation': emp_data.get('designation'),
-                            'hrm_department': emp_data.get('department'),
-                            'role': das_role,
-                            'location': emp_data.get('work_location'),
-                            'date_of_joining': emp_data.get('hired_date'),
-                            'is_active_in_hrm': True,
-                            'last_sync_time': timezone.now(),
-                            'is_active': True,
-                        }
-                    )
-                    
-                    # Set password for new users
-                    if created:
-                        random_password = secrets.token_urlsafe(16)
-                        user.set_password(random_password)
-                        user.save()
-                        created_count += 1
-                    else:
-                        updated_count += 1
-                    
-                    # Create or update Employee profile
-                    def parse_date(date_str):
-                        if date_str:
-                            try:
-                                from datetime import datetime
-                                return datetime.fromisoformat(date_str).date()
-                            except:
-                                return None
-                        return None
-                    
-                    Employee.objects.update_or_create(
-                        user=user,
-                        defaults={
-                            'name': emp_data.get('full_name', ''),
-                            'email': emp_data.get('email', ''),
-                            'phone': emp_data.get('phone', ''),
-                            'role': emp_data.get('designation', ''),
-                            'department': emp_data.get('department', ''),
-                            'employment_type': emp_data.get('Employeement_Type', ''),
-                            'designation': emp_data.get('designation', ''),
-                            'work_location': emp_data.get('work_location', ''),
-                            'date_of_joining': parse_date(emp_data.get('hired_date')),
-                            'date_of_birth': parse_date(emp_data.get('date_of_birth')),
-                            'is_active': True,
-                            'employee_status': 'active',
-                            'employee_id': emp_data.get('employee_Id', ''),
-                        }
-                    )
-                    
-                except Exception as e:
-                    logger.error(f"Error syncing employee {emp_data.get('email', 'unknown')}: {str(e)}")
-                    continue
-            
-            return {
-                'created': created_count,
-                'updated': updated_count,
-                'total': len(employees)
-            }
-            
-        except requests.exceptions.Timeout:
-            logger.error('HRM service timeout during employee sync')
-            return None
-        except requests.exceptions.RequestException as e:
-            logger.error(f'Failed to connect to HRM service: {str(e)}')
-            return None
-        except Exception as e:
-            logger.error(f'Unexpected error during employee sync: {str(e)}')
-            return None
-    
     def map_das_role(self, hrm_role):
         """
         Map HRM role/employment type to DAS role
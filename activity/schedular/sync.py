@@ -0,0 +1,299 @@
+"""
+Delta sync for the Flutter client (POST /api/sync/)
+
+The client keeps local copies of the collections below and sends one cursor
+per collection; the response carries only the rows changed since that cursor
+and the ids deleted since, at most `limit` (SYNC_BATCH_SIZE) of each:
+
+    {"cursors": {"today_plans": "<cursor>", "catalog": null, ...}, "limit": 200,
+     "mutations": [{"client_id": "n1", "collection": "sticky_notes", "op": "create", "data": {...}}]}
+
+A cursor is the opaque string returned by the previous response (null: load
+the collection from scratch). Rows are read in (updated_at, id) order, so a
+batch that ends inside a run of rows sharing one timestamp resumes after the
+last id. Only rows older than SYNC_SETTLE_SECONDS are handed out: auto_now
+stamps the row before its transaction commits, and a write committed late must
+not land behind a cursor that already moved on.
+
+Deletions come from SyncTombstone rows written by a post_delete receiver;
+deactivated catalog items are reported as deleted too. Tombstones are pruned
+after SYNC_TOMBSTONE_DAYS (`manage.py prune_sync_tombstones`); a cursor that
+has not caught up with the tombstones for that long gets "reset": the client
+drops its copy and reloads the collection from the batches that follow.
+
+Queued offline mutations are applied before the changes are read, each in its
+own savepoint through the serializers of the REST endpoints, and reported per
+client_id. An update or delete carrying "base_updated_at" (the updated_at the
+client last saw) is refused as a conflict when the row changed since.
+
+Writes that bypass save() must set updated_at themselves to reach clients
+(ordering._assign does); resolved_task / resolved_project are server-side
+denormalizations and are not synced.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+from .models import ActivityLog, Catalog, Pending, StickyNote, SyncTombstone, TodayPlan
+from .ordering import next_order_index
+from .serializers import (ActivityLogSyncSerializer, CatalogSyncSerializer, PendingSerializer,
+                          PendingSyncSerializer, StickyNoteSerializer, StickyNoteSyncSerializer,
+                          TodayPlanSerializer, TodayPlanSyncSerializer)
+
+# Fields a mutation can never set
+READ_ONLY = frozenset({'id', 'user', 'created_at', 'updated_at'})
+
+# name -> model, row serializer, write serializer, allowed mutations, extra read-only fields.
+# 'shared' collections are the same for every user (tombstones carry no owner).
+COLLECTIONS = {
+    'catalog': {
+        'model': Catalog, 'serializer': CatalogSyncSerializer, 'shared': True, 'writes': (),
+    },
+    'today_plans': {
+        'model': TodayPlan, 'serializer': TodayPlanSyncSerializer, 'write_serializer': TodayPlanSerializer,
+        # order_index is owned by ordering.py (reorder / move endpoints)
+        'writes': ('create', 'update', 'delete'), 'read_only': {'order_index', 'resolved_task', 'resolved_project'},
+    },
+    'activity_logs': {
+        # Timers change through the start / stop actions only
+        'model': ActivityLog, 'serializer': ActivityLogSyncSerializer, 'writes': (),
+    },
+    'pending': {
+        'model': Pending, 'serializer': PendingSyncSerializer, 'write_serializer': PendingSerializer,
+        'writes': ('update',), 'read_only': {'today_plan', 'activity_log', 'original_plan_date'},
+    },
+    'sticky_notes': {
+        'model': StickyNote, 'serializer': StickyNoteSyncSerializer, 'write_serializer': StickyNoteSerializer,
+        'writes': ('create', 'update', 'delete'),
+    },
+}
+
+COLLECTION_NAMES = {spec['model']: name for name, spec in COLLECTIONS.items()}
+
+
+class SyncError(Exception):
+    """A sync request that cannot be served at all (unknown collection, oversized batch)"""
+
+
+def batch_size():
+    return getattr(settings, 'SYNC_BATCH_SIZE', 500)
+
+
+def record_deletion(instance):
+    """post_delete hook: leave a tombstone for a deleted row of a synced collection"""
+    name = COLLECTION_NAMES[type(instance)]
+    SyncTombstone.objects.create(
+        collection=name,
+        object_id=instance.pk,
+        user_id=None if COLLECTIONS[name].get('shared') else instance.user_id,
+    )
+
+
+def prune_tombstones(now=None):
+    """Delete tombstones older than SYNC_TOMBSTONE_DAYS; returns the number deleted"""
+    cutoff = (now or timezone.now()) - timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_DAYS', 30))
+    return SyncTombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]
+
+
+# ── Cursors ──────────────────────────────────────────────────────────────
+# "<updated_at>|<id>|<tombstone id>|<tombstones seen until>": the last row and
+# tombstone handed out, and the time up to which every tombstone was handed out.
+
+def encode_cursor(updated_at, row_id, tombstone_id, seen_until):
+    return '|'.join([updated_at.isoformat() if updated_at else '', str(row_id), str(tombstone_id), seen_until.isoformat()])
+
+
+def decode_cursor(cursor):
+    """(updated_at, row_id, tombstone_id, seen_until), or None for a missing or malformed cursor"""
+    try:
+        updated_at, row_id, tombstone_id, seen_until = cursor.split('|')
+        seen_until = parse_datetime(seen_until)
+        if seen_until is None:
+            return None
+        return parse_datetime(updated_at) if updated_at else None, int(row_id), int(tombstone_id), seen_until
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+# ── Pull ─────────────────────────────────────────────────────────────────
+
+def _rows(spec, user):
+    rows = spec['model'].objects.all()
+    return rows if spec.get('shared') else rows.filter(user=user)
+
+
+def _tombstones(name, spec, user):
+    tombstones = SyncTombstone.objects.filter(collection=name)
+    return tombstones if spec.get('shared') else tombstones.filter(user_id=user.id)
+
+
+def collection_changes(user, name, cursor, limit, now):
+    """One batch of changes of a collection since `cursor` (see the module docstring)"""
+    spec = COLLECTIONS[name]
+    horizon = now - timedelta(seconds=getattr(settings, 'SYNC_SETTLE_SECONDS', 2))
+    pruned_before = now - timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_DAYS', 30))
+    decoded = decode_cursor(cursor)
+    reset = cursor is not None and (decoded is None or decoded[3] < pruned_before)
+
+    if decoded is None or reset:
+        # Full load: earlier deletions concern rows the client will not receive
+        since, after_id = None, 0
+        tombstone_id = _tombstones(name, spec, user).aggregate(last=Max('id'))['last'] or 0
+    else:
+        since, after_id, tombstone_id, _ = decoded
+
+    rows = _rows(spec, user).filter(updated_at__lte=horizon)
+    if since is not None:
+        rows = rows.filter(Q(updated_at__gt=since) | Q(updated_at=since, id__gt=after_id))
+    rows = list(rows.order_by('updated_at', 'id')[:limit + 1])
+    tombstones = list(
+        _tombstones(name, spec, user).filter(id__gt=tombstone_id, deleted_at__lte=horizon)
+        .order_by('id').values_list('id', 'object_id', 'deleted_at')[:limit + 1]
+    )
+    has_more = len(rows) > limit or len(tombstones) > limit
+    seen_until = tombstones[limit - 1][2] if len(tombstones) > limit else horizon
+    rows, tombstones = rows[:limit], tombstones[:limit]
+
+    if rows:
+        since, after_id = rows[-1].updated_at, rows[-1].id
+    if tombstones:
+        tombstone_id = tombstones[-1][0]
+
+    deleted = [object_id for _, object_id, _ in tombstones]
+    if name == 'catalog':
+        # Deactivated items leave the catalog like deleted ones
+        deleted += [row.id for row in rows if not row.is_active]
+        rows = [row for row in rows if row.is_active]
+
+    return {
+        'changed': spec['serializer'](rows, many=True).data,
+        'deleted': deleted,
+        'cursor': encode_cursor(since, after_id, tombstone_id, seen_until),
+        'has_more': has_more,
+        'reset': reset,
+    }
+
+
+# ── Push ─────────────────────────────────────────────────────────────────
+
+def _write(user, spec, mutation, context):
+    """Apply one mutation; returns (status, instance or None, errors or None)"""
+    op = mutation.get('op')
+    data = {
+        key: value for key, value in (mutation.get('data') or {}).items()
+        if key not in READ_ONLY and key not in spec.get('read_only', ())
+    }
+    write_serializer = spec['write_serializer']
+
+    if op == 'create':
+        serializer = write_serializer(data=data, context=context)
+        serializer.is_valid(raise_exception=True)
+        extra = {'user': user}
+        if spec['model'] is TodayPlan:
+            extra['order_index'] = next_order_index(user, serializer.validated_data['plan_date'])
+        return 'applied', serializer.save(**extra), None
+
+    instance = _rows(spec, user).filter(pk=mutation.get('id')).first()
+    if instance is None:
+        # Already gone: a delete has nothing left to do, an update is lost
+        return ('applied' if op == 'delete' else 'not_found'), None, None
+
+    base = mutation.get('base_updated_at')
+    if base and parse_datetime(str(base)) != instance.updated_at:
+        return 'conflict', instance, {'updated_at': ['The row changed on the server since base_updated_at']}
+
+    if op == 'delete':
+        instance.delete()
+        return 'applied', None, None
+
+    serializer = write_serializer(instance, data=data, partial=True, context=context)
+    serializer.is_valid(raise_exception=True)
+    return 'applied', serializer.save(), None
+
+
+def _malformed(mutation):
+    """Field errors of a mutation whose id, data or base_updated_at cannot be used at all"""
+    errors = {}
+    if mutation.get('data') is not None and not isinstance(mutation['data'], dict):
+        errors['data'] = ['Must be an object']
+    if mutation.get('op') != 'create':
+        try:
+            int(str(mutation.get('id')))
+        except ValueError:
+            errors['id'] = ['A valid integer is required']
+    base = mutation.get('base_updated_at')
+    if base:
+        try:
+            valid = parse_datetime(str(base)) is not None
+        except ValueError:
+            valid = False
+        if not valid:
+            errors['base_updated_at'] = ['Must be an ISO 8601 datetime']
+    return errors
+
+
+def apply_mutation(user, mutation, context=None):
+    """Apply one queued offline mutation in its own savepoint and describe the outcome"""
+    if not isinstance(mutation, dict):
+        return {'client_id': None, 'status': 'rejected', 'errors': {'non_field_errors': ['A mutation must be an object']}}
+    name, op = mutation.get('collection'), mutation.get('op')
+    result = {'client_id': mutation.get('client_id'), 'collection': name, 'op': op, 'id': mutation.get('id')}
+    spec = COLLECTIONS.get(name)
+    if spec is None or op not in spec['writes']:
+        return dict(result, status='rejected', errors={'op': [f"'{op}' is not allowed on '{name}'"]})
+    errors = _malformed(mutation)
+    if errors:
+        return dict(result, status='rejected', errors=errors)
+    if op != 'create':
+        mutation = dict(mutation, id=int(str(mutation['id'])))
+
+    try:
+        with transaction.atomic():
+            status, instance, errors = _write(user, spec, mutation, context)
+    except serializers.ValidationError as e:
+        return dict(result, status='rejected', errors=e.detail)
+    except IntegrityError as e:
+        return dict(result, status='rejected', errors={'non_field_errors': [str(e)]})
+
+    if instance is not None:
+        result.update(id=instance.pk, row=spec['serializer'](instance).data)
+    if errors:
+        result['errors'] = errors
+    return dict(result, status=status)
+
+
+# ── Entry point ──────────────────────────────────────────────────────────
+
+def sync(user, cursors=None, mutations=(), limit=None, context=None):
+    """
+    cursors: {collection: cursor or None}; None syncs every collection from scratch.
+    Raises SyncError.
+    """
+    if cursors is None:
+        cursors = dict.fromkeys(COLLECTIONS)
+    if not isinstance(cursors, dict):
+        raise SyncError("cursors must be an object of collection: cursor")
+    unknown = set(cursors) - set(COLLECTIONS)
+    if unknown:
+        raise SyncError(f"Unknown collections: {', '.join(sorted(unknown))}")
+    mutations = mutations or []
+    if not isinstance(mutations, list) or len(mutations) > batch_size():
+        raise SyncError(f"mutations must be a list of at most {batch_size()} items")
+    try:
+        limit = max(1, min(int(limit or batch_size()), batch_size()))
+    except (TypeError, ValueError):
+        raise SyncError("limit must be a number")
+
+    results = [apply_mutation(user, mutation, context) for mutation in mutations]
+    now = timezone.now()
+    return {
+        'server_time': now.isoformat(),
+        'mutations': results,
+        'collections': {name: collection_changes(user, name, cursor, limit, now) for name, cursor in cursors.items()},
+    }
+
@@ -0,0 +1,114 @@
+"""
+Running-timer registry
+
+Keeps the IN_PROGRESS ActivityLogs ("running sessions") in memory so that
+"who is running what" and live elapsed time need no ActivityLog scan: the
+achieved-hours analytics and the 'timers' ticks on ws/dashboard/ read it in
+O(running sessions). ActivityLogViewSet.active, which starts and stops are
+decided on, reads the user's IN_PROGRESS logs from the database (the
+(user, actual_start_time) index) and does not depend on the registry.
+
+The registry is a snapshot of the running sessions stored as compact tuples in
+Django's default cache, tagged with a generation id. After every committed
+start/stop (ActivityLog save/delete) the snapshot is reloaded from the database
+with one query and republished; each process keeps a decoded copy and only
+re-decodes when the generation changes. Snapshots expire after
+TIMER_REGISTRY_TTL seconds as a safety net.
+
+Only a shared CACHES backend (CACHE_URL in settings) lets every process see a
+start or stop immediately. With a process-local backend the snapshot is never
+kept: every read goes to the database (one IN_PROGRESS query).
+"""
+import threading
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ActivityLog
+from .user_cache import cache_is_shared
+
+CACHE_KEY = 'running-timers'
+
+Session = namedtuple('Session', [
+    'id', 'user_id', 'today_plan_id', 'task_id', 'project_id', 'started_at', 'hours_worked',
+])
+
+_FIELDS = (
+    'id', 'user_id', 'today_plan_id', 'resolved_task_id', 'resolved_project_id', 'actual_start_time', 'hours_worked',
+)
+
+
+class RunningTimers:
+    """Per-process view of the shared running-session snapshot"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._sessions = ()
+
+    @staticmethod
+    def _rows():
+        return [
+            row[:5] + (row[5].timestamp(), float(row[6] or 0))
+            for row in ActivityLog.objects.filter(status='IN_PROGRESS').values_list(*_FIELDS)
+        ]
+
+    def reload(self):
+        """Read the running sessions from the database and publish a new snapshot"""
+        entry = (uuid.uuid4().hex, self._rows())
+        cache.set(CACHE_KEY, entry, getattr(settings, 'TIMER_REGISTRY_TTL', 300))
+        return entry
+
+    def sessions(self):
+        if not cache_is_shared():
+            # Another worker's start or stop would never reach a local snapshot
+            return tuple(Session(*row) for row in self._rows())
+        entry = cache.get(CACHE_KEY)
+        if entry is None:
+            entry = self.reload()
+        generation, rows = entry
+        if generation != self._generation:
+            with self._lock:
+                self._sessions = tuple(Session(*row) for row in rows)
+                self._generation = generation
+        return self._sessions
+
+    def for_user(self, user_id):
+        return [s for s in self.sessions() if s.user_id == user_id]
+
+    def for_users(self, user_ids=None):
+        """Sessions of the given users (None: everyone)"""
+        if user_ids is None:
+            return list(self.sessions())
+        user_ids = set(user_ids)
+        return [s for s in self.sessions() if s.user_id in user_ids]
+
+    @staticmethod
+    def elapsed_seconds(session, now=None):
+        now = now or timezone.now()
+        return max(0.0, now.timestamp() - session.started_at)
+
+    def live_hours_for_task(self, task, user_id=None):
+        """
+        Live hours of running sessions linked to `task` (ActivityLog.resolved_task).
+        Sessions that already carry hours_worked are counted by the database aggregate instead.
+        """
+        now = timezone.now()
+        return sum(
+            self.elapsed_seconds(s, now) / 3600.0
+            for s in self.sessions()
+            if s.task_id == task.id and s.hours_worked <= 0 and not (user_id and s.user_id != int(user_id))
+        )
+
+
+registry = RunningTimers()
+
+
+def refresh_after_commit():
+    """Republish the running sessions once the current transaction commits"""
+    if cache_is_shared():
+        transaction.on_commit(registry.reload)
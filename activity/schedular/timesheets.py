@@ -0,0 +1,160 @@
+"""
+Streaming timesheet export (payroll and client billing)
+
+One row per ActivityLog with the user, the resolved project / task names and
+the hours worked, for a date range and optionally a set of users and
+projects. The rows are read with a single query over the (user,
+actual_start_time) index, in that order, through .iterator(chunk_size=...)
+and turned into CSV or NDJSON lines as they arrive, so memory stays flat
+however many years of logs the range covers. Used by
+GET /api/timesheets/export/ (StreamingHttpResponse) and
+`manage.py export_timesheets`.
+
+A log counts on the local day (TIME_ZONE) its work started. The
+daily-performance endpoints group by plan date instead, which differs only
+for work logged against another day's plan. Project and task come from
+resolved_project / resolved_task (links.py); the item column is the catalog
+item name or the custom plan title.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import ActivityLog
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# (column, ActivityLog lookup)
+COLUMNS = [
+    ('log_id', 'id'),
+    ('user_id', 'user_id'),
+    ('employee_name', 'user__employee_name'),
+    ('email', 'user__email'),
+    ('project_id', 'resolved_project_id'),
+    ('project', 'resolved_project__name'),
+    ('task_id', 'resolved_task_id'),
+    ('task', 'resolved_task__title'),
+    ('catalog_item', 'today_plan__catalog_item__name'),
+    ('custom_title', 'today_plan__custom_title'),
+    ('plan_date', 'today_plan__plan_date'),
+    ('start', 'actual_start_time'),
+    ('end', 'actual_end_time'),
+    ('minutes_worked', 'minutes_worked'),
+    ('hours_worked', 'hours_worked'),
+    ('status', 'status'),
+    ('is_unplanned', 'is_unplanned'),
+    ('work_notes', 'work_notes'),
+]
+
+HEADER = ['date', 'log_id', 'user_id', 'employee_name', 'email', 'project_id', 'project', 'task_id', 'task',
+          'item', 'plan_date', 'start', 'end', 'minutes_worked', 'hours_worked', 'status', 'is_unplanned',
+          'work_notes']
+
+
+class TimesheetError(Exception):
+    """Export parameters that cannot be served"""
+
+
+def chunk_size():
+    return getattr(settings, 'TIMESHEET_EXPORT_CHUNK_SIZE', 2000)
+
+
+def parse_ids(value, name):
+    """'1,2,3' (or a list) -> [1, 2, 3]; None when absent. Raises TimesheetError."""
+    if value in (None, '', []):
+        return None
+    parts = value.split(',') if isinstance(value, str) else value
+    try:
+        return sorted({int(part) for part in parts if str(part).strip()})
+    except (TypeError, ValueError):
+        raise TimesheetError(f'{name} must be a comma-separated list of ids')
+
+
+def parse_range(start_date=None, end_date=None):
+    """(start, end) dates; defaults to the current month up to today. Raises TimesheetError."""
+    today = timezone.localdate()
+    try:
+        start = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else today.replace(day=1)
+        end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else today
+    except (TypeError, ValueError):
+        raise TimesheetError('Invalid date format. Use YYYY-MM-DD')
+    if start > end:
+        raise TimesheetError('start_date must not be after end_date')
+    return start, end
+
+
+def timesheet_logs(start, end, user_ids=None, project_ids=None):
+    """values_list() of COLUMNS for the logs started between start and end (inclusive local days)"""
+    tz = timezone.get_current_timezone()
+    logs = ActivityLog.objects.filter(
+        actual_start_time__gte=timezone.make_aware(datetime.combine(start, time.min), tz),
+        actual_start_time__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz),
+    )
+    if user_ids is not None:
+        logs = logs.filter(user_id__in=user_ids)
+    if project_ids is not None:
+        logs = logs.filter(resolved_project_id__in=project_ids)
+    return logs.order_by('user_id', 'actual_start_time', 'id').values_list(*(lookup for _, lookup in COLUMNS))
+
+
+def _records(logs):
+    """One dict per log, in HEADER order, with local times"""
+    names = [name for name, _ in COLUMNS]
+    # timezone.localtime() looks the zone up again for every value
+    tz = timezone.get_current_timezone()
+    for values in logs.iterator(chunk_size=chunk_size()):
+        row = dict(zip(names, values))
+        start = row['start'].astimezone(tz)
+        end = row['end'].astimezone(tz) if row['end'] else None
+        row.update(
+            date=start.date(),
+            item=row['catalog_item'] or row['custom_title'],
+            start=start.isoformat(timespec='seconds'),
+            end=end.isoformat(timespec='seconds') if end else None,
+        )
+        yield {name: row[name] for name in HEADER}
+
+
+class _Echo:
+    """csv.writer target that hands the written line back"""
+
+    def write(self, value):
+        return value
+
+
+def _batched(lines):
+    # One chunk per 500 rows rather than one tiny chunk per row
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= 500:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def csv_lines(logs):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(HEADER)
+    for record in _records(logs):
+        yield writer.writerow(['' if record[name] is None else record[name] for name in HEADER])
+
+
+def ndjson_lines(logs):
+    for record in _records(logs):
+        yield json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def stream(logs, output='csv'):
+    """Text chunks of the export in `output` format ('csv' or 'ndjson'). Raises TimesheetError."""
+    if output not in FORMATS:
+        raise TimesheetError(f"output must be one of {', '.join(FORMATS)}")
+    return _batched(csv_lines(logs) if output == 'csv' else ndjson_lines(logs))
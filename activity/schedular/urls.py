@@ -7,6 +7,8 @@ from .views import (ProjectWorkingHoursViewSet, TeamActivityStatusViewSet, SyncH
 from .sso_views import SSOLoginView, InactiveUserView
 from .views_performance import (DailyPerformanceView, DateRangePerformanceView, 
                                WeeklyComparisonView, MonthlyComparisonView, PerformanceDashboardView)
+from .views_sync import SyncView
+from .views_timesheets import TimesheetExportView
 
 router = DefaultRouter()
 
@@ -59,6 +61,9 @@ router.register(r'team-activity-status', TeamActivityStatusViewSet, basename='te
 # HRM Sync endpoints
 router.register(r'sync-hrm-employees', SyncHRMEmployeesViewSet, basename='sync-hrm-employees')
 
+# Conditional GET (ETag / 304) hit-rate metrics
+router.register(r'conditional-get', views.ConditionalGetViewSet, basename='conditional-get')
+
 # Line Chart endpoints - Project and Task completion analytics
 router.register(r'project-completion-chart', ProjectCompletionLineChartViewSet, basename='project-completion-chart')
 router.register(r'task-completion-chart', TaskCompletionLineChartViewSet, basename='task-completion-chart')
@@ -81,6 +86,11 @@ urlpatterns = [
     path('monthly-comparison/', MonthlyComparisonView.as_view(), name='monthly-comparison-current'),
     path('monthly-comparison/<int:year>/<int:month>/', MonthlyComparisonView.as_view(), name='monthly-comparison'),
     path('performance-dashboard/', PerformanceDashboardView.as_view(), name='performance-dashboard'),
+
+    # Offline-first delta sync for the Flutter app
+    path('sync/', SyncView.as_view(), name='sync'),
+    # Payroll / billing export of activity logs (CSV or NDJSON, streamed)
+    path('timesheets/export/', TimesheetExportView.as_view(), name='timesheet-export'),
     
     # API Routes
     path('', include(router.urls)),
@@ -0,0 +1,111 @@
+"""
+Short-lived cache of authenticated users
+
+ImpersonationJWTAuthentication and NotificationConsumer resolve the token's
+user (and the impersonation target) through get_cached_users() instead of a
+User query per request. Entries live for AUTH_USER_CACHE_TTL seconds and carry
+the user's version stamp; invalidate_users() bumps the stamp after commit on
+every User save or delete (the cached instance is request.user, so profile and
+preference edits must show on the next request too). Writes that bypass save()
+(queryset.update()) must call invalidate_users() themselves.
+
+The stamp lives in Django's default cache, so the bump only reaches every
+worker through a shared backend (CACHE_URL in settings). With a process-local
+backend (LocMemCache, DummyCache) the cache stays off whatever the TTL says.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import User
+
+USER_KEY = 'auth-user:{}'
+VERSION_KEY = 'auth-user-version:{}'
+
+# Backends whose entries never leave the process
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared():
+    """True when the default cache is visible to every worker process"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    return backend not in LOCAL_CACHE_BACKENDS
+
+
+def _ttl():
+    if not cache_is_shared():
+        return 0
+    return getattr(settings, 'AUTH_USER_CACHE_TTL', 0)
+
+
+def get_cached_users(user_ids):
+    """Map of str(pk) -> User for the given ids, loading cache misses in one query"""
+    user_ids = {str(user_id) for user_id in user_ids if user_id is not None}
+    ttl = _ttl()
+    if ttl <= 0:
+        return {str(u.pk): u for u in User.objects.filter(pk__in=user_ids)}
+
+    keys = [USER_KEY.format(i) for i in user_ids] + [VERSION_KEY.format(i) for i in user_ids]
+    entries = cache.get_many(keys)
+
+    users, versions, missing = {}, {}, []
+    for user_id in user_ids:
+        versions[user_id] = entries.get(VERSION_KEY.format(user_id), 0)
+        cached = entries.get(USER_KEY.format(user_id))
+        if cached is not None and cached[0] == versions[user_id]:
+            users[user_id] = cached[1]
+        else:
+            missing.append(user_id)
+
+    if missing:
+        loaded = {str(u.pk): u for u in User.objects.select_related('department').filter(pk__in=missing)}
+        # Stored with the version read *before* the query: a concurrent bump makes it stale at once
+        cache.set_many({USER_KEY.format(i): (versions[i], u) for i, u in loaded.items()}, ttl)
+        users.update(loaded)
+    return users
+
+
+async def aget_cached_user(user_id):
+    """Async get_cached_user() for consumers; raises User.DoesNotExist"""
+    user_id = str(user_id)
+    ttl = _ttl()
+    if ttl <= 0:
+        return await User.objects.select_related('department').aget(pk=user_id)
+
+    entries = await cache.aget_many([USER_KEY.format(user_id), VERSION_KEY.format(user_id)])
+    version = entries.get(VERSION_KEY.format(user_id), 0)
+    cached = entries.get(USER_KEY.format(user_id))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    user = await User.objects.select_related('department').aget(pk=user_id)
+    await cache.aset(USER_KEY.format(user_id), (version, user), ttl)
+    return user
+
+
+def get_cached_user(user_id):
+    """Cached User.objects.get(pk=user_id); raises User.DoesNotExist"""
+    user = get_cached_users([user_id]).get(str(user_id))
+    if user is None:
+        raise User.DoesNotExist(f'User {user_id} does not exist')
+    return user
+
+
+def _bump(user_ids):
+    for user_id in user_ids:
+        key = VERSION_KEY.format(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+    cache.delete_many([USER_KEY.format(user_id) for user_id in user_ids])
+
+
+def invalidate_users(*user_ids):
+    """Drop cached entries for the given users once the current transaction commits"""
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    if user_ids:
+        transaction.on_commit(lambda: _bump(user_ids))
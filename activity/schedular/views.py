@@ -14,8 +14,22 @@ from .serializers import (LoginSerializers, SignupWithOTPSerializer, VerifySignu
 from .utils import (create_otp_record, send_password_reset_confirmation, send_password_reset_otp, 
                     send_signup_otp_to_admin, send_account_approval_email, verify_otp)
 from .models import (User, Projects, ApprovalRequest, ApprovalResponse, Task, TaskAssignee, SubTask, StickyNote, 
-                     Catalog, TodayPlan, ActivityLog, Pending, DaySession, TeamInstruction, Notification, Employee, DailyPlanner)
-from .mixins import ProjectQuerySetMixin, TaskQuerySetMixin
+                     Catalog, TodayPlan, ActivityLog, Pending, DaySession, TeamInstruction, Notification, Employee, DailyPlanner,
+                     HRMSyncJob)
+from .mixins import ProjectQuerySetMixin, SparseFieldsetMixin, TaskQuerySetMixin
+from .hrm_client import get_hrm_client
+from .hrm_sync import enqueue_sync
+from .visibility import schedule_team_rebuild
+from .scopes import any_of, assigned_tasks, project_involvement
+from .auth_context import get_auth_context
+from .user_cache import invalidate_users
+from .approvals import DECISIONS, decide, pending_queue, pending_summary, queue_rows, request_project_creation
+from .pagination import StandardResultsSetPagination
+from . import timers
+from .planning import PlanItemError, build_plans, insert_plans, parse_plan_date, plan_item_fields
+from .ordering import key_after, move as move_plan, next_order_index, reorder as reorder_plans
+from .conditional import conditional
+from . import conditional as stamps
 from rest_framework import viewsets
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -212,7 +226,7 @@ class UserPreferencesViewSet(viewsets.GenericViewSet):
         })
 
 
-class ProjectViewSet(ProjectQuerySetMixin, viewsets.ModelViewSet):
+class ProjectViewSet(SparseFieldsetMixin, ProjectQuerySetMixin, viewsets.ModelViewSet):
       serializer_class = ProjectSerializer
       queryset = Projects.objects.all() # Base queryset, overridden by mixin
       
@@ -340,54 +354,17 @@ class ProjectViewSet(ProjectQuerySetMixin, viewsets.ModelViewSet):
           if serializer.is_valid():
               with transaction.atomic():
                   user = request.user
-                  # Ensure created_by is set
-                  project = serializer.save(created_by=user if user.is_authenticated else None)
-                  
-                  # Handle approval logic - REQUIRE APPROVAL FOR ALL (Including ADMIN)
-                  if not user.is_authenticated:
-                      project.is_approved = True
-                      project.save()
-                  elif user.role == 'ADMIN':
-                      # Admin projects are auto-approved
-                      project.is_approved = True
-                      project.save()
-                  else:
-                      # Non-admin: requires admin approval
-                      project.is_approved = False
-                      project.save()
-                      
-                      ApprovalRequest.objects.create(
-                          reference_type='PROJECT',
-                          reference_id=project.id,
-                          approval_type='CREATION',
-                          requested_by=user,
-                          request_data={
-                              'project_name': project.name,
-                              'description': project.description,
-                              'requested_by': user.email,
-                          }
-                      )
-                      
-                      # ALSO SYNC INDIVIDUAL TASKS WITH APPROVAL WORKFLOW
-                      created_tasks = getattr(project, '_created_tasks', [])
-                      for task in created_tasks:
-                          task.status = 'PENDING_APPROVAL'
-                          task.save()
-                          
-                          # Use a simpler request data for initial project tasks
-                          ApprovalRequest.objects.create(
-                              reference_type='TASK',
-                              reference_id=task.id,
-                              approval_type='CREATION',
-                              requested_by=user,
-                              request_data={
-                                  'title': task.title,
-                                  'project': project.name,
-                                  'is_initial_task': True
-                              }
-                          )
-                  # WebSocket notification to admins is handled by the
-                  # approval_request_notification signal in signals.py automatically
+                  # Handle approval logic - admin (and unauthenticated) projects are auto-approved,
+                  # anything else requires admin approval along with each initial task
+                  auto_approve = not user.is_authenticated or user.role == 'ADMIN'
+                  project = serializer.save(
+                      created_by=user if user.is_authenticated else None,
+                      is_approved=auto_approve,
+                      task_status='PENDING' if auto_approve else 'PENDING_APPROVAL',
+                  )
+
+                  if not auto_approve:
+                      request_project_creation(project, project._created_tasks, user)
 
               # Return full project detail
               detail_serializer = ProjectDetailSerializer(project)
@@ -455,6 +432,7 @@ class ProjectViewSet(ProjectQuerySetMixin, viewsets.ModelViewSet):
           return Response(serializer.data)
       
       @action(detail=True, methods=['get'], url_path='gantt-view')
+      @conditional('projects.gantt_view', stamps.gantt)
       def gantt_view(self, request, pk=None):
           """Get Gantt chart data for project tasks with timeline and assignees"""
           from .serializers import GanttTaskSerializer
@@ -977,6 +955,7 @@ class ApprovalRequestViewSet(viewsets.ModelViewSet):
                         status='PENDING', 
                         completed_at=None
                     )
+                    Catalog.refresh_progress_for(project_ids=[project.id])
                     notif_title = 'Project Kept Open'
                     notif_message = (
                         f'Admin reviewed your closure request for project "{item_name}" and decided to keep it open. '
@@ -1049,172 +1028,84 @@ class ApprovalRequestViewSet(viewsets.ModelViewSet):
             print(f"Error handling rejection side effects: {e}")
             
         return Response({'status': 'rejected'})
-    
-    @action(detail=False, methods=['get'])
-    def new_projects(self, request):
-        """Get pending approval requests for new projects"""
-        approvals = ApprovalRequest.objects.filter(
-            reference_type='PROJECT',
-            approval_type='CREATION',
-            status='PENDING'
-        ).select_related('requested_by').order_by('-created_at')
-        
-        # Only admins can see all pending requests
-        if request.user.role != 'ADMIN':
-            approvals = approvals.filter(requested_by=request.user)
-        
-        # Get detailed project information
-        items = []
-        for approval in approvals:
-            try:
-                project = Projects.objects.get(id=approval.reference_id)
-                items.append({
-                    'approval_id': approval.id,
-                    'project_id': project.id,
-                    'project_name': project.name,
-                    'description': project.description,
-                    'status': project.status,
-                    'start_date': project.start_date,
-                    'due_date': project.due_date,
-                    'duration': project.duration,
-                    'working_hours': project.working_hours,
-                    'project_lead': project.project_lead.email if project.project_lead else None,
-                    'handled_by': project.handled_by.email,
-                    'requested_by': approval.requested_by.email,
-                    'requested_at': approval.created_at,
-                    'request_data': approval.request_data
-                })
-            except Projects.DoesNotExist:
-                pass
-        
+
+    @action(detail=False, methods=['post'], url_path='bulk-decide')
+    def bulk_decide(self, request):
+        """
+        Approve or reject several pending requests in one transaction (Admin only)
+        Body: {"ids": [1, 2, 3], "action": "approve" | "reject", "reason": "..."}
+        """
+        if not request.user.is_authenticated or request.user.role != 'ADMIN':
+            return Response(
+                {"error": "Only admins can approve/reject requests"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        ids = request.data.get('ids')
+        decision = DECISIONS.get(str(request.data.get('action', '')).lower())
+        if not isinstance(ids, list) or not ids:
+            return Response({"error": "ids must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if decision is None:
+            return Response({"error": "action must be 'approve' or 'reject'"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids = {int(pk) for pk in ids}
+        except (TypeError, ValueError):
+            return Response({"error": "ids must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        approvals = list(self.get_queryset().filter(id__in=ids))
+        decided, skipped = decide(approvals, decision, request.user, request.data.get('reason'))
+        found = {approval.id for approval in approvals}
+        skipped += [{'id': pk, 'error': 'Approval request not found'} for pk in sorted(ids - found)]
+
+        return Response({
+            'message': f'{len(decided)} request(s) {decision.lower()}',
+            'status': decision.lower(),
+            'decided': decided,
+            'skipped': skipped
+        })
+
+    def _queue_response(self, request, queue):
+        """
+        Rows of one pending-approval queue. References are loaded in one query per type;
+        ?page / ?page_size paginate the queue, otherwise every pending request is returned.
+        """
+        approvals = pending_queue(queue, request.user)
+
+        if 'page' in request.query_params or 'page_size' in request.query_params:
+            paginator = StandardResultsSetPagination()
+            page = paginator.paginate_queryset(approvals, request, view=self)
+            return Response({
+                'count': paginator.page.paginator.count,
+                'next': paginator.get_next_link(),
+                'previous': paginator.get_previous_link(),
+                'requests': queue_rows(queue, page)
+            })
+
+        items = queue_rows(queue, approvals)
         return Response({
             'count': len(items),
             'requests': items
         })
+
+    @action(detail=False, methods=['get'])
+    def new_projects(self, request):
+        """Get pending approval requests for new projects"""
+        return self._queue_response(request, 'new_projects')
     
     @action(detail=False, methods=['get'])
     def project_closures(self, request):
         """Get pending approval requests for project completions"""
-        approvals = ApprovalRequest.objects.filter(
-            reference_type='PROJECT',
-            approval_type='COMPLETION',
-            status='PENDING'
-        ).select_related('requested_by').order_by('-created_at')
-        
-        if request.user.role != 'ADMIN':
-            approvals = approvals.filter(requested_by=request.user)
-        
-        items = []
-        for approval in approvals:
-            try:
-                project = Projects.objects.get(id=approval.reference_id)
-                items.append({
-                    'approval_id': approval.id,
-                    'project_id': project.id,
-                    'project_name': project.name,
-                    'description': project.description,
-                    'current_status': project.status,
-                    'start_date': project.start_date,
-                    'due_date': project.due_date,
-                    'completion_request_date': project.completed_date,
-                    'project_lead': project.project_lead.email if project.project_lead else None,
-                    'handled_by': project.handled_by.email,
-                    'requested_by': approval.requested_by.email,
-                    'requested_at': approval.created_at,
-                    'request_data': approval.request_data
-                })
-            except Projects.DoesNotExist:
-                pass
-        
-        return Response({
-            'count': len(items),
-            'requests': items
-        })
+        return self._queue_response(request, 'project_closures')
     
     @action(detail=False, methods=['get'])
     def new_tasks(self, request):
         """Get pending approval requests for new tasks"""
-        approvals = ApprovalRequest.objects.filter(
-            reference_type='TASK',
-            approval_type='CREATION',
-            status='PENDING'
-        ).select_related('requested_by').order_by('-created_at')
-        
-        if request.user.role != 'ADMIN':
-            approvals = approvals.filter(requested_by=request.user)
-        
-        items = []
-        for approval in approvals:
-            try:
-                task = Task.objects.get(id=approval.reference_id)
-                items.append({
-                    'approval_id': approval.id,
-                    'task_id': task.id,
-                    'task_title': task.title,
-                    'project': task.project.name,
-                    'project_id': task.project.id,
-                    'priority': task.priority,
-                    'status': task.status,
-                    'start_date': task.start_date,
-                    'due_date': task.due_date,
-                    'requested_by': approval.requested_by.email,
-                    'requested_at': approval.created_at,
-                    'assignees': [
-                        {'email': assignee.user.email, 'role': assignee.role}
-                        for assignee in task.assignees.all()
-                    ],
-                    'request_data': approval.request_data
-                })
-            except Task.DoesNotExist:
-                pass
-        
-        return Response({
-            'count': len(items),
-            'requests': items
-        })
+        return self._queue_response(request, 'new_tasks')
     
     @action(detail=False, methods=['get'])
     def task_completions(self, request):
         """Get pending approval requests for task completions"""
-        approvals = ApprovalRequest.objects.filter(
-            reference_type='TASK',
-            approval_type='COMPLETION',
-            status='PENDING'
-        ).select_related('requested_by').order_by('-created_at')
-        
-        if request.user.role != 'ADMIN':
-            approvals = approvals.filter(requested_by=request.user)
-        
-        items = []
-        for approval in approvals:
-            try:
-                task = Task.objects.get(id=approval.reference_id)
-                items.append({
-                    'approval_id': approval.id,
-                    'task_id': task.id,
-                    'task_title': task.title,
-                    'project': task.project.name,
-                    'project_id': task.project.id,
-                    'priority': task.priority,
-                    'current_status': task.status,
-                    'start_date': task.start_date,
-                    'due_date': task.due_date,
-                    'completion_request_date': task.completed_at,
-                    'requested_by': approval.requested_by.email,
-                    'requested_at': approval.created_at,
-                    'assignees': [
-                        {'email': assignee.user.email, 'role': assignee.role}
-                        for assignee in task.assignees.all()
-                    ],
-                    'request_data': approval.request_data
-                })
-            except Task.DoesNotExist:
-                pass
-        
-        return Response({
-            'count': len(items),
-            'requests': items
-        })
+        return self._queue_response(request, 'task_completions')
     
     @action(detail=False, methods=['get'])
     def my_pending_requests(self, request):
@@ -1236,31 +1127,8 @@ class ApprovalRequestViewSet(viewsets.ModelViewSet):
         # Senior Defense: Self-heal any orphaned states before calculating summary
         self._cleanup_orphaned_approvals()
 
-        base_query = ApprovalRequest.objects.filter(status='PENDING')
-        
         # Only admins see all pending; others see only their own
-        if request.user.role != 'ADMIN':
-            base_query = base_query.filter(requested_by=request.user)
-        
-        summary = {
-            'new_projects': base_query.filter(
-                reference_type='PROJECT',
-                approval_type='CREATION'
-            ).count(),
-            'project_closures': base_query.filter(
-                reference_type='PROJECT',
-                approval_type='COMPLETION'
-            ).count(),
-            'new_tasks': base_query.filter(
-                reference_type='TASK',
-                approval_type='CREATION'
-            ).count(),
-            'task_completions': base_query.filter(
-                reference_type='TASK',
-                approval_type='COMPLETION'
-            ).count(),
-            'total_pending': base_query.count()
-        }
+        summary = pending_summary(request.user)
         
         return Response(summary)
 
@@ -1404,6 +1272,7 @@ class ApprovalResponseViewSet(viewsets.ModelViewSet):
                             status='PENDING', 
                             completed_at=None
                         )
+                        Catalog.refresh_progress_for(project_ids=[project.id])
                     
             except Projects.DoesNotExist:
                 pass
@@ -1484,7 +1353,7 @@ class ApprovalResponseViewSet(viewsets.ModelViewSet):
             "response": ApprovalResponseSerializer(response).data
         }, status=status.HTTP_201_CREATED)
     
-class TaskViewSet(TaskQuerySetMixin, viewsets.ModelViewSet):
+class TaskViewSet(SparseFieldsetMixin, TaskQuerySetMixin, viewsets.ModelViewSet):
     """ViewSet for managing tasks"""
     serializer_class = TaskSerializer
     pagination_class = None
@@ -1994,7 +1863,7 @@ class SubTaskViewSet(viewsets.ModelViewSet):
         })
 
 
-class PendingViewSet(viewsets.ModelViewSet):
+class PendingViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet for managing pending tasks"""
     permission_classes = [AllowAny]  # DEVELOPMENT: Allow unauthenticated access
     serializer_class = PendingSerializer
@@ -2041,7 +1910,8 @@ class PendingViewSet(viewsets.ModelViewSet):
             try:
                 requested_user = User.objects.get(id=user_id_param)
                 # Check permissions
-                if request.user.role == 'ADMIN' or (request.user.role in ['MANAGER', 'TEAMLEAD'] and getattr(requested_user, 'department', None) == getattr(request.user, 'department', None)):
+                context = get_auth_context(request)
+                if context.role == 'ADMIN' or (context.role in ['MANAGER', 'TEAMLEAD'] and getattr(requested_user, 'department_id', None) == context.department_id):
                     target_user = requested_user
             except User.DoesNotExist:
                 pass
@@ -2105,8 +1975,84 @@ class PendingViewSet(viewsets.ModelViewSet):
             "pending": PendingSerializer(pending_task).data
         })
 
+    @action(detail=False, methods=['post'])
+    def bulk_replan(self, request):
+        """
+        Replan several pending tasks at once.
+
+        Payload: {"items": [{"id": 3, "replanned_date": "2026-04-09"}, ...]}
+             or: {"ids": [3, 4], "replanned_date": "2026-04-09"}
+        Unless "add_to_plan" is false, each task is also put back on the plan of
+        its new date (remaining minutes as the planned duration).
+        """
+        items = request.data.get('items')
+        if items is None:
+            items = [{'id': pk, 'replanned_date': request.data.get('replanned_date')} for pk in request.data.get('ids') or []]
+        if not isinstance(items, list) or not items:
+            return Response({"error": "items or ids are required"}, status=status.HTTP_400_BAD_REQUEST)
 
-class CatalogViewSet(viewsets.ModelViewSet):
+        targets = {}
+        try:
+            for item in items:
+                if not item.get('replanned_date'):
+                    return Response({"error": "replanned_date is required"}, status=status.HTTP_400_BAD_REQUEST)
+                targets[int(item['id'])] = parse_plan_date(item['replanned_date'])
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return Response({"error": "each item needs an id"}, status=status.HTTP_400_BAD_REQUEST)
+        except PlanItemError as e:
+            return Response({"error": str(e)}, status=e.status_code)
+
+        pending = list(
+            self.get_queryset().filter(id__in=targets, status='PENDING')
+            .select_related('user', 'today_plan__catalog_item')
+        )
+        add_to_plan = request.data.get('add_to_plan', True) not in (False, 'false', '0', 0)
+
+        by_user = {}
+        for pending_task in pending:
+            plan = pending_task.today_plan
+            by_user.setdefault(pending_task.user_id, (pending_task.user, []))[1].append({
+                'item_type': 'catalog' if plan.catalog_item_id else 'custom',
+                'catalog_id': plan.catalog_item_id,
+                'title': plan.custom_title,
+                'description': plan.custom_description or '',
+                'notes': plan.notes or '',
+                'planned_duration_minutes': pending_task.minutes_left or plan.planned_duration_minutes,
+                'quadrant': plan.quadrant,
+                'is_unplanned': plan.is_unplanned,
+                'plan_date': targets[pending_task.id],
+            })
+
+        with transaction.atomic():
+            by_date = {}
+            for pending_task in pending:
+                by_date.setdefault(targets[pending_task.id], []).append(pending_task.id)
+            now = timezone.now()
+            for replanned_date, ids in by_date.items():
+                Pending.objects.filter(id__in=ids).update(replanned_date=replanned_date, status='REPLANNED', updated_at=now)
+
+            created = []
+            if add_to_plan:
+                for user, plan_items in by_user.values():
+                    plans, errors = build_plans(user, plan_items)
+                    if errors:
+                        transaction.set_rollback(True)
+                        return Response(
+                            {"error": "Some tasks could not be planned", "errors": errors},
+                            status=status.HTTP_400_BAD_REQUEST
+                        )
+                    created += insert_plans(user, plans)
+
+        found = {pending_task.id for pending_task in pending}
+        return Response({
+            "message": f"{len(pending)} tasks replanned successfully",
+            "replanned": sorted(found),
+            "skipped": sorted(set(targets) - found),
+            "plans": [{'id': plan.id, 'plan_date': plan.plan_date, 'order_index': plan.order_index} for plan in created]
+        })
+
+
+class CatalogViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet for managing catalog items"""
     permission_classes = [AllowAny]  # Temporarily allow unauthenticated access for testing
     serializer_class = CatalogSerializer
@@ -2127,10 +2073,11 @@ class CatalogViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
     
     @action(detail=False, methods=['get'])
+    @conditional('catalog.my_catalog', stamps.my_catalog)
     def my_catalog(self, request):
         """Get current user's catalog items"""
         catalog = Catalog.objects.filter(user=request.user, is_active=True)
-        serializer = self.get_serializer(catalog, many=True)
+        serializer = self.get_serializer(self.with_fieldset_loading(catalog), many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
@@ -2189,24 +2136,20 @@ class CatalogViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def refresh_all_progress(self, request):
         """Refresh progress for all catalog items linked to tasks/projects"""
-        catalogs = Catalog.objects.filter(user=request.user).filter(
-            models.Q(task__isnull=False) | models.Q(project__isnull=False)
+        checked_count, changed_count = Catalog.bulk_calculate_progress(
+            Catalog.objects.filter(user=request.user)
         )
         
-        updated_count = 0
-        for catalog in catalogs:
-            catalog.calculate_progress()
-            updated_count += 1
-        
         return Response({
-            "message": f"Progress refreshed for {updated_count} catalog items",
-            "count": updated_count
+            "message": f"Progress refreshed for {checked_count} catalog items",
+            "count": checked_count,
+            "changed": changed_count
         })
 
 
 # ===== WORKFLOW VIEWSETS =====
 
-class TodayPlanViewSet(viewsets.ModelViewSet):
+class TodayPlanViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet for managing today's plan - drag & drop items from catalog"""
     permission_classes = [AllowAny]  # Temporarily allow unauthenticated access for testing
     serializer_class = TodayPlanSerializer
@@ -2274,8 +2217,7 @@ class TodayPlanViewSet(viewsets.ModelViewSet):
             plan_date = datetime.strptime(plan_date, '%Y-%m-%d').date()
         
         # Calculate order_index
-        last_plan = TodayPlan.objects.filter(user=user, plan_date=plan_date).order_by('-order_index').first()
-        order_index = (last_plan.order_index + 1) if last_plan else 0
+        order_index = next_order_index(user, plan_date)
         
         # Get scheduled times from request (if explicitly provided)
         scheduled_start_time = self.request.data.get('scheduled_start_time')
@@ -2297,6 +2239,7 @@ class TodayPlanViewSet(viewsets.ModelViewSet):
         serializer.save(**save_kwargs)
     
     @action(detail=False, methods=['get'])
+    @conditional('today_plan.today', stamps.today_plan)
     def today(self, request):
         """Get today's plan for current user"""
         today = timezone.now().date()
@@ -2312,7 +2255,7 @@ class TodayPlanViewSet(viewsets.ModelViewSet):
             return Response([], status=status.HTTP_200_OK)
         
         plans = TodayPlan.objects.filter(user=user, plan_date=today).order_by('order_index')
-        serializer = self.get_serializer(plans, many=True)
+        serializer = self.get_serializer(self.with_fieldset_loading(plans), many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['post'])
@@ -2367,7 +2310,7 @@ class TodayPlanViewSet(viewsets.ModelViewSet):
 
         # Calculate order_index
         last_plan = TodayPlan.objects.filter(user=user, plan_date=plan_date).order_by('-order_index').first()
-        order_index = (last_plan.order_index + 1) if last_plan else 0
+        order_index = key_after(last_plan)
         
         # Calculate duration/times if needed (similar logic to add_from_catalog)
         if not planned_duration_minutes:
@@ -2475,7 +2418,7 @@ class TodayPlanViewSet(viewsets.ModelViewSet):
             
         # Calculate order_index
         last_plan = TodayPlan.objects.filter(user=user, plan_date=plan_date).order_by('-order_index').first()
-        order_index = (last_plan.order_index + 1) if last_plan else 0
+        order_index = key_after(last_plan)
         
         # Calculate duration if not provided
         if not planned_duration_minutes:
@@ -2551,179 +2494,89 @@ class TodayPlanViewSet(viewsets.ModelViewSet):
             "is_unplanned": false
         }
         """
-        from datetime import datetime as dt
-        
         item_type = request.data.get('item_type', '').lower()
-        plan_date = request.data.get('plan_date', timezone.now().date())
-        quadrant = request.data.get('quadrant', 'Q2')
-        is_unplanned = request.data.get('is_unplanned', False)
-        
-        # Convert plan_date string to date object if needed
-        if isinstance(plan_date, str):
-            plan_date = dt.strptime(plan_date, '%Y-%m-%d').date()
-        
+
         # Validate item_type
         if item_type not in ['custom', 'catalog']:
             return Response(
                 {"error": "item_type must be either 'custom' or 'catalog'"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        # Get user (handle anonymous)
+
+        user = self._plan_owner(request)
+        if not user:
+            return Response({"error": "No user available"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            plan_date = parse_plan_date(request.data.get('plan_date'))
+            # Calculate order_index
+            last_plan = TodayPlan.objects.filter(user=user, plan_date=plan_date).order_by('-order_index').first()
+            fields = plan_item_fields(request.data, last_plan.scheduled_end_time if last_plan else None)
+        except PlanItemError as e:
+            return Response({"error": str(e)}, status=e.status_code)
+
+        today_plan = TodayPlan.objects.create(
+            user=user,
+            plan_date=plan_date,
+            order_index=key_after(last_plan),
+            **fields
+        )
+
+        return Response({
+            "message": f"{item_type.title()} item added to today's plan successfully",
+            "item_type": item_type,
+            "plan": TodayPlanSerializer(today_plan).data
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], url_path='bulk_add')
+    def bulk_add(self, request):
+        """
+        Add several catalog / custom items in one request, e.g. when planning a week.
+
+        Payload: {"items": [<add_item payload>, ...], "plan_date": "2026-04-08", "user_id": 5}
+        plan_date (optional) is the default for items without their own. Items are
+        appended to their days in the order given; nothing is added if any item is invalid.
+        """
+        items = request.data.get('items')
+        if not isinstance(items, list) or not items:
+            return Response({"error": "items must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = self._plan_owner(request)
+        if not user:
+            return Response({"error": "No user available"}, status=status.HTTP_400_BAD_REQUEST)
+
+        plans, errors = build_plans(user, items, request.data.get('plan_date'))
+        if errors:
+            return Response(
+                {"error": "Some items could not be planned", "errors": errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        insert_plans(user, plans)
+        return Response({
+            "message": f"{len(plans)} items added to the plan successfully",
+            "plans": TodayPlanSerializer(
+                TodayPlan.objects.filter(id__in=[plan.id for plan in plans])
+                .select_related('user', 'catalog_item').order_by('plan_date', 'order_index'),
+                many=True
+            ).data
+        }, status=status.HTTP_201_CREATED)
+
+    def _plan_owner(self, request):
+        """The request's user, or the user_id it plans for when allowed (admins, same department)"""
         if request.user.is_authenticated:
             user = request.user
             target_user_id = request.data.get('user_id')
             if target_user_id:
-                from django.contrib.auth import get_user_model
-                User = get_user_model()
                 try:
                     requested_user = User.objects.get(id=target_user_id)
                     if user.role == 'ADMIN' or getattr(requested_user, 'department', None) == getattr(user, 'department', None):
                         user = requested_user
-                except User.DoesNotExist:
+                except (User.DoesNotExist, ValueError):
                     pass
-        else:
-            from django.contrib.auth import get_user_model
-            User = get_user_model()
-            user = User.objects.first()
-        
-        if not user:
-            return Response({"error": "No user available"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Calculate order_index
-        last_plan = TodayPlan.objects.filter(user=user, plan_date=plan_date).order_by('-order_index').first()
-        order_index = (last_plan.order_index + 1) if last_plan else 0
-        
-        # ==========================================
-        # CUSTOM TASK
-        # ==========================================
-        if item_type == 'custom':
-            title = request.data.get('title')
-            if not title:
-                return Response(
-                    {"error": "title is required for custom tasks"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            description = request.data.get('description', '')
-            planned_duration_minutes = request.data.get('planned_duration_minutes')
-            scheduled_start_time = request.data.get('scheduled_start_time')
-            scheduled_end_time = request.data.get('scheduled_end_time')
-            
-            # Set default duration if not provided
-            if not planned_duration_minutes:
-                planned_duration_minutes = 30
-            
-            # Generate default scheduled times if not provided
-            if not scheduled_start_time:
-                now = timezone.now()
-                if last_plan and last_plan.scheduled_end_time:
-                    start_dt = datetime.combine(now.date(), last_plan.scheduled_end_time)
-                else:
-                    start_dt = now.replace(minute=0, second=0, microsecond=0)
-                    if now.minute > 0:
-                        start_dt = start_dt + timedelta(hours=1)
-                
-                scheduled_start_time = start_dt.time()
-            
-            # Calculate end time based on duration
-            if not scheduled_end_time and scheduled_start_time:
-                if isinstance(scheduled_start_time, str):
-                    try:
-                        start = datetime.strptime(scheduled_start_time, '%H:%M:%S').time()
-                    except ValueError:
-                        start = datetime.strptime(scheduled_start_time, '%H:%M').time()
-                else:
-                    start = scheduled_start_time
-                
-                start_dt = datetime.combine(timezone.now().date(), start)
-                end_dt = start_dt + timedelta(minutes=int(planned_duration_minutes))
-                scheduled_end_time = end_dt.time()
-            
-            today_plan = TodayPlan.objects.create(
-                user=user,
-                custom_title=title,
-                custom_description=description,
-                plan_date=plan_date,
-                scheduled_start_time=scheduled_start_time,
-                scheduled_end_time=scheduled_end_time,
-                planned_duration_minutes=planned_duration_minutes,
-                quadrant=quadrant,
-                order_index=order_index,
-                notes=description,
-                is_unplanned=is_unplanned
-            )
-        
-        # ==========================================
-        # CATALOG ITEM
-        # ==========================================
-        elif item_type == 'catalog':
-            catalog_id = request.data.get('catalog_id')
-            if not catalog_id:
-                return Response(
-                    {"error": "catalog_id is required for catalog items"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            try:
-                catalog_item = Catalog.objects.get(id=catalog_id)
-            except Catalog.DoesNotExist:
-                return Response(
-                    {"error": "Catalog item not found"},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            
-            scheduled_start_time = request.data.get('scheduled_start_time')
-            scheduled_end_time = request.data.get('scheduled_end_time')
-            planned_duration_minutes = request.data.get('planned_duration_minutes')
-            
-            # Calculate duration if not provided
-            if not planned_duration_minutes:
-                if scheduled_start_time and scheduled_end_time:
-                    try:
-                        start = datetime.strptime(scheduled_start_time, '%H:%M:%S').time()
-                        end = datetime.strptime(scheduled_end_time, '%H:%M:%S').time()
-                        start_dt = datetime.combine(timezone.now().date(), start)
-                        end_dt = datetime.combine(timezone.now().date(), end)
-                        planned_duration_minutes = int((end_dt - start_dt).total_seconds() / 60)
-                    except (ValueError, AttributeError):
-                        planned_duration_minutes = int(float(catalog_item.estimated_hours) * 60)
-                else:
-                    # Use estimated hours from catalog
-                    planned_duration_minutes = int(float(catalog_item.estimated_hours) * 60)
-            
-            # Generate default scheduled times if not provided
-            if not scheduled_start_time or not scheduled_end_time:
-                now = timezone.now()
-                if last_plan and last_plan.scheduled_end_time:
-                    start_dt = datetime.combine(now.date(), last_plan.scheduled_end_time)
-                else:
-                    start_dt = now.replace(minute=0, second=0, microsecond=0)
-                    if now.minute > 0:
-                        start_dt = start_dt + timedelta(hours=1)
-                
-                end_dt = start_dt + timedelta(minutes=planned_duration_minutes)
-                scheduled_start_time = start_dt.time()
-                scheduled_end_time = end_dt.time()
-            
-            today_plan = TodayPlan.objects.create(
-                user=user,
-                catalog_item=catalog_item,
-                plan_date=plan_date,
-                scheduled_start_time=scheduled_start_time,
-                scheduled_end_time=scheduled_end_time,
-                planned_duration_minutes=planned_duration_minutes,
-                quadrant=quadrant,
-                order_index=order_index,
-                notes=request.data.get('notes', ''),
-                is_unplanned=is_unplanned
-            )
-        
-        return Response({
-            "message": f"{item_type.title()} item added to today's plan successfully",
-            "item_type": item_type,
-            "plan": TodayPlanSerializer(today_plan).data
-        }, status=status.HTTP_201_CREATED)
+            return user
+        # Get user (handle anonymous)
+        return User.objects.first()
     
     @action(detail=True, methods=['post'])
     def move_to_activity_log(self, request, pk=None):
@@ -2986,21 +2839,57 @@ class TodayPlanViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def reorder(self, request):
-        """Reorder today's plan items"""
-        items = request.data.get('items', [])  # List of {id, order_index}
-        
-        for item in items:
+        """
+        Reorder today's plan items in one bulk update
+        Body: {"ids": [5, 3, 8]} in the new order, or the older {"items": [{"id", "order_index"}]}
+        """
+        ids = request.data.get('ids')
+        if ids is None:
+            items = request.data.get('items', [])  # List of {id, order_index}
+            ids = [item['id'] for item in sorted(items, key=lambda item: item.get('order_index', 0))]
+        try:
+            ids = [int(pk) for pk in ids]
+        except (TypeError, ValueError):
+            return Response({"error": "ids must be a list of plan ids"}, status=status.HTTP_400_BAD_REQUEST)
+
+        order = reorder_plans(request.user, ids)
+        return Response({
+            "message": "Plan reordered successfully",
+            "order": [{'id': pk, 'order_index': key} for pk, key in order.items()]
+        })
+
+    @action(detail=True, methods=['post'])
+    def move(self, request, pk=None):
+        """
+        Move one plan item: Body {"after_id": <plan id> | null}
+        Only the moved row is rewritten unless its new neighbours have no gap left.
+        """
+        try:
+            plan = TodayPlan.objects.get(id=pk, user=request.user)
+        except TodayPlan.DoesNotExist:
+            return Response({"error": "Plan not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        after_id = request.data.get('after_id')
+        if after_id is not None:
             try:
-                plan = TodayPlan.objects.get(id=item['id'], user=request.user)
-                plan.order_index = item['order_index']
-                plan.save()
-            except TodayPlan.DoesNotExist:
-                pass
-        
-        return Response({"message": "Plan reordered successfully"})
+                after_id = int(after_id)
+            except (TypeError, ValueError):
+                return Response({"error": "after_id must be a plan id or null"}, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            order_index, rebalanced = move_plan(plan, after_id)
+        except TodayPlan.DoesNotExist as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "message": "Plan moved successfully",
+            "id": plan.id,
+            "order_index": order_index,
+            "rebalanced": rebalanced
+        })
 
-class ActivityLogViewSet(viewsets.ModelViewSet):
+
+class ActivityLogViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet for managing activity logs - actual work tracking"""
     permission_classes = [AllowAny]  # DEVELOPMENT: Allow unauthenticated access
     serializer_class = ActivityLogSerializer
@@ -3056,7 +2945,9 @@ class ActivityLogViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def active(self, request):
         """Get currently active activity log"""
-        active_log = ActivityLog.objects.filter(user=request.user, status='IN_PROGRESS').first()
+        active_log = ActivityLog.objects.filter(
+            user=request.user, status='IN_PROGRESS'
+        ).order_by('-actual_start_time').first()
         if not active_log:
             return Response({"message": "No active task"}, status=status.HTTP_200_OK)
         
@@ -3163,8 +3054,7 @@ class ActivityLogViewSet(viewsets.ModelViewSet):
         activity_log.is_task_completed = is_completed
         activity_log.status = 'COMPLETED' if is_completed else 'PENDING'
         activity_log.extra_minutes = extra_minutes
-        activity_log.calculate_time_worked()
-        activity_log.save()
+        activity_log.calculate_time_worked()  # saves only the changed columns
         
         # Update today's plan
         today_plan = activity_log.today_plan
@@ -3390,6 +3280,7 @@ class DaySessionViewSet(viewsets.ModelViewSet):
         })
     
     @action(detail=False, methods=['get'])
+    @conditional('day_session.current_session', stamps.current_session)
     def current_session(self, request):
         """Get current active session"""
         today = timezone.now().date()
@@ -3517,23 +3408,30 @@ class DashboardViewSet(viewsets.GenericViewSet):
             projects = Projects.objects.all()
         else:
             projects = Projects.objects.filter(
-                models.Q(created_by=user) | 
-                models.Q(project_lead=user) | 
-                models.Q(handled_by=user)
-            ).distinct()
+                project_involvement(user, ('creator', 'lead', 'handler'))
+            )
+        
+        # TIMELINE HEALTH
+        today = timezone.now().date()
+        # All portfolio/timeline counts in one pass over the scoped projects
+        project_counts = projects.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(status='ACTIVE')),
+            done=Count('id', filter=Q(status='COMPLETED')),
+            on_track=Count('id', filter=Q(due_date__gte=today, status='ACTIVE')),
+            overdue=Count('id', filter=Q(due_date__lt=today, status__in=['ACTIVE', 'ON HOLD'])),
+        )
         
         project_stats = {
-            'total': projects.count(),
-            'active': projects.filter(status='ACTIVE').count(),
-            'done': projects.filter(status='COMPLETED').count()
+            'total': project_counts['total'],
+            'active': project_counts['active'],
+            'done': project_counts['done']
         }
         
-        # TIMELINE HEALTH
-        today = timezone.now().date()
         timeline_stats = {
-            'total': projects.count(),
-            'on_track': projects.filter(due_date__gte=today, status='ACTIVE').count(),
-            'overdue': projects.filter(due_date__lt=today, status__in=['ACTIVE', 'ON HOLD']).count()
+            'total': project_counts['total'],
+            'on_track': project_counts['on_track'],
+            'overdue': project_counts['overdue']
         }
         
         # TASK EFFICIENCY
@@ -3541,18 +3439,24 @@ class DashboardViewSet(viewsets.GenericViewSet):
             tasks = Task.objects.all()
         else:
             tasks = Task.objects.filter(
-                models.Q(assignees__user=user) | 
-                models.Q(project__created_by=user)
-            ).distinct()
+                any_of(assigned_tasks(user), project_involvement(user, ('creator',), prefix='project__'))
+            )
+        
+        task_counts = tasks.aggregate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(status='DONE')),
+            pending=Count('id', filter=Q(status='PENDING')),
+            critical=Count('id', filter=Q(priority='CRITICAL')),
+        )
         
         task_stats = {
-            'total': tasks.count(),
-            'completed': tasks.filter(status='DONE').count(),
-            'pending': tasks.filter(status='PENDING').count()
+            'total': task_counts['total'],
+            'completed': task_counts['completed'],
+            'pending': task_counts['pending']
         }
         
         # CRITICAL ATTENTION
-        critical_tasks = tasks.filter(priority='CRITICAL').count()
+        critical_tasks = task_counts['critical']
         rejected_approvals = ApprovalRequest.objects.filter(status='REJECTED').count()
         
         critical_stats = {
@@ -3585,9 +3489,8 @@ class DashboardViewSet(viewsets.GenericViewSet):
                 due_date__lt=today,
                 status__in=['PENDING', 'IN_PROGRESS']
             ).filter(
-                models.Q(assignees__user=user) | 
-                models.Q(project__created_by=user)
-            ).distinct().select_related('project').prefetch_related('assignees__user')
+                any_of(assigned_tasks(user), project_involvement(user, ('creator',), prefix='project__'))
+            ).select_related('project').prefetch_related('assignees__user')
         
         critical_items = []
         for task in tasks:
@@ -3628,8 +3531,8 @@ class DashboardViewSet(viewsets.GenericViewSet):
             users = User.objects.filter(is_active=True)
         elif user.role == 'ADMIN':
             users = User.objects.filter(is_active=True)
-        elif user.role in ['MANAGER', 'TEAMLEAD'] and user.department:
-            users = User.objects.filter(department=user.department, is_active=True)
+        elif user.role in ['MANAGER', 'TEAMLEAD'] and get_auth_context(request).department_id:
+            users = User.objects.filter(department_id=get_auth_context(request).department_id, is_active=True)
         else:
             users = User.objects.filter(id=user.id)
         
@@ -3680,20 +3583,17 @@ class DashboardViewSet(viewsets.GenericViewSet):
             users = User.objects.filter(is_active=True)
         elif user.role == 'ADMIN':
             users = User.objects.filter(is_active=True)
-        elif user.role in ['MANAGER', 'TEAMLEAD'] and user.department:
-            users = User.objects.filter(department=user.department, is_active=True)
+        elif user.role in ['MANAGER', 'TEAMLEAD'] and get_auth_context(request).department_id:
+            users = User.objects.filter(department_id=get_auth_context(request).department_id, is_active=True)
         else:
             users = User.objects.filter(id=user.id, is_active=True)
         
         user_list = []
         for u in users:
             # For each user, count projects they are involved in
-            assigned_task_ids = TaskAssignee.objects.filter(user=u).values_list('task_id', flat=True)
             projects_count = Projects.objects.filter(
-                models.Q(tasks__id__in=assigned_task_ids) | 
-                models.Q(project_lead=u) | 
-                models.Q(handled_by=u)
-            ).distinct().count()
+                project_involvement(u, ('task', 'lead', 'handler'))
+            ).count()
             
             user_list.append({
                 'id': u.id,
@@ -3742,14 +3642,14 @@ class DashboardViewSet(viewsets.GenericViewSet):
 
         # GET ALL PROJECTS FOR DROPDOWN
         # This includes any project the user is Lead, Handled by, Author, or has an Assigned Task
-        assigned_task_ids = TaskAssignee.objects.filter(user=target_user).values_list('task_id', flat=True)
         all_user_projects = Projects.objects.filter(
-            models.Q(tasks__id__in=assigned_task_ids) | 
-            models.Q(project_lead=target_user) | 
-            models.Q(handled_by=target_user) |
-            models.Q(created_by=target_user) |
-            models.Q(assignees=target_user)
-        ).distinct()
+            project_involvement(target_user, ('task', 'lead', 'handler', 'creator', 'member'))
+        ).annotate(
+            # Project-level assignee flag, so the loop below needs no per-project query
+            is_project_member=models.ExpressionWrapper(
+                project_involvement(target_user, ('member',)), output_field=models.BooleanField()
+            )
+        )
 
         all_projects_list = [
             {'id': p.id, 'name': p.name} for p in all_user_projects
@@ -3775,17 +3675,13 @@ class DashboardViewSet(viewsets.GenericViewSet):
             user_tasks_qs = Task.objects.filter(project=project)
             
             is_responsible_for_project = (
-                project.project_lead == target_user or 
-                project.handled_by == target_user or 
-                project.created_by == target_user or
-                project.assignees.filter(id=target_user.id).exists()
+                target_user.id in (project.project_lead_id, project.handled_by_id, project.created_by_id) or
+                project.is_project_member
             )
             
             if not is_responsible_for_project:
                 # Regular worker: filter to their specific tasks
-                user_tasks_qs = user_tasks_qs.filter(assignees__user=target_user).distinct()
-            
-            user_tasks_qs = user_tasks_qs.distinct()
+                user_tasks_qs = user_tasks_qs.filter(assigned_tasks(target_user))
 
             # Apply date filters if provided
             if start_date:
@@ -3868,7 +3764,7 @@ class TeamOverviewViewSet(viewsets.GenericViewSet):
         """
         # When an admin is impersonating an employee, request.user is the employee.
         # We must use the original admin user for role-based filtering on this endpoint.
-        user = getattr(request, 'admin_user', None) or request.user
+        user = get_auth_context(request).acting_user
         today = timezone.now().date()
         
         # Check if all_users parameter is set (for project assignments)
@@ -4047,7 +3943,7 @@ class TeamOverviewViewSet(viewsets.GenericViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
         elif user.role in ['MANAGER', 'TEAMLEAD']:
-            if member.department != user.department:
+            if member.department_id != get_auth_context(request).department_id:
                 return Response(
                     {"error": "You can only view members from your department"},
                     status=status.HTTP_403_FORBIDDEN
@@ -4349,7 +4245,12 @@ class TeamOverviewViewSet(viewsets.GenericViewSet):
         
         # Update all employees
         employees = User.objects.filter(id__in=employee_ids)
+        previous_leads = set(employees.values_list('team_lead_id', flat=True))
         updated_count = employees.update(team_lead=team_lead)
+        # queryset.update() skips the User signals that maintain team visibility
+        # and invalidate cached authenticated users
+        schedule_team_rebuild(*employees.values_list('id', flat=True), *previous_leads)
+        invalidate_users(*employee_ids)
         
         action_message = f"assigned to {team_lead.email}" if team_lead else "unassigned from team leads"
         
@@ -4421,7 +4322,12 @@ class NotificationViewSet(viewsets.ModelViewSet):
         """Filter notifications for current user"""
         return Notification.objects.filter(user=self.request.user)
     
+    @conditional('notifications.list', stamps.notifications)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
     @action(detail=False, methods=['get'])
+    @conditional('notifications.unread', stamps.notifications)
     def unread(self, request):
         """Get all unread notifications"""
         unread_notifications = Notification.objects.filter(
@@ -4435,6 +4341,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
         })
     
     @action(detail=False, methods=['get'])
+    @conditional('notifications.unread_count', stamps.notifications)
     def unread_count(self, request):
         """Get count of unread notifications"""
         count = Notification.objects.filter(
@@ -4518,32 +4425,15 @@ class AutoLoginView(viewsets.GenericViewSet):
         
         try:
             # Call HRM API to validate code and get employee data
-            # Use configured HRM URL from settings (supports both dev and production)
-            hrm_url = getattr(settings, 'HRM_BASE_URL', 'http://localhost:8001')
-            # hrm_url = getattr(settings, 'HRM_BASE_URL', 'https://hrmbackendapi.meridahr.com')
-            
-            # Remove trailing slash if present to avoid double slash in URL
-            if hrm_url.endswith('/'):
-                hrm_url = hrm_url[:-1]
+            # Shared client uses settings.HRM_BASE_URL and VERIFY_SSL_HRM
+            hrm = get_hrm_client()
             
             # Log the validation request
             print(f"[DAS AutoLogin] Validating code: code={code[:10]}..., email={email}")
-            print(f"[DAS AutoLogin] Calling HRM at: {hrm_url}/api/validate-das-code/")
-            
-            # Use requests with basic headers to prevent 403 blocks from strict servers
-            headers = {'Content-Type': 'application/json', 'User-Agent': 'DAS-Backend/1.0'}
+            print(f"[DAS AutoLogin] Calling HRM at: {hrm.url('/api/validate-das-code/')}")
             
             # Validate code with HRM
-            # Disable SSL verification for development to avoid certification errors
-            verify_ssl = getattr(settings, 'VERIFY_SSL_HRM', True)
-            
-            response = requests.post(
-                f'{hrm_url}/api/validate-das-code/',
-                json={'code': code, 'email': email},
-                headers=headers,
-                timeout=30,
-                verify=verify_ssl
-            )
+            response = hrm.validate_das_code(code, email)
             
             # Log the response
             print(f"[DAS AutoLogin] HRM Response Status: {response.status_code}")
@@ -4776,8 +4666,7 @@ class TeamActivityStatusViewSet(viewsets.GenericViewSet):
         if user.role == 'ADMIN':
             team_users = list(User.objects.filter(is_active=True))
         else:
-            subordinates = user.get_all_subordinates()
-            team_users = list(User.objects.filter(id__in=[u.id for u in subordinates], is_active=True))
+            team_users = list(User.objects.filter(id__in=get_auth_context(request).subordinate_ids, is_active=True))
 
         filled = []
         not_filled = []
@@ -4820,7 +4709,8 @@ class TeamActivityStatusViewSet(viewsets.GenericViewSet):
 class SyncHRMEmployeesViewSet(viewsets.GenericViewSet):
     """
     Sync all active employees from HRM to DAS
-    POST /api/sync-hrm-employees/sync/
+    POST /api/sync-hrm-employees/sync/          - queue a sync job
+    GET  /api/sync-hrm-employees/jobs/<id>/     - poll its progress
     """
     permission_classes = [IsAuthenticated, IsAdmin]  # Only admins can trigger sync
     serializer_class = None  # Not used - all endpoints are custom actions
@@ -4828,149 +4718,69 @@ class SyncHRMEmployeesViewSet(viewsets.GenericViewSet):
     @action(detail=False, methods=['post'])
     def sync(self, request):
         """
-        Fetch all active employees from HRM and create/update DAS users
+        Queue a background sync of all active HRM employees
+        Returns immediately with a job id; a sync already pending or running is reused
+        """
+        job, created = enqueue_sync(requested_by=request.user)
+        return Response({
+            'success': True,
+            'message': 'Sync started' if created else 'Sync already in progress',
+            'duplicate': not created,
+            **job.to_dict(),
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=False, methods=['get'], url_path=r'jobs/(?P<job_id>\d+)')
+    def job_status(self, request, job_id=None):
+        """
+        Progress of a sync job
+        GET /api/sync-hrm-employees/jobs/<job_id>/
         """
-        # Get HRM URL from settings or request
-        from django.conf import settings
-        # hrm_url = getattr(settings, 'HRM_BASE_URL', 'https://hrmbackendapi.meridahr.com/')
-        hrm_url = getattr(settings, 'HRM_BASE_URL', 'https://localhost:8001')
-        
         try:
-            # Fetch all active employees from HRM
-            response = requests.get(
-                f'{hrm_url}/root/api/employees-active/',
-                timeout=30
-            )
-            
-            if response.status_code != 200:
-                return Response({
-                    'success': False,
-                    'error': f'Failed to fetch employees from HRM. Status: {response.status_code}'
-                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-            
-            data = response.json()
-            employees = data.get('employees', [])
-            
-            if not employees:
-                return Response({
-                    'success': True,
-                    'message': 'No active employees found in HRM',
-                    'created': 0,
-                    'updated': 0
-                })
-            
-            created_count = 0
-            updated_count = 0
-            error_count = 0
-            errors = []
-            
-            for emp_data in employees:
-                try:
-                    email = emp_data.get('email')
-                    
-                    if not email:
-                        continue
-                    
-                    # Map HRM designation to DAS role
-                    hrm_designation = emp_data.get('designation')
-                    das_role = 'EMPLOYEE'  # Default role
-                    
-                    if hrm_designation == 'Admin':
-                        das_role = 'ADMIN'
-                    elif hrm_designation == 'HR':
-                        das_role = 'MANAGER'
-                    elif hrm_designation in ['Employee', 'Recruiter']:
-                        das_role = 'EMPLOYEE'
-                    
-                    # Create or update User
-                    user, created = User.objects.update_or_create(
-                        email=email,
-                        defaults={
-                            'hrm_employee_id': emp_data.get('employee_Id'),
-                            'employee_name': emp_data.get('full_name'),
-                            'employee_type': emp_data.get('Employeement_Type'),
-                            'designation': hrm_designation,
-                            'hrm_department': emp_data.get('department'),
-                            'role': das_role,
-                            'location': emp_data.get('work_location'),
-                            'date_of_joining': emp_data.get('hired_date'),
-                            'is_active_in_hrm': True,
-                            'last_sync_time': timezone.now(),
-                            'is_active': True,
-                        }
-                    )
-                    
-                    # Set password for new users (they'll need to reset it)
-                    if created:
-                        random_password = secrets.token_urlsafe(16)
-                        user.set_password(random_password)
-                        user.save()
-                        created_count += 1
-                    else:
-                        updated_count += 1
-                    
-                    # Create or update Employee profile (detailed employee information)
-                    def parse_date(date_str):
-                        if date_str:
-                            try:
-                                from datetime import datetime
-                                return datetime.fromisoformat(date_str).date()
-                            except:
-                                return None
-                        return None
-                    
-                    Employee.objects.update_or_create(
-                        user=user,
-                        defaults={
-                            'name': emp_data.get('full_name', ''),
-                            'email': emp_data.get('email', ''),
-                            'phone': emp_data.get('phone', ''),
-                            'role': emp_data.get('designation', ''),
-                            'department': emp_data.get('department', ''),
-                            'employment_type': emp_data.get('Employeement_Type', ''),
-                            'designation': emp_data.get('designation', ''),
-                            'work_location': emp_data.get('work_location', ''),
-                            'date_of_joining': parse_date(emp_data.get('hired_date')),
-                            'date_of_birth': parse_date(emp_data.get('date_of_birth')),
-                            'is_active': True,
-                            'employee_status': 'active',
-                            'employee_id': emp_data.get('employee_Id', ''),
-                        }
-                    )
-                    
-                except Exception as e:
-                    error_count += 1
-                    errors.append({
-                        'email': emp_data.get('email', 'unknown'),
-                        'error': str(e)
-                    })
-            
-            return Response({
-                'success': True,
-                'message': f'Sync completed successfully',
-                'total_employees': len(employees),
-                'created': created_count,
-                'updated': updated_count,
-                'errors': error_count,
-                'error_details': errors if errors else None,
-                'sync_time': timezone.now().isoformat()
-            })
-            
-        except requests.exceptions.Timeout:
-            return Response({
-                'success': False,
-                'error': 'HRM service timeout - please try again'
-            }, status=status.HTTP_504_GATEWAY_TIMEOUT)
-        except requests.exceptions.RequestException as e:
-            return Response({
-                'success': False,
-                'error': f'Failed to connect to HRM service: {str(e)}'
-            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-        except Exception as e:
-            return Response({
-                'success': False,
-                'error': f'Unexpected error during sync: {str(e)}'
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            job = HRMSyncJob.objects.get(id=job_id)
+        except HRMSyncJob.DoesNotExist:
+            return Response({'error': 'Sync job not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(job.to_dict())
+    
+    @action(detail=False, methods=['get'])
+    def metrics(self, request):
+        """
+        Latency, retry and cache statistics of the shared HRM client
+        GET /api/sync-hrm-employees/metrics/
+        """
+        hrm = get_hrm_client()
+        return Response({
+            'base_url': hrm.base_url,
+            'endpoints': hrm.metrics(),
+        })
+
+
+class ConditionalGetViewSet(viewsets.GenericViewSet):
+    """
+    Hit rates of the conditional GET endpoints (see conditional.py)
+    GET  /api/conditional-get/metrics/  - per-endpoint counters of this worker
+    POST /api/conditional-get/reset/    - start a new measurement
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+    serializer_class = None  # Not used - all endpoints are custom actions
+
+    @action(detail=False, methods=['get'])
+    def metrics(self, request):
+        endpoints = stamps.metrics()
+        requests_total = sum(stats['requests'] for stats in endpoints.values())
+        not_modified = sum(stats['not_modified'] for stats in endpoints.values())
+        return Response({
+            'enabled': getattr(settings, 'CONDITIONAL_GET_ENABLED', True),
+            'requests': requests_total,
+            'not_modified': not_modified,
+            'hit_rate': round(not_modified / requests_total, 3) if requests_total else None,
+            'est_bytes_saved': sum(stats['est_bytes_saved'] or 0 for stats in endpoints.values()),
+            'endpoints': endpoints,
+        })
+
+    @action(detail=False, methods=['post'])
+    def reset(self, request):
+        stamps.reset_metrics()
+        return Response({'message': 'Conditional GET metrics reset'})
 
 
 # ─── Planner Catalog ViewSets ────────────────────────────────────────────────
@@ -5127,6 +4937,7 @@ class ProjectCompletionLineChartViewSet(viewsets.ViewSet):
     """
     permission_classes = [AllowAny]  # DEVELOPMENT: Allow unauthenticated access
     
+    @conditional('charts.projects_completion', stamps.completion_chart)
     def list(self, request):
         """
         Returns line chart data for project completions grouped by month.
@@ -5137,6 +4948,51 @@ class ProjectCompletionLineChartViewSet(viewsets.ViewSet):
         - user_id: Filter by specific user (for admin/team lead viewing others)
         """
         user = request.user
+        queryset, start_date, end_date = self.completion_scope(request)
+        
+        # Group by month and count completions
+        completion_data = []
+        current_date = start_date
+        
+        while current_date <= end_date:
+            month_start = current_date.replace(day=1)
+            if current_date.month == 12:
+                month_end = month_start.replace(year=month_start.year + 1, month=1, day=1) - timedelta(days=1)
+            else:
+                month_end = month_start.replace(month=month_start.month + 1, day=1) - timedelta(days=1)
+            
+            count = queryset.filter(
+                actual_completion_date__gte=month_start,
+                actual_completion_date__lte=month_end
+            ).count()
+            
+            completion_data.append({
+                'month': month_start.strftime('%Y-%b'),
+                'count': count,
+                'month_year': month_start.strftime('%B %Y'),
+            })
+            
+            # Move to next month
+            current_date = month_end + timedelta(days=1)
+        
+        total_completed = queryset.count()
+        
+        response_data = {
+            'user_role': user.role,
+            'department': user.hrm_department if user.role == 'EMPLOYEE' else None,
+            'data': completion_data,
+            'total_completed': total_completed,
+            'date_range': {
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+            }
+        }
+        
+        return Response(response_data)
+
+    def completion_scope(self, request):
+        """Completed projects in the requested date range visible to the user, and that range"""
+        user = request.user
         
         # Get query parameters
         months_param = request.query_params.get('months', 12)
@@ -5191,47 +5047,46 @@ class ProjectCompletionLineChartViewSet(viewsets.ViewSet):
         # Apply role-based filtering
         if filter_param == 'my':
             # 'my' filter: only show projects explicitly created/led/handled by user
-            queryset = queryset.filter(
-                Q(created_by=user) | 
-                Q(project_lead=user) | 
-                Q(handled_by=user) |
-                Q(assignees=user) |
-                Q(tasks__assignees__user=user)
-            ).distinct()
+            queryset = queryset.filter(project_involvement(user))
         elif user.role == 'ADMIN':
             # Admin sees all projects
             pass
-        elif user.role == 'MANAGER':
+        elif user.role in ['MANAGER', 'TEAMLEAD']:
             # Manager sees projects where they or their subordinates are involved
-            subordinates = user.get_all_subordinates()
-            queryset = queryset.filter(
-                Q(project_lead=user) |
-                Q(handled_by=user) |
-                Q(created_by=user) |
-                Q(project_lead__in=subordinates) |
-                Q(handled_by__in=subordinates) |
-                Q(created_by__in=subordinates)
-            ).distinct()
-        elif user.role == 'TEAMLEAD':
             # Team Lead sees projects for their team members
-            team_members = user.get_team_members()
             queryset = queryset.filter(
-                Q(project_lead=user) |
-                Q(handled_by=user) |
-                Q(created_by=user) |
-                Q(project_lead__in=team_members) |
-                Q(handled_by__in=team_members) |
-                Q(created_by__in=team_members)
-            ).distinct()
+                project_involvement(get_auth_context(request).scope_user_ids, ('lead', 'handler', 'creator'))
+            )
         else:  # EMPLOYEE
             # Employee sees only their own projects
-            queryset = queryset.filter(
-                Q(project_lead=user) |
-                Q(handled_by=user) |
-                Q(created_by=user) |
-                Q(assignees=user) |
-                Q(tasks__assignees__user=user)
-            ).distinct()
+            queryset = queryset.filter(project_involvement(user))
+        
+        return queryset, start_date, end_date
+
+
+class TaskCompletionLineChartViewSet(viewsets.ViewSet):
+    """
+    ViewSet for task completion line chart data.
+    Shows: Number of tasks completed per month
+    Filters based on user role:
+    - ADMIN: All tasks
+    - MANAGER: Tasks within their hierarchy
+    - TEAMLEAD: Tasks for their team members
+    - EMPLOYEE: Only their tasks
+    """
+    permission_classes = [AllowAny]  # DEVELOPMENT: Allow unauthenticated access
+    
+    @conditional('charts.tasks_completion', stamps.completion_chart)
+    def list(self, request):
+        """
+        Returns line chart data for task completions grouped by month.
+        Query params:
+        - months: Number of months to show (default: 12)
+        - start_date: Start date in ISO format (default: 12 months ago)
+        - end_date: End date in ISO format (default: today)
+        """
+        user = request.user
+        queryset, start_date, end_date = self.completion_scope(request)
         
         # Group by month and count completions
         completion_data = []
@@ -5273,27 +5128,8 @@ class ProjectCompletionLineChartViewSet(viewsets.ViewSet):
         
         return Response(response_data)
 
-
-class TaskCompletionLineChartViewSet(viewsets.ViewSet):
-    """
-    ViewSet for task completion line chart data.
-    Shows: Number of tasks completed per month
-    Filters based on user role:
-    - ADMIN: All tasks
-    - MANAGER: Tasks within their hierarchy
-    - TEAMLEAD: Tasks for their team members
-    - EMPLOYEE: Only their tasks
-    """
-    permission_classes = [AllowAny]  # DEVELOPMENT: Allow unauthenticated access
-    
-    def list(self, request):
-        """
-        Returns line chart data for task completions grouped by month.
-        Query params:
-        - months: Number of months to show (default: 12)
-        - start_date: Start date in ISO format (default: 12 months ago)
-        - end_date: End date in ISO format (default: today)
-        """
+    def completion_scope(self, request):
+        """Completed tasks in the requested date range visible to the user, and that range"""
         user = request.user
         
         # Get query parameters
@@ -5349,76 +5185,19 @@ class TaskCompletionLineChartViewSet(viewsets.ViewSet):
         if filter_param == 'my':
             # Match DashboardViewSet.statistics "Task Efficiency" logic
             queryset = queryset.filter(
-                Q(assignees__user=user) | 
-                Q(project__created_by=user)
-            ).distinct()
-        elif user.role == 'ADMIN':
-            # Admin sees all tasks
-            pass
-        elif user.role == 'MANAGER':
-            # Manager sees tasks where they or their subordinates are involved
-            subordinates = user.get_all_subordinates()
-            queryset = queryset.filter(
-                Q(project_lead=user) |
-                Q(assignees__user=user) |
-                Q(project_lead__in=subordinates) |
-                Q(assignees__user__in=subordinates)
-            ).distinct()
-        elif user.role == 'TEAMLEAD':
-            # Team Lead sees tasks for their team members
-            team_members = user.get_team_members()
-            queryset = queryset.filter(
-                Q(project_lead=user) |
-                Q(assignees__user=user) |
-                Q(project_lead__in=team_members) |
-                Q(assignees__user__in=team_members)
-            ).distinct()
-        else:  # EMPLOYEE
-            # Employee sees only their own tasks
-            queryset = queryset.filter(
-                Q(project_lead=user) |
-                Q(assignees__user=user)
-            ).distinct()
-        
-        # Group by month and count completions
-        completion_data = []
-        current_date = start_date
-        
-        while current_date <= end_date:
-            month_start = current_date.replace(day=1)
-            if current_date.month == 12:
-                month_end = month_start.replace(year=month_start.year + 1, month=1, day=1) - timedelta(days=1)
-            else:
-                month_end = month_start.replace(month=month_start.month + 1, day=1) - timedelta(days=1)
-            
-            count = queryset.filter(
-                actual_completion_date__gte=month_start,
-                actual_completion_date__lte=month_end
-            ).count()
-            
-            completion_data.append({
-                'month': month_start.strftime('%Y-%b'),
-                'count': count,
-                'month_year': month_start.strftime('%B %Y'),
-            })
-            
-            # Move to next month
-            current_date = month_end + timedelta(days=1)
-        
-        total_completed = queryset.count()
-        
-        response_data = {
-            'user_role': user.role,
-            'department': user.hrm_department if user.role == 'EMPLOYEE' else None,
-            'data': completion_data,
-            'total_completed': total_completed,
-            'date_range': {
-                'start_date': start_date.isoformat(),
-                'end_date': end_date.isoformat(),
-            }
-        }
+                any_of(assigned_tasks(user), project_involvement(user, ('creator',), prefix='project__'))
+            )
+        else:
+            # Tasks assigned to, or in projects led by, the user and (for managers and
+            # team leads) the people under them. Admin sees all tasks.
+            members = get_auth_context(request).scope_user_ids
+            if members is not None:
+                queryset = queryset.filter(any_of(
+                    assigned_tasks(members),
+                    project_involvement(members, ('lead',), prefix='project__'),
+                ))
         
-        return Response(response_data)
+        return queryset, start_date, end_date
 
 
 
@@ -5449,6 +5228,7 @@ class AnalyticsViewSet(viewsets.GenericViewSet):
     permission_classes = [AllowAny]  # DEVELOPMENT: Allow unauthenticated access
 
     @action(detail=False, methods=['get'], url_path='daily')
+    @conditional('analytics.daily', stamps.daily_analytics)
     def daily_analytics(self, request):
         """GET /api/analytics/daily/?user_id=&days=30"""
         user_id = request.query_params.get('user_id', request.user.id)
@@ -5474,6 +5254,7 @@ class AnalyticsViewSet(viewsets.GenericViewSet):
         return Response(data)
     
     @action(detail=True, methods=['get'], url_path='project-bars')
+    @conditional('analytics.project_bars', stamps.project_bars)
     def project_bars(self, request, pk=None):
         """GET /api/analytics/{project_id}/project-bars/"""
         try:
@@ -5511,57 +5292,26 @@ class ProjectAnalyticsViewSet(viewsets.GenericViewSet):
     def get_achieved_hours_for_task(self, task, user_id=None):
         """
         Calculate total achieved hours from ActivityLog for a specific task.
-        Uses aggressive cross-linking (strict, catalog title, and custom title).
+        Logs are linked to tasks at write time (strict, catalog title, and custom
+        title - see links.py), so this is an aggregate on ActivityLog.resolved_task.
         Includes IN_PROGRESS logs for live updates.
         """
         from django.db.models import Sum
-        from django.utils import timezone
         
         # Base filter for valid work sessions
         # IN_PROGRESS is added here to support dynamic live updates
-        base_filters = {'status__in': ['COMPLETED', 'PENDING', 'STOPPED', 'IN_PROGRESS']}
-        if user_id:
-            base_filters['user_id'] = user_id
-
-        # 1. Strict Match: Directly linked via Task ForeignKey
-        strict_qs = ActivityLog.objects.filter(
-            today_plan__catalog_item__task=task,
-            **base_filters
-        )
-        
-        # 2. Catalog Match: Same name in same project catalog
-        catalog_name_qs = ActivityLog.objects.filter(
-            today_plan__catalog_item__isnull=False,
-            today_plan__catalog_item__task__isnull=True,
-            today_plan__catalog_item__project=task.project,
-            today_plan__catalog_item__name__iexact=task.title,
-            **base_filters
-        )
-
-        # 3. Custom Match: "Unplanned" task started by typing name (no catalog item)
-        custom_name_qs = ActivityLog.objects.filter(
-            today_plan__catalog_item__isnull=True,
-            today_plan__custom_title__iexact=task.title,
-            **base_filters
+        logs = ActivityLog.objects.filter(
+            resolved_task=task,
+            status__in=['COMPLETED', 'PENDING', 'STOPPED', 'IN_PROGRESS']
         )
+        if user_id:
+            logs = logs.filter(user_id=user_id)
         
-        def calculate_total_qs_hours(qs):
-            """Calculate total hours including live time for in-progress tasks"""
-            total_float = float(qs.aggregate(total=Sum('hours_worked'))['total'] or 0.0)
-            
-            # For IN_PROGRESS tasks that don't have hours_worked updated yet
-            in_progress = qs.filter(status='IN_PROGRESS')
-            now = timezone.now()
-            for log in in_progress:
-                if log.hours_worked <= 0:
-                    delta = now - log.actual_start_time
-                    total_float += float(delta.total_seconds() / 3600.0)
-            return total_float
-            
+        # Live time for IN_PROGRESS logs that don't have hours_worked updated yet
+        # comes from the running-timer registry instead of scanning the logs
         total = (
-            calculate_total_qs_hours(strict_qs) +
-            calculate_total_qs_hours(catalog_name_qs) +
-            calculate_total_qs_hours(custom_name_qs)
+            float(logs.aggregate(total=Sum('hours_worked'))['total'] or 0.0) +
+            timers.registry.live_hours_for_task(task, user_id=user_id)
         )
         
         return float(total)
@@ -5778,7 +5528,7 @@ class ProjectAnalyticsViewSet(viewsets.GenericViewSet):
             # Exclude tasks we already processed
             orphan_logs = ActivityLog.objects.filter(
                 **orphan_logs_filters
-            ).exclude(today_plan__catalog_item__task_id__in=processed_task_ids)
+            ).exclude(resolved_task_id__in=processed_task_ids)
             
             # Group by task name to show as slices in the donut
             from django.db.models import Sum
@@ -0,0 +1,31 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+
+from .sync import SyncError, sync
+
+
+class SyncView(APIView):
+    """
+    POST: /api/sync/
+
+    Offline-first delta sync for the Flutter client (see sync.py).
+    Body: {"cursors": {"today_plans": null, ...}, "mutations": [...], "limit": 500}
+    Returns, per collection, the rows changed and the ids deleted since its cursor,
+    the next cursor and whether more batches follow, plus one result per mutation.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            payload = sync(
+                request.user,
+                cursors=request.data.get('cursors'),
+                mutations=request.data.get('mutations'),
+                limit=request.data.get('limit'),
+                context={'request': request},
+            )
+        except SyncError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(payload)
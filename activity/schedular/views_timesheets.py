@@ -0,0 +1,53 @@
+from django.http import StreamingHttpResponse
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+
+from .auth_context import get_auth_context
+from .timesheets import FORMATS, TimesheetError, parse_ids, parse_range, stream, timesheet_logs
+
+
+class TimesheetExportView(APIView):
+    """
+    GET: /api/timesheets/export/?start_date=2026-01-01&end_date=2026-03-31&user_ids=4,7&project_id=12&output=csv
+
+    Streams one row per activity log with resolved project / task names and hours
+    (see timesheets.py), as CSV (default) or NDJSON (output=ndjson).
+    start_date / end_date default to the current month; user_ids and project_id
+    take comma-separated ids. Users outside the caller's scope (admin: everyone,
+    manager: their hierarchy, team lead: their team, employee: themselves) are refused.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def perform_content_negotiation(self, request, force=False):
+        # The export is not rendered; Accept: text/csv must not end in 406 (errors still answer JSON)
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        params = request.query_params
+        output = params.get('output', 'csv')
+        try:
+            start, end = parse_range(params.get('start_date'), params.get('end_date'))
+            user_ids = parse_ids(params.get('user_ids'), 'user_ids')
+            project_ids = parse_ids(params.get('project_id'), 'project_id')
+            if output not in FORMATS:
+                raise TimesheetError(f"output must be one of {', '.join(FORMATS)}")
+        except TimesheetError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        scope = get_auth_context(request).scope_user_ids
+        if scope is not None:
+            if user_ids is None:
+                user_ids = sorted(set(scope))
+            elif not set(user_ids) <= set(scope):
+                outside = sorted(set(user_ids) - set(scope))
+                return Response(
+                    {'error': f"You cannot export timesheets of users {', '.join(map(str, outside))}"},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+        logs = timesheet_logs(start, end, user_ids=user_ids, project_ids=project_ids)
+        response = StreamingHttpResponse(stream(logs, output), content_type=FORMATS[output])
+        response['Content-Disposition'] = f'attachment; filename="timesheet_{start}_{end}.{output}"'
+        return response
@@ -0,0 +1,265 @@
+"""
+Maintained project visibility (ACL) table
+
+ProjectQuerySetMixin / TaskQuerySetMixin used to OR together project_lead,
+handled_by, created_by, assignees and tasks__assignees__user (plus the same
+for subordinates) and then DISTINCT the multi-way join. ProjectVisibility
+stores those relations as (user, project, reason) rows so scoping becomes a
+single indexed semi-join on the table.
+
+Rows are refreshed per project after project / project-assignee / task /
+task-assignee writes. After a role, team_lead or is_active change the
+hierarchy-derived TEAM_* rows are recomputed for the managers and team leads
+whose team can have changed: the user and everyone up its old and new
+team_lead chains. Both run after commit, once per transaction however many
+rows the transaction touched.
+"""
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import User, Projects, TaskAssignee, ProjectVisibility
+
+DIRECT_REASONS = ('LEAD', 'HANDLER', 'CREATOR', 'MEMBER', 'TASK')
+TEAM_REASONS = ('TEAM_LEAD', 'TEAM_HANDLER', 'TEAM_CREATOR', 'TEAM_TASK')
+
+# Direct reasons of a subordinate that make a project visible to the viewer, per viewer role
+TEAM_SCOPE_REASONS = {
+    'MANAGER': ('LEAD', 'HANDLER', 'CREATOR'),
+    'TEAMLEAD': ('LEAD', 'HANDLER', 'CREATOR', 'TASK'),
+}
+
+# Reasons that make up each scope in the queryset mixins
+PLANNER_REASONS = ('LEAD', 'HANDLER', 'TASK')
+ROLE_PROJECT_REASONS = {
+    'MANAGER': ('LEAD', 'HANDLER', 'CREATOR', 'TEAM_LEAD', 'TEAM_HANDLER', 'TEAM_CREATOR'),
+    'TEAMLEAD': ('LEAD', 'HANDLER', 'CREATOR', 'TEAM_LEAD', 'TEAM_HANDLER', 'TEAM_CREATOR', 'TEAM_TASK'),
+    'EMPLOYEE': ('LEAD', 'HANDLER', 'MEMBER', 'TASK'),
+}
+
+# Project-level reasons in the task scopes (the rest of a task scope is its own assignees)
+TASK_PROJECT_REASONS = {
+    'MANAGER': ('LEAD', 'HANDLER', 'TEAM_LEAD'),
+    'TEAMLEAD': ('LEAD',),
+    'EMPLOYEE': ('LEAD', 'HANDLER', 'MEMBER'),
+}
+
+BATCH_SIZE = 1000
+
+
+def visible_project_ids(user, reasons):
+    """Subquery of project ids visible to `user` through any of `reasons`"""
+    return ProjectVisibility.objects.filter(user_id=user.pk, reason__in=reasons).values('project_id')
+
+
+# ── Pure computation ─────────────────────────────────────────────────────
+
+def compute_direct_rows(projects, members, task_assignees):
+    """
+    projects: iterable of (project_id, project_lead_id, handled_by_id, created_by_id)
+    members: iterable of (project_id, user_id) from Projects.assignees
+    task_assignees: iterable of (project_id, user_id) from TaskAssignee
+    """
+    rows = set()
+    for project_id, lead_id, handler_id, creator_id in projects:
+        for user_id, reason in ((lead_id, 'LEAD'), (handler_id, 'HANDLER'), (creator_id, 'CREATOR')):
+            if user_id:
+                rows.add((user_id, project_id, reason))
+    rows.update((user_id, project_id, 'MEMBER') for project_id, user_id in members)
+    rows.update((user_id, project_id, 'TASK') for project_id, user_id in task_assignees if project_id)
+    return rows
+
+
+def build_hierarchy(users):
+    """users: iterable of (id, role, is_active, team_lead_id)"""
+    roles = {}
+    active_reports = defaultdict(list)
+    for user_id, role, is_active, team_lead_id in users:
+        roles[user_id] = role
+        if team_lead_id and is_active:
+            active_reports[team_lead_id].append(user_id)
+    return roles, active_reports
+
+
+def subordinate_ids(user_id, roles, active_reports, _seen=None):
+    """Same result as User.get_all_subordinates(), from an in-memory hierarchy"""
+    if roles.get(user_id) == 'ADMIN':
+        return set(roles)
+    seen = _seen if _seen is not None else {user_id}
+    result = set()
+    for report_id in active_reports.get(user_id, ()):
+        result.add(report_id)
+        if report_id not in seen:
+            seen.add(report_id)
+            result |= subordinate_ids(report_id, roles, active_reports, seen)
+    return result
+
+
+def team_member_ids(viewer_id, roles, active_reports):
+    """Users whose direct rows make up the viewer's TEAM_* rows"""
+    if roles.get(viewer_id) == 'MANAGER':
+        return subordinate_ids(viewer_id, roles, active_reports)
+    return set(active_reports.get(viewer_id, ()))
+
+
+def compute_team_rows(direct_rows, roles, active_reports, viewer_ids=None):
+    """Derive TEAM_* rows for managers and team leads (only `viewer_ids` if given) from the direct rows"""
+    by_user = defaultdict(list)
+    for user_id, project_id, reason in direct_rows:
+        by_user[user_id].append((project_id, reason))
+
+    rows = set()
+    for viewer_id in (roles if viewer_ids is None else viewer_ids):
+        scope = TEAM_SCOPE_REASONS.get(roles.get(viewer_id))
+        if not scope:
+            continue
+        for member_id in team_member_ids(viewer_id, roles, active_reports):
+            for project_id, reason in by_user.get(member_id, ()):
+                if reason in scope:
+                    rows.add((viewer_id, project_id, f'TEAM_{reason}'))
+    return rows
+
+
+def chain_ids(user_ids, team_leads):
+    """`user_ids` and everyone above them in the team_lead chains"""
+    result = set()
+    for user_id in user_ids:
+        while user_id and user_id not in result:
+            result.add(user_id)
+            user_id = team_leads.get(user_id)
+    return result
+
+
+# ── Loading from the live tables ─────────────────────────────────────────
+
+def load_direct_rows(project_ids=None):
+    projects = Projects.objects.all()
+    members = Projects.assignees.through.objects.all()
+    task_assignees = TaskAssignee.objects.all()
+    if project_ids is not None:
+        projects = projects.filter(id__in=project_ids)
+        members = members.filter(projects_id__in=project_ids)
+        task_assignees = task_assignees.filter(task__project_id__in=project_ids)
+    return compute_direct_rows(
+        projects.values_list('id', 'project_lead_id', 'handled_by_id', 'created_by_id'),
+        members.values_list('projects_id', 'user_id'),
+        task_assignees.values_list('task__project_id', 'user_id').distinct(),
+    )
+
+
+def load_hierarchy():
+    return build_hierarchy(User.objects.values_list('id', 'role', 'is_active', 'team_lead_id'))
+
+
+def _bulk_insert(rows):
+    ProjectVisibility.objects.bulk_create(
+        [ProjectVisibility(user_id=u, project_id=p, reason=r) for u, p, r in rows],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+# ── Maintenance ──────────────────────────────────────────────────────────
+
+def refresh_projects(project_ids):
+    """Recompute every row (direct and TEAM_*) of the given projects"""
+    project_ids = {pid for pid in project_ids if pid}
+    if not project_ids:
+        return 0
+    with transaction.atomic():
+        direct = load_direct_rows(project_ids)
+        roles, active_reports = load_hierarchy()
+        rows = direct | compute_team_rows(direct, roles, active_reports)
+        ProjectVisibility.objects.filter(project_id__in=project_ids).delete()
+        _bulk_insert(rows)
+    return len(rows)
+
+
+def rebuild_team_rows(user_ids=None):
+    """
+    Recompute the hierarchy-derived rows from the stored direct rows: all of
+    them, or (given the users whose role, team_lead or is_active changed, and
+    their previous team leads) those of the managers and team leads above them.
+    """
+    with transaction.atomic():
+        users = list(User.objects.values_list('id', 'role', 'is_active', 'team_lead_id'))
+        roles, active_reports = build_hierarchy(users)
+        direct = ProjectVisibility.objects.filter(reason__in=DIRECT_REASONS)
+        stale = ProjectVisibility.objects.filter(reason__in=TEAM_REASONS)
+        viewer_ids = None
+        if user_ids is not None:
+            team_leads = {user_id: team_lead_id for user_id, _, _, team_lead_id in users}
+            chain = chain_ids(user_ids, team_leads)
+            viewer_ids = {user_id for user_id in chain if roles.get(user_id) in TEAM_SCOPE_REASONS}
+            members = set()
+            for viewer_id in viewer_ids:
+                members |= team_member_ids(viewer_id, roles, active_reports)
+            direct = direct.filter(user_id__in=members)
+            # Users in the chain that are no longer managers / team leads lose their rows
+            stale = stale.filter(user_id__in=chain)
+        rows = compute_team_rows(set(direct.values_list('user_id', 'project_id', 'reason')),
+                                 roles, active_reports, viewer_ids)
+        stale.delete()
+        _bulk_insert(rows)
+    return len(rows)
+
+
+def rebuild_all():
+    """Recompute the whole table. Returns (direct_rows, team_rows)."""
+    with transaction.atomic():
+        direct = load_direct_rows()
+        roles, active_reports = load_hierarchy()
+        team = compute_team_rows(direct, roles, active_reports)
+        ProjectVisibility.objects.all().delete()
+        _bulk_insert(direct | team)
+    return len(direct), len(team)
+
+
+_pending = threading.local()
+
+
+def _on_commit_once(key, values, runner):
+    """
+    Run `runner(values)` after commit, merging repeated calls within one
+    transaction into a single run. Outside a transaction it runs now.
+
+    The values wait in a set per thread, database and key. Each call queues a
+    flush; the first flush after commit takes the whole set, later ones find
+    nothing left. Values queued by a transaction that rolls back are run with
+    the next commit of the same key - a refresh recomputes from the tables, so
+    that only costs time.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        runner(set(values))
+        return
+    if not hasattr(_pending, 'values'):
+        _pending.values = {}
+    slot = (connection.alias, key)
+    _pending.values.setdefault(slot, set()).update(values)
+
+    def flush():
+        pending = _pending.values.pop(slot, None)
+        if pending is not None:
+            runner(pending)
+
+    transaction.on_commit(flush)
+
+
+def schedule_project_refresh(*project_ids):
+    """Refresh the given projects once, after the current transaction commits"""
+    project_ids = {pid for pid in project_ids if pid}
+    if project_ids:
+        _on_commit_once('projects', project_ids, refresh_projects)
+
+
+def schedule_team_rebuild(*user_ids):
+    """
+    Rebuild TEAM_* rows once, after the current transaction commits: for the
+    hierarchy around `user_ids` (pass the changed users and their previous team
+    leads), or everywhere when called without ids.
+    """
+    # None stands for "everyone" in the merged set
+    user_ids = {uid for uid in user_ids if uid} or {None}
+    _on_commit_once('team', user_ids, lambda ids: rebuild_team_rows(None if None in ids else ids))